@@ -0,0 +1,89 @@
+# Compares how long a 6-player state line takes to arrive over BLE when every read is acknowledged,
+# and when ACKs are windowed (see BLE_ACK_WINDOW). The BLE link is played by a stand-in UART that keeps
+# its own clock, so the latencies are the same on the host and on the device. The time spent reading
+# and framing the line is measured for real.
+from time import monotonic_ns
+
+from core.connection.line_framer import LineFramer
+from core.connection.ack_window import AckWindow
+
+ITERATIONS = 100
+# Air time of one notification, and of one ACK write, which takes a connection event from the notifications.
+NOTIFY_SECONDS = 0.0075
+WRITE_SECONDS = 0.0075
+CHUNK_SIZE = 20
+# How often the main loop polls for new data when there is nothing to read.
+IDLE_POLL_SECONDS = 0.01
+ACK_IDLE_TIMEOUT = 0.1
+LINE = b'cu;pl;mt;00ffff;42;120;3600;60,30;1,2,3,4,5,6;00ffff,2affff,55ffff,7fffff,aaffff,d5ffff;pr,,,,,;1\n'
+
+class UartStandIn():
+	"Plays SGT. Sends a line in notifications of CHUNK_SIZE bytes, waiting for an ACK once its window is used up."
+	def __init__(self, line: bytes, window: int):
+		self.line = line
+		self.window = window
+		self.now = 0.0
+		self.data = bytearray()
+		self.sent = 0
+		self.unacknowledged = 0
+		self.waiting = False
+		self.ack_count = 0
+		self._send_notifications()
+
+	def _send_notifications(self):
+		while self.sent < len(self.line) and not self.waiting:
+			chunk = self.line[self.sent:self.sent+CHUNK_SIZE]
+			self.now += NOTIFY_SECONDS
+			self.data.extend(chunk)
+			self.sent += len(chunk)
+			self.unacknowledged += len(chunk)
+			self.waiting = self.window == 0 or self.unacknowledged >= self.window or chunk[-1] == 10
+
+	@property
+	def in_waiting(self) -> int:
+		return len(self.data)
+
+	def readinto(self, buf, nbytes: int) -> int:
+		nbytes = min(nbytes, len(self.data))
+		buf[0:nbytes] = self.data[0:nbytes]
+		self.data = self.data[nbytes:]
+		return nbytes
+
+	def acknowledge(self):
+		self.now += WRITE_SECONDS
+		self.ack_count += 1
+		self.unacknowledged = 0
+		self.waiting = False
+		self._send_notifications()
+
+def receive_line(sender_window: int, receiver_window: int) -> tuple[float, int]:
+	"Receive LINE as the BLE connection does. Returns the seconds it took on the stand-in clock, and the ACK count."
+	uart = UartStandIn(LINE, sender_window)
+	framer = LineFramer(256)
+	ack_window = AckWindow(receiver_window, ACK_IDLE_TIMEOUT)
+	while not framer.has_line():
+		if uart.in_waiting == 0:
+			uart.now += IDLE_POLL_SECONDS
+			if ack_window.on_idle(uart.now):
+				uart.acknowledge()
+			continue
+		newline_count = framer.newline_count
+		bytes_read = framer.read_from(uart, uart.now)
+		if ack_window.on_read(bytes_read, framer.newline_count != newline_count, uart.now):
+			uart.acknowledge()
+	framer.pop_line()
+	return (uart.now, uart.ack_count)
+
+print(f'{len(LINE)} byte line, {CHUNK_SIZE} byte notifications')
+for (label, sender_window, receiver_window) in (
+		('ACK every read', 0, 0),
+		('ACK window 64', 64, 64),
+		('ACK window 512', 512, 512),
+		('ACK window 64, sender without window', 0, 64),
+	):
+	receive_line(sender_window, receiver_window)
+	start_ns = monotonic_ns()
+	for _n in range(ITERATIONS):
+		(seconds, ack_count) = receive_line(sender_window, receiver_window)
+	elapsed_ns = monotonic_ns() - start_ns
+	print(f'{label:>38}: {seconds*1000:6.1f} ms on the link, {ack_count} ACKs, {elapsed_ns / ITERATIONS / 1000:,.1f} us/line to read')
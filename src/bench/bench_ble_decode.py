@@ -0,0 +1,41 @@
+# Measures how long it takes to decode a BLE state line into a GameState, both as a field_divider
+# separated line and as a compact state line.
+# Copy to the device (or run with the CircuitPython libraries on the host) and read the console.
+from time import monotonic_ns
+from gc import collect
+
+from core.game_state import BleStateDecoder, CompactStateDecoder, encode_compact_state
+
+ITERATIONS = 200
+PLAYER_COUNTS = (2, 6, 12)
+FIELD_DIVIDER = ';'
+FIELD_ORDER = ['sgtTimerMode','sgtState','sgtStateType','sgtColorHsv','sgtTurnTime','sgtPlayerTime','sgtTotalPlayTime','sgtTimeReminders','sgtPlayerSeats','sgtPlayerColorsHsv','sgtPlayerActions','sgtSeat','sgtName','sgtPlayerNames']
+COLORS = ['00ffff','15ffff','2affff','3fffff','55ffff','6affff','7fffff','95ffff','aaffff','bfffff','d5ffff','eaffff']
+
+def make_line(player_count: int) -> str:
+	seats = ','.join(str(seat) for seat in range(1, player_count+1))
+	colors = ','.join(COLORS[i % len(COLORS)] for i in range(player_count))
+	actions = ','.join('pr' if i == 0 else '' for i in range(player_count))
+	names = ','.join(f'Player {seat}' for seat in range(1, player_count+1))
+	return FIELD_DIVIDER.join(['cu','pl','mt','00ffff','42','120','3600','60,30',seats,colors,actions,'1','Player 1',names])
+
+def time_decode(decoder, line: str) -> float:
+	"Microseconds per decoded line."
+	decoder.decode(line, 0)
+	collect()
+	start_ns = monotonic_ns()
+	for _n in range(ITERATIONS):
+		decoder.decode(line, 0)
+	return (monotonic_ns() - start_ns) / ITERATIONS / 1000
+
+decoder = BleStateDecoder(FIELD_ORDER, FIELD_DIVIDER)
+compact_decoder = CompactStateDecoder()
+for player_count in PLAYER_COUNTS:
+	line = make_line(player_count)
+	state = decoder.decode(line, 0)
+	compact_line = encode_compact_state(state)
+	compact_state = compact_decoder.decode(compact_line, 0)
+	if [player.name for player in compact_state.players] != [player.name for player in state.players] or compact_state.name != state.name:
+		print(f'{player_count:>2} players: the names did not survive the compact line!')
+	print(f'{player_count:>2} players, {len(line):>3} chars: {time_decode(decoder, line):,.1f} us/line')
+	print(f'{player_count:>2} players, {len(compact_line):>3} chars compact ({len(line) / len(compact_line):.2f}x shorter): {time_decode(compact_decoder, compact_line):,.1f} us/line')
@@ -0,0 +1,51 @@
+# Compares how far off the unix time offset ends up, using the single lookup that was used before and
+# using ClockSync. The time server is played by a stand-in with a known offset and a random network
+# delay that answers in whole seconds, so no network is needed. Takes about half a minute.
+from time import monotonic, monotonic_ns, sleep
+from random import randint, seed
+
+from core.connection.clock_sync import ClockSync
+
+RUNS = 10
+SAMPLES = 4
+# The stand-in unix time is monotonic time plus this (in ms), so the offset should come out as minus this.
+TRUE_UNIX_MINUS_MONOTONIC_MS = 1700000000123
+DELAY_MS_MIN = 20
+DELAY_MS_MAX = 200
+
+class StandInResponse():
+	def __init__(self, reply: dict):
+		self.reply = reply
+	def __enter__(self):
+		return self
+	def __exit__(self, exception_type, exception_value, traceback):
+		return False
+	def json(self) -> dict:
+		return self.reply
+
+class StandInTimeServer():
+	"Plays the session and the time server, with a random delay on the way there and back."
+	def get(self, url: str) -> StandInResponse:
+		sleep(randint(DELAY_MS_MIN, DELAY_MS_MAX) / 2000)
+		unix_ms = monotonic_ns() // 1000000 + TRUE_UNIX_MINUS_MONOTONIC_MS
+		sleep(randint(DELAY_MS_MIN, DELAY_MS_MAX) / 2000)
+		return StandInResponse({'unixtime': unix_ms // 1000})
+
+def single_lookup_error_ms(server: StandInTimeServer) -> int:
+	"The way _lookup_unix_time_offset used to work: one request, with monotonic time rounded to the second."
+	with server.get('') as response:
+		now = round(monotonic())
+		time_unix_sec = response.json()['unixtime']
+	return (now - time_unix_sec) * 1000 + TRUE_UNIX_MINUS_MONOTONIC_MS
+
+seed(1)
+server = StandInTimeServer()
+single_errors = []
+sync_errors = []
+for _n in range(RUNS):
+	single_errors.append(abs(single_lookup_error_ms(server)))
+	clock = ClockSync(server, '', SAMPLES, 900.0)
+	clock.sync()
+	sync_errors.append(abs(clock.offset_ms + TRUE_UNIX_MINUS_MONOTONIC_MS))
+print(f'Single lookup: error avg {sum(single_errors) // RUNS}ms, max {max(single_errors)}ms')
+print(f'ClockSync ({SAMPLES} samples): error avg {sum(sync_errors) // RUNS}ms, max {max(sync_errors)}ms')
@@ -0,0 +1,38 @@
+# Measures the frame times of the two garbage collection policies of core.gc_policy, on a stand-in for
+# animating a 252 LED strip that also gets a new game state every few frames.
+# Copy to the device and read the console, as the collection times depend on the heap.
+from time import monotonic_ns
+import json
+
+import core.gc_policy as gc_policy
+
+FRAMES = 500
+PIXEL_COUNT = 252
+# A new state comes in every this many frames.
+STATE_EVERY = 50
+STATE = json.dumps({'ts': 1000, 'gameStateVersion': 7, 'timerMode': 'cu', 'state': 'pl', 'turnTime': 42, 'players': [{'seat': i+1, 'name': f'Player {i+1}', 'colorHsv': '00ffff', 'action': 'pr' if i == 0 else None} for i in range(6)]})
+
+def animate(frame: int) -> list:
+	"Allocates about as much as a frame of a pulsing seat line: a float and a color per pixel."
+	brightness = (frame % 60) / 60
+	return [(int(255 * brightness * i / PIXEL_COUNT), 0, 255) for i in range(PIXEL_COUNT)]
+
+def measure(policy: str):
+	gc_policy.configure(policy)
+	gc_policy.collect()
+	gc_policy.collections = gc_policy.collect_us_total = gc_policy.collect_us_max = 0
+	frame_us = []
+	for frame in range(FRAMES):
+		start_ns = monotonic_ns()
+		animate(frame)
+		gc_policy.on_frame()
+		if frame % STATE_EVERY == 0:
+			json.loads(STATE)
+			gc_policy.on_allocation_heavy()
+		frame_us.append((monotonic_ns() - start_ns) // 1000)
+	mean = sum(frame_us) / FRAMES
+	variance = sum((us - mean) ** 2 for us in frame_us) / FRAMES
+	print(f'{policy:>6}: mean={mean:,.0f}us stddev={variance ** 0.5:,.0f}us max={max(frame_us):,}us, {gc_policy.get_stats()}')
+
+for policy in (gc_policy.POLICY_FRAME, gc_policy.POLICY_BUDGET):
+	measure(policy)
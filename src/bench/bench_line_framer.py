@@ -0,0 +1,58 @@
+# Checks the LineFramer on the lines around the longest that fits, with the line arriving in one read
+# and in small notifications, and after a line that leaves the next one wrapping around the buffer.
+# Then times framing a 6-player state line. Runs on the host as well as on the device.
+from time import monotonic_ns
+
+from core.connection.line_framer import LineFramer
+
+SIZE = 64
+CHUNK_SIZE = 20
+ITERATIONS = 1000
+LINE = b'cu;pl;mt;00ffff;42;120;3600;60,30;1,2,3,4,5,6;00ffff,2affff,55ffff,7fffff,aaffff,d5ffff;pr,,,,,;1\n'
+
+class StreamStandIn():
+	"Hands out its data at most chunk_size bytes per read, like BLE notifications."
+	def __init__(self, data: bytes, chunk_size: int):
+		self.data = data
+		self.chunk_size = chunk_size
+
+	@property
+	def in_waiting(self) -> int:
+		return min(len(self.data), self.chunk_size)
+
+	def readinto(self, buf, nbytes: int) -> int:
+		nbytes = min(nbytes, len(self.data))
+		buf[0:nbytes] = self.data[0:nbytes]
+		self.data = self.data[nbytes:]
+		return nbytes
+
+def frame(framer: LineFramer, data: bytes, chunk_size: int) -> list[str]:
+	"Feed the data through the framer, taking each line as soon as it is complete."
+	stream = StreamStandIn(data, chunk_size)
+	lines = []
+	while len(stream.data) > 0:
+		framer.read_from(stream, 0)
+		line = framer.pop_line()
+		if line != None:
+			lines.append(line[1])
+	return lines
+
+def check(label: str, data: bytes, expected: list[str], chunk_size: int, framer: LineFramer|None = None):
+	framer = framer if framer != None else LineFramer(SIZE)
+	lines = frame(framer, data, chunk_size)
+	print(f'{"ok  " if lines == expected else "FAIL"} {label}, {chunk_size} byte reads: {[len(line) for line in lines]}')
+
+for chunk_size in (SIZE, CHUNK_SIZE, 1):
+	longest = 'a' * (SIZE - 1)
+	check(f'line of {SIZE - 1} bytes', (longest + '\n').encode(), [longest], chunk_size)
+	check(f'line of {SIZE} bytes, then a short one', ('b' * SIZE + '\nshort\n').encode(), ['short'], chunk_size)
+	framer = LineFramer(SIZE)
+	frame(framer, b'x' * 40 + b'\n' + b'y' * 10, chunk_size)
+	check(f'line of {SIZE - 1} bytes, wrapping around', ('z' * (SIZE - 11) + '\n').encode(), ['y' * 10 + 'z' * (SIZE - 11)], chunk_size, framer)
+
+framer = LineFramer(256)
+start_ns = monotonic_ns()
+for _n in range(ITERATIONS):
+	frame(framer, LINE, CHUNK_SIZE)
+elapsed_ns = monotonic_ns() - start_ns
+print(f'{len(LINE)} byte line in {CHUNK_SIZE} byte reads: {elapsed_ns / ITERATIONS / 1000:,.1f} us/line')
@@ -0,0 +1,45 @@
+# Plays back a recorded session (see SGT_RECORD_PATH) as fast as possible, and measures the time taken to
+# handle each message and to animate each frame. Runs on the host as well as on the device. Swap View
+# for the view of a device, with a stand-in for its pixels, to measure its rendering as well.
+from time import monotonic_ns
+
+import core.frame_clock as frame_clock
+from core.view.view import View
+from core.connection.sgt_connection_replay import SgtConnectionReplay
+
+REPLAY_PATH = 'sgt_session.log'
+# The speed to play back at. 0 is as fast as possible, 1 is as recorded.
+SPEED = 0
+FIELD_DIVIDER = ';'
+FIELD_ORDER = ['sgtTimerMode','sgtState','sgtStateType','sgtColorHsv','sgtTurnTime','sgtPlayerTime','sgtTotalPlayTime','sgtTimeReminders','sgtPlayerSeats','sgtPlayerColorsHsv','sgtPlayerActions','sgtSeat']
+
+def summary(label: str, times_ns: list[int]):
+	if len(times_ns) == 0:
+		print(f'{label:>8}: none')
+		return
+	times_ns.sort()
+	mean_us = sum(times_ns) / len(times_ns) / 1000
+	p95_us = times_ns[min(len(times_ns) - 1, len(times_ns) * 95 // 100)] / 1000
+	print(f'{label:>8}: n={len(times_ns)}, mean {mean_us:,.1f} us, p95 {p95_us:,.1f} us, max {times_ns[-1] / 1000:,.1f} us')
+
+for update_state_in_place in (False, True):
+	view = View()
+	connection = SgtConnectionReplay(view, REPLAY_PATH, SPEED, FIELD_ORDER, FIELD_DIVIDER, update_state_in_place)
+	connection.connect()
+	handle_ns = []
+	frame_ns = []
+	start_ns = monotonic_ns()
+	while not connection.is_done():
+		frame_clock.tick()
+		ts = monotonic_ns()
+		view.animate()
+		frame_ns.append(monotonic_ns() - ts)
+		connection.poll_for_new_messages()
+		ts = monotonic_ns()
+		if connection.handle_new_messages():
+			handle_ns.append(monotonic_ns() - ts)
+	elapsed_ns = monotonic_ns() - start_ns
+	connection.restart()
+	print(f'update_state_in_place={update_state_in_place}: {connection.replayed_count} messages in {elapsed_ns / 1000000:,.0f} ms, {connection.applied_state_updates} applied, {connection.skipped_state_updates} skipped')
+	summary('handle', handle_ns)
+	summary('animate', frame_ns)
@@ -0,0 +1,45 @@
+# Measures the heap allocated per received state, creating a new GameState per message versus
+# updating one long-lived GameState in place. Run on the device, as it relies on gc.mem_alloc.
+from gc import collect, disable, enable, mem_alloc
+import json
+
+from core.game_state import GameState, BleStateDecoder
+
+MESSAGES = 50
+PLAYER_COUNT = 6
+FIELD_DIVIDER = ';'
+FIELD_ORDER = ['sgtTimerMode','sgtState','sgtStateType','sgtColorHsv','sgtTurnTime','sgtPlayerTime','sgtTotalPlayTime','sgtTimeReminders','sgtPlayerSeats','sgtPlayerColorsHsv','sgtPlayerActions','sgtSeat']
+COLORS = ['00ffff','2affff','55ffff','7fffff','aaffff','d5ffff']
+
+def make_line(turn_time: int) -> str:
+	seats = ','.join(str(seat) for seat in range(1, PLAYER_COUNT+1))
+	colors = ','.join(COLORS[i % len(COLORS)] for i in range(PLAYER_COUNT))
+	actions = ','.join('pr' if i == 0 else '' for i in range(PLAYER_COUNT))
+	return FIELD_DIVIDER.join(['cu','pl','mt','00ffff',str(turn_time),'120','3600','60,30',seats,colors,actions,'1'])
+
+def make_json(turn_time: int) -> str:
+	players = [{'seat': i+1, 'name': f'Player {i+1}', 'colorHsv': COLORS[i % len(COLORS)], 'action': 'pr' if i == 0 else None} for i in range(PLAYER_COUNT)]
+	return json.dumps({'ts': 1000+turn_time, 'gameStateVersion': 7, 'timerMode': 'cu', 'state': 'pl', 'stateType': 'mt', 'turnTime': turn_time, 'playerTime': 120, 'totalPlayTime': 3600, 'name': 'Player 1', 'colorHsv': COLORS[0], 'seat': 1, 'players': players, 'actions': {'primary': {'action': 'game/primary', 'label': 'End Turn'}}})
+
+def measure(label: str, messages: list[str], handle: callable[[str], None]):
+	handle(messages[0])
+	collect()
+	disable()
+	before = mem_alloc()
+	for message in messages:
+		handle(message)
+	allocated = mem_alloc() - before
+	enable()
+	collect()
+	print(f'{label}: {allocated // len(messages):,} bytes/message')
+
+decoder = BleStateDecoder(FIELD_ORDER, FIELD_DIVIDER)
+lines = [make_line(n) for n in range(MESSAGES)]
+jsons = [make_json(n) for n in range(MESSAGES)]
+live_ble_state = GameState()
+live_json_state = GameState()
+
+measure('BLE, new state', lines, lambda line: decoder.decode(line, 0))
+measure('BLE, in place ', lines, lambda line: decoder.decode_into(live_ble_state, line, 0))
+measure('MQTT, new state', jsons, lambda message: GameState(message))
+measure('MQTT, in place ', jsons, lambda message: live_json_state.update(message))
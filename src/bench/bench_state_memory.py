@@ -0,0 +1,70 @@
+# Benchmark of the memory used by the state and render objects.
+# Run it on the device (copy it to the board and import it from the REPL), as the object layout of CircuitPython
+# differs from CPython. On the host, run it from the src folder with the CircuitPython libraries installed:
+# python -m bench.bench_state_memory
+import gc
+try:
+	import tracemalloc
+except ImportError:
+	# CircuitPython has no tracemalloc. The free heap is measured instead, after a collection, so the
+	# garbage made while decoding does not count.
+	tracemalloc = None
+
+from core.game_state import GameState, Player, Action, CurrentTimes, BleStateDecoder
+from core.color import DisplayedColor, WHITE
+
+# Few enough to fit in the heap of a device.
+INSTANCES = 100
+PLAYER_COUNTS = (2, 6, 12)
+FIELD_DIVIDER = ';'
+FIELD_ORDER = ['sgtTimerMode','sgtState','sgtStateType','sgtColorHsv','sgtTurnTime','sgtPlayerTime','sgtTotalPlayTime','sgtTimeReminders','sgtPlayerSeats','sgtPlayerColorsHsv','sgtPlayerActions','sgtSeat']
+COLORS = ['00ffff','15ffff','2affff','3fffff','55ffff','6affff','7fffff','95ffff','aaffff','bfffff','d5ffff','eaffff']
+
+def bytes_per_instance(create):
+	create()
+	instances = [None] * INSTANCES
+	if tracemalloc != None:
+		tracemalloc.start()
+		before = tracemalloc.get_traced_memory()[0]
+		for n in range(INSTANCES):
+			instances[n] = create()
+		allocated = tracemalloc.get_traced_memory()[0] - before
+		tracemalloc.stop()
+	else:
+		gc.collect()
+		before = gc.mem_free()
+		for n in range(INSTANCES):
+			instances[n] = create()
+		gc.collect()
+		allocated = before - gc.mem_free()
+	return allocated // INSTANCES
+
+def make_line(player_count: int) -> str:
+	seats = ','.join(str(seat) for seat in range(1, player_count+1))
+	colors = ','.join(COLORS[i % len(COLORS)] for i in range(player_count))
+	actions = ','.join('pr' if i == 0 else '' for i in range(player_count))
+	return FIELD_DIVIDER.join(['cu','pl','mt','00ffff','42','120','3600','60,30',seats,colors,actions,'1'])
+
+objects = [
+	('GameState', lambda: GameState()),
+	('Player', lambda: Player()),
+	('Action', lambda: Action({'action': 'game/primary', 'label': 'End Turn'})),
+	('CurrentTimes', lambda: CurrentTimes(0, 1.0, 2.0, 3.0)),
+	('DisplayedColor', lambda: DisplayedColor(WHITE.fancy, 0.5)),
+]
+try:
+	from table.seated_animation.seated_animation import Line, LineTransition
+	objects.append(('Line', lambda: Line(0, 42, WHITE.dim)))
+	objects.append(('LineTransition', lambda: LineTransition(Line(0, 42, WHITE.dim), [])))
+except ImportError as e:
+	print(f'Skipping Line and LineTransition: {e}')
+
+for name, create in objects:
+	print(f'{name:>15}: {bytes_per_instance(create):>5,} bytes')
+
+decoder = BleStateDecoder(FIELD_ORDER, FIELD_DIVIDER)
+for player_count in PLAYER_COUNTS:
+	line = make_line(player_count)
+	# Decoded twice, so that the player colors are already in the color cache.
+	decoder.decode(line, 0)
+	print(f'{player_count:>2} player state: {bytes_per_instance(lambda: decoder.decode(line, 0)):>5,} bytes')
@@ -0,0 +1,584 @@
+# A stand-in for SGT, to run on the host. It plays a game and serves it to the devices, so the connections
+# can be tried out and load-tested without the app. It serves:
+#  - MQTT, as a minimal broker (plain TCP, QoS 0) on the given port. Point MQTT_HOST and MQTT_PORT at the
+#    host, set MQTT_SSL = 0 and set MQTT_SGT_USER_ID to the --user-id. Run time_server.py as well and point
+#    TIME_SYNC_URL at it, as the states carry unix times.
+#  - BLE UART, as a pseudo-terminal that behaves like the Nordic UART service of SGT's BLE connection: lines
+#    sent in 20 byte notifications, with ACKs. Its path is printed on start. Open it as a serial port (with
+#    in_waiting, readinto, write and reset_input_buffer) and hand that to the BLE connection in place of
+#    its UARTService. The field order is taken from the reply to GET SETUP, so it follows the device.
+#
+# Run: python3 sgt_simulator.py --players 6 [--mqtt-port 1883] [--no-ble] [--interval 5] [--latency 50] [--loss 0.05]
+# The commands follow the checks of SgtConnection.enqueue_send_*. Commands sent over MQTT against an old
+# gameStateVersion are rejected, as SGT does.
+import argparse
+import colorsys
+import json
+import os
+import random
+import re
+import selectors
+import socket
+import time
+
+parser = argparse.ArgumentParser(description='SGT stand-in serving MQTT and BLE UART.')
+parser.add_argument('--players', type=int, default=4, help='number of players seated at the start')
+parser.add_argument('--timer-mode', default='cu', choices=('cu', 'cd', 'nt'), help='timer mode of the game')
+parser.add_argument('--mqtt-port', type=int, default=1883, help='port of the MQTT broker, 0 for none')
+parser.add_argument('--user-id', default='sim', help='the SGT user id, the topics are <user-id>/game and <user-id>/commands')
+parser.add_argument('--no-ble', action='store_true', help='do not open a pseudo-terminal for BLE UART')
+parser.add_argument('--interval', type=float, default=10.0, help='seconds between resends of the state, 0 for none')
+parser.add_argument('--latency', type=float, default=0.0, help='ms added to the delivery of every command and state')
+parser.add_argument('--loss', type=float, default=0.0, help='chance (0-1) of dropping a command or state')
+parser.add_argument('--seed', type=int, default=None, help='seed for the injected losses, to repeat a run')
+args = parser.parse_args()
+random.seed(args.seed)
+
+BLE_CHUNK_SIZE = 20
+# Time between two BLE notifications.
+BLE_NOTIFY_SECONDS = 0.0075
+# Used until the device has answered GET SETUP.
+DEFAULT_FIELD_DIVIDER = ';'
+DEFAULT_FIELD_ORDER = ['sgtTimerMode','sgtState','sgtStateType','sgtColorHsv','sgtTurnTime','sgtPlayerTime','sgtTotalPlayTime','sgtTimeReminders','sgtPlayerSeats','sgtPlayerColorsHsv','sgtPlayerActions','sgtSeat']
+COLORS_HSV = ['00ffff', '2affff', '55ffff', '7fffff', 'aaffff', 'd5ffff', '15ffff', '40ffff', '6affff', '95ffff', 'bfffff', 'eaffff']
+
+def hsv_to_rgb(hsv: str) -> str:
+	(r, g, b) = colorsys.hsv_to_rgb(int(hsv[0:2], 16) / 255, int(hsv[2:4], 16) / 255, int(hsv[4:6], 16) / 255)
+	return f'{round(r*255):02x}{round(g*255):02x}{round(b*255):02x}'
+
+class SimGame():
+	"The game, with the rules SgtConnection checks commands against. Every accepted command counts the version up."
+	def __init__(self, player_count: int, timer_mode: str):
+		self.version = 0
+		self.timer_mode = timer_mode
+		self.state = 'st'
+		self.state_type = 'bg'
+		self.players = [self._new_player(seat) for seat in range(1, player_count + 1)]
+		self.seat = []
+		# The states to go back to after admin time, pause or a simultaneous turn, latest last.
+		self.resume_states = []
+		self.ts_turn_start = time.time()
+		self.player_time = {}
+		self.total_play_time = 0
+		self.passed = set()
+		self.history = []
+		self.accepted = 0
+		self.rejected = 0
+
+	def _new_player(self, seat: int) -> dict:
+		return {'seat': seat, 'name': f'Player {seat}', 'colorHsv': COLORS_HSV[(seat - 1) % len(COLORS_HSV)], 'action': None}
+
+	def get_player(self, seat: int|None) -> dict|None:
+		for player in self.players:
+			if player['seat'] == seat:
+				return player
+		return None
+
+	def active_player(self) -> dict|None:
+		return self.get_player(self.seat[0]) if len(self.seat) == 1 else None
+
+	def turn_time(self) -> int:
+		return int(time.time() - self.ts_turn_start)
+
+	def timings(self) -> tuple[int, int, int]:
+		"Turn time, player time and total play time, as of now."
+		turn_time = self.turn_time()
+		player = self.active_player()
+		player_time = self.player_time.get(player['seat'], 0) if player != None else 0
+		total_play_time = self.total_play_time
+		if self.state == 'pl':
+			player_time += turn_time
+			total_play_time += turn_time
+		return (turn_time, player_time, total_play_time)
+
+	def _snapshot(self) -> str:
+		return json.dumps([self.state, self.state_type, self.players, self.seat, self.resume_states, self.ts_turn_start, self.player_time, self.total_play_time, list(self.passed)])
+
+	def _restore(self, snapshot: str):
+		(self.state, self.state_type, self.players, self.seat, self.resume_states, self.ts_turn_start, player_time, self.total_play_time, passed) = json.loads(snapshot)
+		self.player_time = {int(seat): seconds for seat, seconds in player_time.items()}
+		self.passed = set(passed)
+
+	def _end_turn(self):
+		"Book the time of the turn that ends now, and start the next one."
+		turn_time = self.turn_time()
+		if self.state == 'pl':
+			player = self.active_player()
+			if player != None:
+				self.player_time[player['seat']] = self.player_time.get(player['seat'], 0) + turn_time
+			self.total_play_time += turn_time
+		self.ts_turn_start = time.time()
+
+	def _set_active(self, player: dict):
+		for other in self.players:
+			other['action'] = None
+		player['action'] = 'pr'
+		self.seat = [player['seat']]
+
+	def _next_player(self):
+		active = self.active_player()
+		index = self.players.index(active)
+		for n in range(1, len(self.players) + 1):
+			player = self.players[(index + n) % len(self.players)]
+			if player['seat'] not in self.passed:
+				self._set_active(player)
+				self.state_type = 'mt'
+				return
+		# Everyone has passed. Start a new round with the first player.
+		self.passed = set()
+		self._set_active(self.players[0])
+		self.state_type = 'er'
+
+	def _start(self, seats: list[int]|None, first_seat: int|None):
+		if seats != None:
+			self.players = [self.get_player(seat) for seat in seats]
+		elif first_seat != None:
+			index = self.players.index(self.get_player(first_seat))
+			self.players = self.players[index:] + self.players[:index]
+		self.state = 'pl'
+		self.state_type = 'mt'
+		self.player_time = {}
+		self.total_play_time = 0
+		self.passed = set()
+		self.ts_turn_start = time.time()
+		self._set_active(self.players[0])
+
+	def _enter(self, state: str, state_type: str):
+		"Go into admin time or pause, to come back to the current state later."
+		self._end_turn()
+		self.resume_states.append((self.state, self.state_type, self.seat))
+		self.state = state
+		self.state_type = state_type
+
+	def _resume(self):
+		self._end_turn()
+		(self.state, self.state_type, self.seat) = self.resume_states.pop()
+
+	def apply(self, action: str, seat: int|None = None, seats: list[int]|None = None) -> bool:
+		"Carry out a command. Returns false if it does not apply to the game as it is."
+		snapshot = self._snapshot()
+		accepted = self._apply(action, seat, seats)
+		if accepted:
+			if action != 'Undo':
+				self.history.append(snapshot)
+			self.version += 1
+			self.accepted += 1
+		else:
+			self.rejected += 1
+		return accepted
+
+	def _apply(self, action: str, seat: int|None, seats: list[int]|None) -> bool:
+		state = self.state
+		active = self.active_player()
+		if action == 'Primary':
+			if state == 'pl':
+				if seat != None and (active == None or seat != active['seat']):
+					return False
+				self._end_turn()
+				self._next_player()
+			elif state == 'si':
+				# Each player ends their part of the simultaneous turn. The turn ends when all have.
+				done = seat if seat != None else (self.seat[0] if len(self.seat) > 0 else None)
+				if done not in self.seat:
+					return False
+				self.get_player(done)['action'] = 'in'
+				self.seat = [s for s in self.seat if s != done]
+				if len(self.seat) == 0:
+					self._resume()
+					self._set_active(self.get_player(self.seat[0]))
+			elif state in ('ad', 'pa'):
+				self._resume()
+			else:
+				return False
+		elif action == 'Secondary':
+			if state != 'pl' or active == None or (seat != None and seat != active['seat']):
+				return False
+			# Pass for the rest of the round.
+			self.passed.add(active['seat'])
+			self._end_turn()
+			self._next_player()
+		elif action in ('ToggleAdmin', 'TurnAdminOn', 'TurnAdminOff'):
+			if state == 'ad' and action != 'TurnAdminOn':
+				self._resume()
+			elif state in ('pl', 'si') and action != 'TurnAdminOff':
+				self._enter('ad', 'mt')
+			else:
+				return False
+		elif action in ('TogglePause', 'TurnPauseOn', 'TurnPauseOff'):
+			if state == 'pa' and action != 'TurnPauseOn':
+				self._resume()
+			elif state not in ('st', 'en', 'pa') and action != 'TurnPauseOff':
+				self._enter('pa', self.state_type)
+			else:
+				return False
+		elif action == 'Undo':
+			if state in ('st', 'en') or len(self.history) == 0:
+				return False
+			self._restore(self.history.pop())
+		elif action == 'StartGame':
+			if state != 'st' or len(self.players) == 0:
+				return False
+			if seats != None and sorted(seats) != sorted(player['seat'] for player in self.players):
+				return False
+			if seat != None and self.get_player(seat) == None:
+				return False
+			self._start(seats, seat)
+		elif action == 'Reorder':
+			if state not in ('st', 'pl') or seats == None or sorted(seats) != sorted(player['seat'] for player in self.players):
+				return False
+			self.players = [self.get_player(s) for s in seats]
+		elif action == 'StartSimTurn':
+			if state != 'pl' or seats == None or len(seats) == 0:
+				return False
+			self._enter('si', 'ms')
+			for player in self.players:
+				player['action'] = 'pr' if player['seat'] in seats else None
+			self.seat = [s for s in seats if self.get_player(s) != None]
+		elif action == 'AddHotseatPlayer':
+			if state != 'st' or seat == None or self.get_player(seat) != None:
+				return False
+			self.players.append(self._new_player(seat))
+		elif action == 'CyclePlayerColor':
+			player = self.get_player(seat)
+			if state != 'st' or player == None:
+				return False
+			player['colorHsv'] = COLORS_HSV[(COLORS_HSV.index(player['colorHsv']) + 1) % len(COLORS_HSV)]
+		elif action == 'RemovePlayer':
+			player = self.get_player(seat)
+			if state != 'st' or player == None:
+				return False
+			self.players.remove(player)
+		else:
+			return False
+		return True
+
+	def color_hsv(self) -> str:
+		active = self.active_player()
+		return active['colorHsv'] if active != None else 'ffffff'
+
+	def to_json(self) -> str:
+		(turn_time, player_time, total_play_time) = self.timings()
+		active = self.active_player()
+		return json.dumps({
+			'ts': int(time.time()),
+			'gameStateVersion': self.version,
+			'timerMode': self.timer_mode,
+			'state': self.state,
+			'stateType': self.state_type,
+			'turnTime': turn_time,
+			'playerTime': player_time,
+			'totalPlayTime': total_play_time,
+			'name': active['name'] if active != None else None,
+			'colorHsv': self.color_hsv(),
+			'seat': self.seat,
+			'players': self.players,
+			'actions': {'primary': {'action': 'game/primary', 'label': 'End Turn'}} if self.state == 'pl' else {},
+		})
+
+	def to_line(self, field_order: list[str], field_divider: str) -> str:
+		(turn_time, player_time, total_play_time) = self.timings()
+		active = self.active_player()
+		values = {
+			'sgtGameStateVersion': str(self.version),
+			'sgtTimerMode': self.timer_mode,
+			'sgtState': self.state,
+			'sgtStateType': self.state_type,
+			'sgtTurnTime': str(turn_time),
+			'sgtPlayerTime': str(player_time),
+			'sgtTotalPlayTime': str(total_play_time),
+			'sgtTimeReminders': '',
+			'sgtName': active['name'] if active != None else '',
+			'sgtSeat': ','.join(str(s) for s in self.seat),
+			'sgtColorHsv': self.color_hsv(),
+			'sgtColor': hsv_to_rgb(self.color_hsv()),
+			'sgtPlayerSeats': ','.join(str(player['seat']) for player in self.players),
+			'sgtPlayerNames': ','.join(player['name'] for player in self.players),
+			'sgtPlayerActions': ','.join(player['action'] or '' for player in self.players),
+			'sgtPlayerColorsHsv': ','.join(player['colorHsv'] for player in self.players),
+			'sgtPlayerColors': ','.join(hsv_to_rgb(player['colorHsv']) for player in self.players),
+		}
+		return field_divider.join(values.get(field, '') for field in field_order)
+
+class Simulator():
+	"Runs the game, the MQTT broker and the BLE UART on one thread, with timers for the injected latency."
+	def __init__(self):
+		self.game = SimGame(args.players, args.timer_mode)
+		self.selector = selectors.DefaultSelector()
+		self.timers = []
+		self.dropped = 0
+		self.published = 0
+		self.mqtt_clients = {}
+		self.topic_game = f'{args.user_id}/game'
+		self.topic_commands = f'{args.user_id}/commands'
+		if args.mqtt_port > 0:
+			server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+			server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+			server.bind(('', args.mqtt_port))
+			server.listen()
+			server.setblocking(False)
+			self.selector.register(server, selectors.EVENT_READ, self._accept_mqtt)
+			print(f'MQTT broker on port {args.mqtt_port}, topics {self.topic_game} and {self.topic_commands}')
+		self.uart_fd = None
+		if not args.no_ble:
+			self._open_uart()
+		if args.interval > 0:
+			self.at(args.interval, self._resend)
+
+	# ---- Timers and injected faults ----
+
+	def at(self, delay: float, callback):
+		self.timers.append((time.monotonic() + delay, callback))
+
+	def deliver(self, callback):
+		"Run the callback after the injected latency, unless it is lost."
+		if random.random() < args.loss:
+			self.dropped += 1
+			return
+		if args.latency > 0:
+			self.at(args.latency / 1000, callback)
+		else:
+			callback()
+
+	def run(self):
+		while True:
+			now = time.monotonic()
+			due = [timer for timer in self.timers if timer[0] <= now]
+			self.timers = [timer for timer in self.timers if timer[0] > now]
+			for (_ts, callback) in sorted(due, key=lambda timer: timer[0]):
+				callback()
+			timeout = min((timer[0] for timer in self.timers), default=now + 1) - time.monotonic()
+			for (key, _mask) in self.selector.select(max(0, timeout)):
+				key.data(key.fileobj)
+
+	def _resend(self):
+		self.publish_state()
+		self.at(args.interval, self._resend)
+
+	def on_command(self, action: str, seat: int|None, seats: list[int]|None, version: int|None):
+		if version != None and version != self.game.version:
+			self.game.rejected += 1
+			print(f'Rejected {action}: version {version} is not {self.game.version}')
+			return
+		if self.game.apply(action, seat, seats):
+			print(f'{action} seat={seat} seats={seats} -> v{self.game.version} {self.game.state}/{self.game.state_type} seat={self.game.seat}')
+		else:
+			print(f'Rejected {action} seat={seat} seats={seats} in {self.game.state}')
+		# SGT sends the state after every command, changed or not.
+		self.publish_state()
+
+	def publish_state(self):
+		self.published += 1
+		if len(self.mqtt_clients) > 0:
+			message = self.game.to_json().encode('utf-8')
+			for client in list(self.mqtt_clients.values()):
+				if self.topic_game in client.topics:
+					self.deliver(lambda client=client: client.publish(self.topic_game, message))
+		if self.uart_fd != None:
+			self.deliver(lambda: self.uart_send(self.game.to_line(self.field_order, self.field_divider)))
+
+	# ---- MQTT ----
+
+	def _accept_mqtt(self, server: socket.socket):
+		(conn, address) = server.accept()
+		conn.setblocking(False)
+		self.mqtt_clients[conn] = MqttClient(self, conn)
+		self.selector.register(conn, selectors.EVENT_READ, self._read_mqtt)
+		print(f'MQTT client connected from {address[0]}')
+
+	def _read_mqtt(self, conn: socket.socket):
+		client = self.mqtt_clients[conn]
+		try:
+			data = conn.recv(4096)
+		except (ConnectionError, BlockingIOError):
+			data = b''
+		if len(data) == 0 or not client.feed(data):
+			self.close_mqtt(conn)
+
+	def close_mqtt(self, conn: socket.socket):
+		if conn in self.mqtt_clients:
+			del self.mqtt_clients[conn]
+			self.selector.unregister(conn)
+			conn.close()
+			print('MQTT client disconnected')
+
+	def on_mqtt_command(self, payload: bytes):
+		try:
+			command = json.loads(payload)
+		except ValueError:
+			print(f'Not a command: {payload}')
+			return
+		seat = command.get('seat', command.get('firstPlayerSeat'))
+		seats = command.get('seats', command.get('playerOrderAsSeats'))
+		self.deliver(lambda: self.on_command(command.get('action'), seat, seats, command.get('gameStateVersion')))
+
+	# ---- BLE UART ----
+
+	def _open_uart(self):
+		import tty
+		(self.uart_fd, slave_fd) = os.openpty()
+		tty.setraw(slave_fd)
+		os.set_blocking(self.uart_fd, False)
+		self.uart_slave_fd = slave_fd
+		self.uart_in = b''
+		self.uart_out = b''
+		self.uart_ack_enabled = False
+		self.uart_ack_window = 0
+		self.uart_unacknowledged = 0
+		self.uart_waiting = False
+		self.uart_pumping = False
+		self.field_order = DEFAULT_FIELD_ORDER
+		self.field_divider = DEFAULT_FIELD_DIVIDER
+		self.selector.register(self.uart_fd, selectors.EVENT_READ, self._read_uart)
+		print(f'BLE UART on {os.ttyname(slave_fd)}')
+		self.uart_send('GET SETUP')
+
+	def _read_uart(self, fd: int):
+		try:
+			self.uart_in += os.read(fd, 4096)
+		except (BlockingIOError, OSError):
+			return
+		while b'\n' in self.uart_in:
+			(line, self.uart_in) = self.uart_in.split(b'\n', 1)
+			self._on_uart_line(line.decode('utf-8').strip())
+
+	def _on_uart_line(self, line: str):
+		if line == 'ACK':
+			self.uart_unacknowledged = 0
+			self.uart_waiting = False
+			self._pump_uart()
+		elif line == 'Ping' or line == 'Poll':
+			self.publish_state()
+		elif line.startswith('Enable ACK'):
+			self.uart_ack_enabled = True
+			self.uart_ack_window = int(line.split('#')[1]) if '#' in line else 0
+			print(f'BLE ACKs enabled, window {self.uart_ack_window}')
+		elif line.startswith('{'):
+			self._on_uart_setup(json.loads(line))
+		elif len(line) > 0:
+			(action, _hash, arguments) = line.partition(' #')
+			numbers = [int(n) for n in arguments.split(',')] if arguments else []
+			# A list of seats is the turn order, or the players of a simultaneous turn. A single one is a seat.
+			if action in ('StartSimTurn', 'Reorder') or (action == 'StartGame' and len(numbers) > 1):
+				self.deliver(lambda: self.on_command(action, None, numbers, None))
+			else:
+				self.deliver(lambda: self.on_command(action, numbers[0] if len(numbers) > 0 else None, None, None))
+
+	def _on_uart_setup(self, suggestions: dict):
+		"Take the field order from the write script the device suggests."
+		script = suggestions['script'][0].replace('%0A', '\n').split('\n')[1]
+		fields = re.findall(r'sgt[A-Za-z]+', script)
+		if len(fields) > 1:
+			self.field_order = fields
+			self.field_divider = script[len(fields[0]):script.index(fields[1])]
+		print(f'BLE field order: {self.field_divider.join(self.field_order)}')
+
+	def uart_send(self, line: str):
+		self.uart_out += (line + '\n').encode('utf-8')
+		if not self.uart_pumping:
+			self._pump_uart()
+
+	def _pump_uart(self):
+		"Send the next notification, if not waiting for an ACK, and schedule the one after it."
+		self.uart_pumping = False
+		if len(self.uart_out) == 0 or self.uart_waiting:
+			return
+		chunk = self.uart_out[:BLE_CHUNK_SIZE]
+		self.uart_out = self.uart_out[BLE_CHUNK_SIZE:]
+		os.write(self.uart_fd, chunk)
+		if self.uart_ack_enabled:
+			self.uart_unacknowledged += len(chunk)
+			self.uart_waiting = self.uart_ack_window == 0 or self.uart_unacknowledged >= self.uart_ack_window or chunk.endswith(b'\n')
+		if not self.uart_waiting:
+			self.uart_pumping = True
+			self.at(BLE_NOTIFY_SECONDS, self._pump_uart)
+
+class MqttClient():
+	"One client of the broker. Speaks just enough MQTT 3.1.1 for adafruit_minimqtt: QoS 0 and 1, no wildcards."
+	def __init__(self, simulator: Simulator, conn: socket.socket):
+		self.simulator = simulator
+		self.conn = conn
+		self.buffer = b''
+		self.topics = set()
+
+	def feed(self, data: bytes) -> bool:
+		"Handle the complete packets received. Returns false if the client disconnected."
+		self.buffer += data
+		while len(self.buffer) >= 2:
+			(length, header_size) = self._read_length()
+			if length == None or len(self.buffer) < header_size + length:
+				return True
+			packet_type = self.buffer[0] >> 4
+			flags = self.buffer[0] & 15
+			body = self.buffer[header_size:header_size + length]
+			self.buffer = self.buffer[header_size + length:]
+			if not self._handle(packet_type, flags, body):
+				return False
+		return True
+
+	def _read_length(self) -> tuple[int|None, int]:
+		length = 0
+		for i in range(1, min(5, len(self.buffer))):
+			length |= (self.buffer[i] & 127) << (7 * (i - 1))
+			if self.buffer[i] & 128 == 0:
+				return (length, i + 1)
+		return (None, 0)
+
+	def _send(self, packet_type: int, body: bytes):
+		length = len(body)
+		header = bytearray([packet_type])
+		while True:
+			byte = length & 127
+			length >>= 7
+			header.append(byte | (128 if length > 0 else 0))
+			if length == 0:
+				break
+		try:
+			self.conn.sendall(bytes(header) + body)
+		except (ConnectionError, BlockingIOError):
+			self.simulator.close_mqtt(self.conn)
+
+	def publish(self, topic: str, payload: bytes):
+		encoded = topic.encode('utf-8')
+		self._send(0x30, len(encoded).to_bytes(2, 'big') + encoded + payload)
+
+	def _handle(self, packet_type: int, flags: int, body: bytes) -> bool:
+		if packet_type == 1:
+			# CONNECT. Accept anyone.
+			self._send(0x20, b'\x00\x00')
+		elif packet_type == 3:
+			# PUBLISH
+			topic_length = int.from_bytes(body[0:2], 'big')
+			topic = body[2:2 + topic_length].decode('utf-8')
+			payload_start = 2 + topic_length
+			qos = (flags >> 1) & 3
+			if qos > 0:
+				self._send(0x40, body[payload_start:payload_start + 2])
+				payload_start += 2
+			if topic == self.simulator.topic_commands:
+				self.simulator.on_mqtt_command(body[payload_start:])
+		elif packet_type == 8:
+			# SUBSCRIBE. Send the latest state right away, like a retained message.
+			i = 2
+			granted = b''
+			while i < len(body):
+				topic_length = int.from_bytes(body[i:i + 2], 'big')
+				self.topics.add(body[i + 2:i + 2 + topic_length].decode('utf-8'))
+				i += 2 + topic_length + 1
+				granted += b'\x00'
+			self._send(0x90, body[0:2] + granted)
+			if self.simulator.topic_game in self.topics:
+				self.publish(self.simulator.topic_game, self.simulator.game.to_json().encode('utf-8'))
+		elif packet_type == 12:
+			# PINGREQ
+			self._send(0xD0, b'')
+		elif packet_type == 14:
+			# DISCONNECT
+			return False
+		return True
+
+simulator = Simulator()
+try:
+	simulator.run()
+except KeyboardInterrupt:
+	game = simulator.game
+	print(f'\n{game.accepted} commands accepted, {game.rejected} rejected, {simulator.published} states published, {simulator.dropped} messages dropped')
@@ -0,0 +1,31 @@
+# A stand-in for the time server, to run on the host. Point TIME_SYNC_URL at it, e.g.
+#   TIME_SYNC_URL = "http://192.168.1.10:8123/"
+# and run: python3 time_server.py [port] [extra delay in ms]
+# It answers like the real one, plus the time in milliseconds, unless started with --seconds-only.
+import json
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+PORT = int(args[0]) if len(args) > 0 else 8123
+DELAY_MS = int(args[1]) if len(args) > 1 else 0
+SECONDS_ONLY = '--seconds-only' in sys.argv
+
+class TimeHandler(BaseHTTPRequestHandler):
+	def do_GET(self):
+		time.sleep(DELAY_MS / 2000)
+		unix_ms = time.time_ns() // 1000000
+		time.sleep(DELAY_MS / 2000)
+		reply = {'unixtime': unix_ms // 1000}
+		if not SECONDS_ONLY:
+			reply['unixtime_ms'] = unix_ms
+		body = json.dumps(reply).encode('utf-8')
+		self.send_response(200)
+		self.send_header('Content-Type', 'application/json')
+		self.send_header('Content-Length', str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+
+print(f'Serving the time on port {PORT}')
+HTTPServer(('', PORT), TimeHandler).serve_forever()
@@ -0,0 +1,168 @@
+import adafruit_logging as logging
+log = logging.getLogger()
+import asyncio
+from time import monotonic
+
+import core.frame_clock as frame_clock
+import core.frame_pacer as frame_pacer
+import core.latency as latency
+import core.gc_policy as gc_policy
+from core.loop import send_reorder_when_settled
+from core.utils.settings import get_float
+from core.scheduler import PRIORITY_LOW
+from core.utils.log import log_memory_usage, log_exception
+from core.connection.sgt_connection import SgtConnection
+from core.view.view import View
+
+# Frames per second to render at while the view is animating.
+ASYNC_RENDER_FPS = get_float('ASYNC_RENDER_FPS', 30.0)
+# Frames per second to render at while the view is standing still. A new state or a button press renders at once.
+ASYNC_IDLE_RENDER_FPS = get_float('ASYNC_IDLE_RENDER_FPS', 5.0)
+# Seconds between scans of the buttons. Bounds the time from a press until its callback runs.
+ASYNC_BUTTON_SCAN_INTERVAL = get_float('ASYNC_BUTTON_SCAN_INTERVAL', 0.01)
+# Seconds between polls of the connection. The polls do not wait for messages, so the other tasks run meanwhile.
+ASYNC_READ_INTERVAL = get_float('ASYNC_READ_INTERVAL', 0.02)
+# Seconds between checks for commands to send, unless a button press wakes the sender up earlier.
+ASYNC_SEND_INTERVAL = get_float('ASYNC_SEND_INTERVAL', 0.1)
+
+class AsyncSession():
+	"""The tasks that run while connected, and what they share.
+	asyncio has no task priorities, so the priorities are expressed in how often the tasks run and how they
+	wake each other up. The button scanner runs most often, and wakes the sender and the renderer when a
+	button is busy. The renderer sleeps out the rest of its frame, but is woken up by a new state. The reader
+	polls without waiting, then sleeps, so a quiet connection does not hold up the others. Every task yields
+	once per round, so none of them holds up the others for longer than one round of its own.
+	"""
+	def __init__(self, connection: SgtConnection, view: View, loops: tuple[callable[[None], bool]]):
+		self.connection = connection
+		self.view = view
+		self.loops = loops
+		self.running = True
+		self.view_busy = False
+		self.render_requested = False
+		self.send_requested = False
+
+	async def run(self):
+		tasks = [
+			asyncio.create_task(self.render()),
+			asyncio.create_task(self.scan_buttons()),
+			asyncio.create_task(self.send()),
+			asyncio.create_task(self.read()),
+		]
+		try:
+			await asyncio.gather(*tasks)
+		finally:
+			self.running = False
+			for task in tasks:
+				task.cancel()
+
+	async def render(self):
+		while self.running:
+			frame_clock.tick()
+			frame_pacer.start_frame()
+			self.view_busy = self.view.animate()
+			latency.on_frame()
+			gc_policy.on_frame()
+			frame_seconds = frame_pacer.get_frame_seconds(self.view_busy, 1 / ASYNC_RENDER_FPS, 1 / ASYNC_IDLE_RENDER_FPS)
+			delay = frame_seconds - (monotonic() - frame_clock.now)
+			self.render_requested = False
+			await self.sleep_unless(lambda: self.render_requested, delay)
+
+	async def scan_buttons(self):
+		while self.running:
+			busy = False
+			for loop in self.loops:
+				# As in main_loop, low priority tasks wait while the view is animating.
+				if self.view_busy and getattr(loop, 'priority', None) == PRIORITY_LOW:
+					continue
+				if loop():
+					busy = True
+			if busy:
+				self.render_requested = True
+				self.send_requested = True
+			await asyncio.sleep(ASYNC_BUTTON_SCAN_INTERVAL)
+
+	async def send(self):
+		while self.running:
+			send_reorder_when_settled(self.connection, self.view)
+			self.connection.send_command()
+			self.send_requested = False
+			await self.sleep_unless(lambda: self.send_requested, ASYNC_SEND_INTERVAL)
+
+	async def read(self):
+		while self.running:
+			if not self.connection.is_connected():
+				self.running = False
+				break
+			# Polling must not block, or it holds up the buttons and the renderer. The wait is done here instead.
+			self.connection.poll_for_new_messages(self.view_busy, 0)
+			if self.connection.handle_new_messages():
+				gc_policy.on_allocation_heavy()
+				log_memory_usage('After Game State Update')
+				self.render_requested = True
+			await asyncio.sleep(ASYNC_READ_INTERVAL)
+
+	async def sleep_unless(self, is_requested: callable[[None], bool], seconds: float):
+		"""Sleep for the given seconds, but wake up early once is_requested returns true. Checks as often as
+		the buttons are scanned, which is what sets the requests. Cheaper than an Event with a timeout,
+		which starts a new task for every wait."""
+		ts_end = monotonic() + seconds
+		while True:
+			remaining = ts_end - monotonic()
+			if remaining <= 0 or is_requested():
+				await asyncio.sleep(0)
+				return
+			await asyncio.sleep(min(remaining, ASYNC_BUTTON_SCAN_INTERVAL))
+
+async def animate_until_connected(connection: SgtConnection, view: View):
+	# Not a task of its own: the BLE connection does its handshake inside is_connected, and blocks the event
+	# loop until SGT answers the first ping, animating the view itself meanwhile. The handshake is done
+	# here, before the session tasks start, so no button is scanned during it, just as with main_loop.
+	while not connection.is_connected():
+		frame_clock.tick()
+		view.animate()
+		gc_policy.on_frame()
+		await asyncio.sleep(1 / ASYNC_RENDER_FPS)
+
+def async_main_loop(
+		connection: SgtConnection,
+		view: View,
+		on_connect: callable[[None], None] = None,
+		on_error: callable[[Exception], None] = None,
+		loops: tuple[callable[[None], bool]] = (),
+		):
+	"""Same as main_loop, but once connected, the connection reader, the command sender, the button scanner and
+	the renderer run as separate asyncio tasks. See AsyncSession. Needs the asyncio library on the device.
+	The connection is polled without waiting, every ASYNC_READ_INTERVAL seconds, so no task blocks the others.
+	Set ASYNC_RUNTIME to 1 to have the devices run this instead of main_loop.
+	"""
+	gc_policy.configure()
+	while True:
+		try:
+			gc_policy.collect()
+			log_memory_usage('Start of Loop')
+			if not connection.is_connected():
+				connection.connect()
+			asyncio.run(animate_until_connected(connection, view))
+			view.switch_to_no_game()
+			if on_connect:
+				on_connect()
+			gc_policy.collect()
+			asyncio.run(AsyncSession(connection, view, loops).run())
+			log.debug('-------------------- DISCONNECTED --------------------')
+		except Exception as e:
+			log_exception(e)
+			view.show_error(e)
+			view.switch_to_error()
+			try:
+				if on_error:
+					on_error(e)
+			except Exception as on_error_exception:
+				log.error('Second inner exception! Immediate restart.')
+				log_exception(on_error_exception)
+			log.debug('-------------------- RESTART --------------------')
+			try:
+				connection.restart()
+			except Exception as on_restart_exception:
+				log.error('Second inner exception! Immediate restart.')
+				log_exception(on_restart_exception)
@@ -4,6 +4,8 @@ from keypad import Keys
 from microcontroller import Pin
 import supervisor
 
+import core.latency as latency
+
 class _ButtonData():
 	def __init__(self, key_number: int, pin: Pin):
 		self.key_number = key_number
@@ -86,7 +88,7 @@ class Buttons():
 				if supervisor.ticks_ms() - btn.pressed_ts > self.long_press_threshold_ms:
 					# Long press detected!
 					del self.pressed_keys[key]
-					self.execute_button_press((btn.pin, btn.presses, True))
+					self.execute_button_press((btn.pin, btn.presses, True), btn.pressed_ts)
 					# Only execute one action per loop to allow for resets to take effect
 					return
 
@@ -95,7 +97,7 @@ class Buttons():
 				if supervisor.ticks_ms() - btn.released_ts > self.short_press_threshold_ms:
 					# Short press detected!
 					del self.pressed_keys[key]
-					self.execute_button_press((btn.pin, btn.presses, False))
+					self.execute_button_press((btn.pin, btn.presses, False), btn.released_ts)
 					# Only execute one action per loop to allow for resets to take effect
 					return
 
@@ -131,12 +133,18 @@ class Buttons():
 		else:
 			self.callbacks['PRESSED_KEYS'] = callback
 
-	def execute_button_press(self, key: tuple[Pin, int, bool]):
+	def execute_button_press(self, key: tuple[Pin, int, bool], event_ts: int|None = None):
+		"event_ts is the keypad timestamp of the event that concluded the press, to trace the latency of the command it causes."
 		cb = self.callbacks.get(key)
 		if cb == None:
 			cb = self.callbacks.get(None)
 		if cb != None:
-			cb(*key)
+			if event_ts != None:
+				latency.on_button_dispatch(event_ts, supervisor.ticks_ms())
+			try:
+				cb(*key)
+			finally:
+				latency.on_button_done()
 
 	def clear_callbacks(self):
 		for key in self.callbacks.keys():
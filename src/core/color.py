@@ -31,6 +31,9 @@ log = logging.getLogger()
 
 class PlayerColor():
 	def __init__(self, color_hex: str, hsv=False, adjustments=True) -> None:
+		# The color as sent by SGT, kept so that the color can be passed on again.
+		self.hex = color_hex
+		self.hsv = hsv
 		rgbOrHsv = [int(color_hex[0:2],16), int(color_hex[2:4],16), int(color_hex[4:6],16)]
 		self.fancy = fancy.CHSV(*rgbOrHsv) if hsv else fancy.CRGB(*rgbOrHsv)
 		if isinstance(self.fancy, fancy.CHSV) and adjustments:
@@ -0,0 +1,31 @@
+class AckWindow():
+	"""Decides when to acknowledge the data received over BLE.
+	With a window of 0, every read is acknowledged as it comes, which is what SGT expects by default.
+	Otherwise, one ACK covers up to window bytes, or the rest of a line once its newline has arrived.
+	Bytes left unacknowledged when the input stops for idle_timeout seconds are acknowledged anyway,
+	so a sender that still waits for an ACK after each chunk is slowed down, but never stalled.
+	"""
+	def __init__(self, window: int, idle_timeout: float):
+		self.window = window
+		self.idle_timeout = idle_timeout
+		self.unacknowledged = 0
+		self.last_read_ts = 0
+
+	def on_read(self, nbytes: int, line_ended: bool, ts: float) -> bool:
+		"Call after each read. Returns true if an ACK should be sent now."
+		self.unacknowledged += nbytes
+		self.last_read_ts = ts
+		if self.window == 0 or line_ended or self.unacknowledged >= self.window:
+			self.unacknowledged = 0
+			return True
+		return False
+
+	def on_idle(self, ts: float) -> bool:
+		"Call when there is nothing to read. Returns true if an ACK should be sent now."
+		if self.unacknowledged > 0 and ts - self.last_read_ts >= self.idle_timeout:
+			self.unacknowledged = 0
+			return True
+		return False
+
+	def reset(self):
+		self.unacknowledged = 0
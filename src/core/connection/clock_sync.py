@@ -0,0 +1,128 @@
+import adafruit_logging as logging
+log = logging.getLogger()
+from time import monotonic, sleep
+from core.utils.time_utils import monotonic_ms
+
+NVM_MAGIC = b'SGTC'
+
+class ClockSync():
+	"""Works out the offset between monotonic time and unix time, from a time server that answers with
+	{"unixtime": <seconds>} and optionally {"unixtime_ms": <milliseconds>}.
+
+	Each sample bounds the offset: the server read its clock somewhere between sending the request
+	and receiving the reply, and a reply in whole seconds could be up to a second behind. Intersecting
+	the bounds of several samples, spread over a second, narrows the offset down well below a second,
+	with the network delay taken into account. Only the latest samples are kept, so that re-syncing
+	now and then follows the drift of the crystal.
+
+	The offset is kept in whole milliseconds, as unix times do not fit the precision of a float on the
+	device. Use offset (whole seconds) and offset_fraction to turn a unix time into monotonic time.
+	"""
+	def __init__(self, session, url: str, sample_count: int, resync_interval: float, manual_offset: int = 0, nvm_address: int = 0):
+		self.session = session
+		self.url = url
+		self.sample_count = sample_count
+		self.resync_interval = resync_interval
+		self.manual_offset_ms = manual_offset * 1000
+		self.nvm_address = nvm_address
+		# (lowest, highest) offset in ms, of the latest samples.
+		self.samples = []
+		self.offset_ms = None
+		self.precision_range_ms = 0
+		self.ts_last_sample = None
+
+	def is_synced(self) -> bool:
+		return self.offset_ms != None
+
+	@property
+	def offset(self) -> int:
+		"Whole seconds to add to a unix time to get monotonic time. Add offset_fraction as well."
+		return (self.offset_ms + self.manual_offset_ms) // 1000
+
+	@property
+	def offset_fraction(self) -> float:
+		return ((self.offset_ms + self.manual_offset_ms) % 1000) / 1000
+
+	def sync(self):
+		"Take a full set of samples, blocking for a little over a second."
+		for n in range(self.sample_count):
+			if n > 0:
+				sleep(1 / self.sample_count)
+			self.sample()
+		self.save()
+
+	def resync_due(self) -> bool:
+		return self.ts_last_sample == None or monotonic() - self.ts_last_sample >= self.resync_interval
+
+	def sample(self):
+		"Take one sample and update the offset. One sample is enough to keep an earlier sync up to date."
+		ts_sent_ms = monotonic_ms()
+		with self.session.get(self.url) as response:
+			ts_received_ms = monotonic_ms()
+			json = response.json()
+		if 'unixtime_ms' in json:
+			unix_ms = int(json['unixtime_ms'])
+			resolution_ms = 1
+		else:
+			unix_ms = int(json['unixtime']) * 1000
+			resolution_ms = 1000
+		self.ts_last_sample = monotonic()
+		self.samples.append((ts_sent_ms - unix_ms - resolution_ms, ts_received_ms - unix_ms))
+		if len(self.samples) > self.sample_count:
+			self.samples.pop(0)
+		self._update_offset()
+		log.info(f'Clock sync sample: rtt {ts_received_ms - ts_sent_ms}ms, offset {self.offset_ms:,}ms +/- {self.precision_ms()}ms')
+
+	def _update_offset(self):
+		lowest = None
+		highest = None
+		for sample in reversed(self.samples):
+			sample_lowest = sample[0] if lowest == None else max(lowest, sample[0])
+			sample_highest = sample[1] if highest == None else min(highest, sample[1])
+			if sample_lowest > sample_highest:
+				# This older sample does not agree with the newer ones, most likely due to drift. Ignore the rest.
+				break
+			lowest = sample_lowest
+			highest = sample_highest
+		self.offset_ms = (lowest + highest) // 2
+		self.precision_range_ms = highest - lowest
+
+	def precision_ms(self) -> int:
+		"How far off the offset may be, at most."
+		return self.precision_range_ms // 2
+
+	def save(self):
+		"Keep the offset in non-volatile memory, so a soft reload does not need to sync again."
+		try:
+			import microcontroller
+			import struct
+		except ImportError:
+			return
+		if microcontroller.nvm == None or self.offset_ms == None:
+			return
+		data = NVM_MAGIC + struct.pack('<qq', self.offset_ms, monotonic_ms())
+		microcontroller.nvm[self.nvm_address:self.nvm_address+len(data)] = data
+
+	def load(self) -> bool:
+		"Use the offset saved before a soft reload, if there is one. Returns true if it was found."
+		try:
+			import microcontroller
+			import supervisor
+			import struct
+		except ImportError:
+			return False
+		if microcontroller.nvm == None or supervisor.runtime.run_reason == supervisor.RunReason.STARTUP:
+			# Monotonic time starts over on a hard reset, so an offset saved before it is of no use.
+			return False
+		data = microcontroller.nvm[self.nvm_address:self.nvm_address+len(NVM_MAGIC)+16]
+		if data[0:len(NVM_MAGIC)] != NVM_MAGIC:
+			return False
+		(offset_ms, ts_saved_ms) = struct.unpack('<qq', data[len(NVM_MAGIC):])
+		if ts_saved_ms > monotonic_ms():
+			return False
+		self.offset_ms = offset_ms
+		self.precision_range_ms = 0
+		# Resync soon after all, to catch up with the drift while the offset was stored.
+		self.ts_last_sample = monotonic() - self.resync_interval / 2
+		log.info(f'Clock sync offset {offset_ms:,}ms restored from before the reload')
+		return True
@@ -0,0 +1,137 @@
+import adafruit_logging as logging
+log = logging.getLogger()
+
+import core.latency as latency
+
+# Pairs of commands that undo each other when queued back to back, so neither needs sending.
+CANCELLING_COMMANDS = (
+	('TogglePause', 'TogglePause'),
+	('ToggleAdmin', 'ToggleAdmin'),
+	('TurnPauseOn', 'TurnPauseOff'),
+	('TurnPauseOff', 'TurnPauseOn'),
+	('TurnAdminOn', 'TurnAdminOff'),
+	('TurnAdminOff', 'TurnAdminOn'),
+)
+# Commands that replace the same command when queued right after it, as only the last one matters.
+REPLACING_COMMANDS = ('TurnPauseOn', 'TurnPauseOff', 'TurnAdminOn', 'TurnAdminOff', 'Reorder')
+
+class Command():
+	__slots__ = ('action', 'seat', 'seats', 'ts_enqueued', 'ts_published', 'game_state_version', 'trace')
+	def __init__(self, action: str, seat: int|None, seats: list[int]|None, ts_enqueued: float, trace: latency.CommandTrace|None = None):
+		self.action = action
+		self.seat = seat
+		self.seats = seats
+		self.ts_enqueued = ts_enqueued
+		self.ts_published = None
+		# The state version the command was sent against. Predicted, if earlier commands are still in flight.
+		self.game_state_version = None
+		# Follows the command from the button press that caused it, if any.
+		self.trace = trace
+
+	def __repr__(self):
+		return f'Command<{self.action} seat={self.seat} seats={self.seats} v={self.game_state_version}>'
+
+class CommandLatencies():
+	"Latency figures of one type of command, in seconds: from enqueue to publish, and from publish to the state that acknowledged it."
+	def __init__(self):
+		self.count = 0
+		self.lost = 0
+		self.queued_total = 0
+		self.queued_max = 0
+		self.reply_total = 0
+		self.reply_max = 0
+
+	def add(self, command: Command, ts_acknowledged: float):
+		queued = command.ts_published - command.ts_enqueued
+		reply = ts_acknowledged - command.ts_published
+		self.count += 1
+		self.queued_total += queued
+		self.queued_max = max(self.queued_max, queued)
+		self.reply_total += reply
+		self.reply_max = max(self.reply_max, reply)
+
+	def __repr__(self):
+		if self.count == 0:
+			return f'<lost={self.lost}>'
+		return f'<n={self.count}, lost={self.lost}, queued avg/max={self.queued_total/self.count*1000:.0f}/{self.queued_max*1000:.0f}ms, reply avg/max={self.reply_total/self.count*1000:.0f}/{self.reply_max*1000:.0f}ms>'
+
+class CommandPipeline():
+	"""Queues commands to SGT, and lets several of them be in flight at once.
+	Each command has to be sent with the gameStateVersion of the state it was based on. While earlier
+	commands are in flight, the version is predicted by counting one up per command ahead of it. The
+	commands are acknowledged by the first state with a higher version. Redundant commands are merged
+	while still queued.
+	"""
+	def __init__(self, max_in_flight: int, reply_timeout: float):
+		self.max_in_flight = max_in_flight
+		self.reply_timeout = reply_timeout
+		self.queued = []
+		self.in_flight = []
+		self.coalesced_count = 0
+		self.latencies = {}
+
+	def enqueue(self, action: str, seat: int|None, seats: list[int]|None, ts: float, trace: latency.CommandTrace|None = None) -> bool:
+		"Return true if the command was queued, rather than dropped or merged into the one queued before it."
+		if len(self.queued) > 0:
+			last = self.queued[-1]
+			if (last.action, action) in CANCELLING_COMMANDS and last.seat == seat:
+				log.debug('Dropped %s, as it cancels out %s', action, last)
+				self.queued.pop()
+				self.coalesced_count += 2
+				return False
+			if last.action == action and action in REPLACING_COMMANDS:
+				last.seat = seat
+				last.seats = seats
+				self.coalesced_count += 1
+				return False
+		self.queued.append(Command(action, seat, seats, ts, trace))
+		return True
+
+	def has_queued(self) -> bool:
+		return len(self.queued) > 0
+
+	def is_waiting_for_reply(self) -> bool:
+		return len(self.in_flight) > 0
+
+	def pop_next(self, game_state_version: int, ts: float) -> Command|None:
+		"The next command to publish, if it can be sent now, given the version of the latest state."
+		if len(self.queued) == 0 or len(self.in_flight) >= self.max_in_flight:
+			return None
+		command = self.queued.pop(0)
+		if len(self.in_flight) > 0:
+			command.game_state_version = self.in_flight[-1].game_state_version + 1
+		else:
+			command.game_state_version = game_state_version
+		command.ts_published = ts
+		latency.on_sent(command.trace)
+		self.in_flight.append(command)
+		return command
+
+	def on_state(self, game_state_version: int, ts: float):
+		"Acknowledge the commands in flight that the received state includes."
+		while len(self.in_flight) > 0 and self.in_flight[0].game_state_version < game_state_version:
+			command = self.in_flight.pop(0)
+			latencies = self.get_latencies(command.action)
+			latencies.add(command, ts)
+			latency.on_acknowledged(command.trace)
+			log.debug('%s acknowledged after %.0fms: %s', command.action, (ts - command.ts_enqueued) * 1000, latencies)
+
+	def expire(self, ts: float):
+		"Give up on the commands in flight if the oldest has gone unanswered for too long."
+		if len(self.in_flight) > 0 and ts - self.in_flight[0].ts_published > self.reply_timeout:
+			# The versions of the later commands were predicted from the lost one, so they are lost as well.
+			log.info('No reply to %s. Giving up on it.', self.in_flight)
+			for command in self.in_flight:
+				self.get_latencies(command.action).lost += 1
+			self.in_flight = []
+
+	def clear(self):
+		self.queued = []
+		self.in_flight = []
+
+	def get_latencies(self, action: str) -> CommandLatencies:
+		latencies = self.latencies.get(action)
+		if latencies == None:
+			latencies = CommandLatencies()
+			self.latencies[action] = latencies
+		return latencies
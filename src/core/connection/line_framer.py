@@ -0,0 +1,111 @@
+import adafruit_logging as logging
+log = logging.getLogger()
+
+NEWLINE = 10
+
+class LineFramer():
+	"""Cuts a stream of bytes into lines, using one preallocated ring buffer.
+	The bytes are read straight into the buffer. Only the latest complete line is kept, and it is only
+	decoded into a string when it is taken with pop_line. The latest line is followed by the incomplete
+	line being received, so the buffer holds at most one line and a half, and never grows.
+	A line may be up to size - 1 bytes long, so that it fits in the buffer with its newline. Longer lines
+	are dropped, and overflowed is set.
+	"""
+	def __init__(self, size: int):
+		self.size = size
+		self.buffer = bytearray(size)
+		self.view = memoryview(self.buffer)
+		# How many newlines have been read, so a reader can tell when a line has ended. Only ever counts up.
+		self.newline_count = 0
+		self.clear()
+
+	def clear(self):
+		"Drop both the latest line and the incomplete line, and start writing from the beginning of the buffer again."
+		# The latest complete line, as a start index and a length, and when its first byte was read.
+		self.line_start = 0
+		self.line_length = 0
+		self.line_ts = 0
+		# The incomplete line following it. The next byte read is written right after it.
+		self.pending_start = 0
+		self.pending_length = 0
+		self.pending_ts = 0
+		# Set if a line did not fit in the buffer and was dropped. Reset by the reader once dealt with.
+		self.overflowed = False
+		# Set while skipping the rest of a dropped line.
+		self.discarding = False
+
+	def _get_free(self) -> int:
+		"""How many bytes can be read before the buffer is full.
+		The kept bytes run from the start of the latest line, or of the incomplete line if there is no
+		latest line, up to where the next byte is written. The lengths tell a full buffer from an empty one,
+		so all of it can be used: a line of size - 1 bytes still fits together with its newline.
+		"""
+		if self.line_length > 0:
+			# The latest line takes at least one byte, so 0 here means the buffer is full.
+			write_at = (self.pending_start + self.pending_length) % self.size
+			return self.size - 1 - (write_at - self.line_start - 1) % self.size
+		return self.size - self.pending_length
+
+	def has_line(self) -> bool:
+		return self.line_length > 0
+
+	def read_from(self, stream, ts: float) -> int:
+		"""Read what fits into the buffer from a stream with readinto(buf, nbytes) and in_waiting.
+		ts is the time of the read, in monotonic space. Returns the number of bytes read, which is 0 if the
+		buffer is full and the latest line must be taken with pop_line first.
+		"""
+		if self.line_length == 0 and self.pending_length == 0 and not self.discarding:
+			# Nothing is kept, so start from the beginning again, which keeps the next line from wrapping.
+			self.pending_start = 0
+		free = self._get_free()
+		if free <= 0 and self.line_length > 0:
+			# The latest line must be taken before there is room for more.
+			return 0
+		if free <= 0:
+			log.debug('Line longer than %s bytes. Dropping it.', self.size - 1)
+			self.clear()
+			self.overflowed = True
+			self.discarding = True
+			free = self._get_free()
+		write_at = (self.pending_start + self.pending_length) % self.size
+		nbytes = min(stream.in_waiting, free, self.size - write_at)
+		if nbytes <= 0:
+			return 0
+		bytes_read = stream.readinto(self.view[write_at:write_at+nbytes], nbytes)
+		if bytes_read == None or bytes_read == 0:
+			return 0
+
+		buffer = self.buffer
+		for i in range(write_at, write_at + bytes_read):
+			if buffer[i] == NEWLINE:
+				self.newline_count += 1
+			if self.discarding:
+				# Skip the rest of the line that did not fit.
+				self.discarding = buffer[i] != NEWLINE
+				self.pending_start = (i + 1) % self.size
+			elif buffer[i] == NEWLINE:
+				if self.pending_length > 0:
+					self.line_start = self.pending_start
+					self.line_length = self.pending_length
+					self.line_ts = self.pending_ts
+				# Empty lines are skipped, leaving the latest line as it was.
+				self.pending_start = (i + 1) % self.size
+				self.pending_length = 0
+			else:
+				if self.pending_length == 0:
+					self.pending_ts = ts
+				self.pending_length += 1
+		return bytes_read
+
+	def pop_line(self) -> tuple[float, str]|None:
+		"Take the latest complete line, with the time its first byte was read. Lines seen before it are skipped."
+		if self.line_length == 0:
+			return None
+		end = self.line_start + self.line_length
+		if end <= self.size:
+			line = str(self.view[self.line_start:end], 'utf-8')
+		else:
+			# The line wraps around the end of the buffer.
+			line = str(bytes(self.view[self.line_start:]) + bytes(self.view[:end - self.size]), 'utf-8')
+		self.line_length = 0
+		return (self.line_ts, line)
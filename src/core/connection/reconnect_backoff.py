@@ -0,0 +1,60 @@
+from random import random
+
+class ReconnectBackoff():
+	"""Decides when to try to get a lost connection back. The first attempt is made at once, then the wait
+	doubles from base_delay up to max_delay, give or take a random jitter (as a fraction of the wait), so
+	that devices that lost the connection together do not all come back at the same moment. After
+	fast_attempts failed attempts, the caller should give up on quick reconnects and start over in full.
+	Keeps how long it took to get back, to report on.
+	"""
+	def __init__(self, base_delay: float, max_delay: float, jitter: float, fast_attempts: int):
+		self.base_delay = base_delay
+		self.max_delay = max_delay
+		self.jitter = jitter
+		self.fast_attempts = fast_attempts
+		self.ts_lost = None
+		self.ts_next_attempt = 0
+		self.attempts = 0
+		self.reconnect_count = 0
+		self.last_duration = 0
+		self.max_duration = 0
+		self.total_duration = 0
+
+	def is_reconnecting(self) -> bool:
+		return self.ts_lost != None
+
+	def on_lost(self, ts: float):
+		if self.ts_lost == None:
+			self.ts_lost = ts
+			self.ts_next_attempt = ts
+			self.attempts = 0
+
+	def attempt_due(self, ts: float) -> bool:
+		return ts >= self.ts_next_attempt
+
+	def on_failed(self, ts: float):
+		delay = min(self.max_delay, self.base_delay * (1 << min(self.attempts, 16)))
+		self.attempts += 1
+		self.ts_next_attempt = ts + delay * (1 + self.jitter * (2 * random() - 1))
+
+	def should_fall_back(self) -> bool:
+		"True once quick reconnects have failed too many times in a row."
+		return self.attempts >= self.fast_attempts
+
+	def on_connected(self, ts: float) -> float|None:
+		"Returns how long the connection was gone, or None if it was not lost."
+		if self.ts_lost == None:
+			return None
+		duration = ts - self.ts_lost
+		self.ts_lost = None
+		self.attempts = 0
+		self.reconnect_count += 1
+		self.last_duration = duration
+		self.max_duration = max(self.max_duration, duration)
+		self.total_duration += duration
+		return duration
+
+	def __repr__(self):
+		if self.reconnect_count == 0:
+			return '<no reconnects>'
+		return f'<reconnects={self.reconnect_count}, last/avg/max={self.last_duration*1000:.0f}/{self.total_duration/self.reconnect_count*1000:.0f}/{self.max_duration*1000:.0f}ms>'
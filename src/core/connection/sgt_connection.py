@@ -1,5 +1,18 @@
+from core.utils.settings import get_float, get_string
+# How far (in seconds) the timers of a resent state may drift from the shown ones, and still count as the same state.
+STATE_RESEND_TOLERANCE = get_float('STATE_RESEND_TOLERANCE', 1.5)
+# How long (in seconds) a predicted state is shown while waiting for SGT, before going back to the last real state.
+PREDICTION_TIMEOUT = get_float('PREDICTION_TIMEOUT', 3.0)
+# If set, the messages received from SGT are recorded to this file, to be played back by SgtConnectionReplay.
+# Set it to '-' to print them to the serial console instead.
+SGT_RECORD_PATH = get_string('SGT_RECORD_PATH', '')
+
+import adafruit_logging as logging
+log = logging.getLogger()
+from time import monotonic
+
 from core.view.view import View
-from core.game_state import STATE_PLAYING, STATE_ADMIN, STATE_PAUSE, STATE_START, STATE_FINISHED, STATE_RUNNING, STATE_NOT_RUNNING, STATE_SIM_TURN
+from core.game_state import GameState, GameStateDiff, TIMER_MODE_SAND_TIMER, TIMER_MODE_COUNT_DOWN, STATE_PLAYING, STATE_ADMIN, STATE_PAUSE, STATE_START, STATE_FINISHED, STATE_RUNNING, STATE_NOT_RUNNING, STATE_SIM_TURN
 
 def _success(action:str, on_success: callable[[], None] = None):
 	if on_success:
@@ -12,8 +25,27 @@ def _failure(on_failure: callable[[], None] = None):
 	return None
 
 class SgtConnection:
-	def __init__(self, view: View):
+	def __init__(self, view: View, update_state_in_place: bool = False, predict_state: bool = False):
 		self.view = view
+		# If true, each message overwrites one long-lived GameState instead of creating a new one.
+		self.update_state_in_place = update_state_in_place
+		self.live_state = None
+		# If true, the expected outcome of a Primary command is shown right away, rather than after SGT replies.
+		self.predict_state = predict_state
+		# The predicted state shown by the view, the last real state before it, and the version of that state.
+		self.prediction = None
+		self.prediction_real_state = None
+		self.prediction_base_version = -1
+		self.prediction_ts = 0
+		self.predictions_confirmed = 0
+		self.predictions_rolled_back = 0
+		# How many received states were shown, and how many were skipped as resends of the shown state.
+		self.applied_state_updates = 0
+		self.skipped_state_updates = 0
+		self.recorder = None
+		if SGT_RECORD_PATH:
+			from core.connection.sgt_recorder import SgtRecorder
+			self.recorder = SgtRecorder(SGT_RECORD_PATH)
 
 	def is_connected(self) -> bool:
 		return False
@@ -21,7 +53,9 @@ class SgtConnection:
 	def connect(self):
 		pass
 
-	def poll_for_new_messages(self) -> None:
+	def poll_for_new_messages(self, view_busy: bool = False, max_wait: float|None = None) -> None:
+		"""view_busy is true if any view is busy animating, in which case polling should return quickly.
+		max_wait, if given, is the longest (in seconds) polling may wait for messages."""
 		return None
 
 	def handle_new_messages(self) -> None:
@@ -35,6 +69,123 @@ class SgtConnection:
 		"Return true if a message was sent."
 		return False
 
+	def _get_live_state(self) -> GameState:
+		if self.live_state == None:
+			self.live_state = GameState()
+		return self.live_state
+
+	def _set_live_state(self, diff: GameStateDiff):
+		# The diff is only valid if the view is showing the live state. Otherwise, let the view work it out.
+		self.view.set_state(self.live_state, diff=diff if self.view.state is self.live_state else None)
+
+	def _get_shown_timings(self) -> tuple[float, float, float]|None:
+		"The timings of the state shown by the view, to be called before the live state is overwritten."
+		if self.view.state == None:
+			return None
+		times = self.view.state.get_current_timings()
+		return (times.turn_time, times.player_time, times.total_play_time)
+
+	def _is_resend(self, state: GameState, diff: GameStateDiff|None, shown_timings: tuple[float, float, float]|None) -> bool:
+		"True if the state is the shown state again, with a new timing anchor that agrees with the running timers."
+		if diff == None or shown_timings == None or not diff.only_timings_changed():
+			return False
+		times = state.get_current_timings()
+		return abs(times.turn_time - shown_timings[0]) <= STATE_RESEND_TOLERANCE and abs(times.player_time - shown_timings[1]) <= STATE_RESEND_TOLERANCE and abs(times.total_play_time - shown_timings[2]) <= STATE_RESEND_TOLERANCE
+
+	def _show_state(self, state: GameState, shown_timings: tuple[float, float, float]|None, diff: GameStateDiff|None = None):
+		"""Hand a received state to the view, unless it is a resend of the state already shown.
+		A resend only moves the timing anchor of the shown state, so the views are left alone.
+		If the live state is updated in place, diff must be the one returned by the update.
+		"""
+		if self.prediction != None:
+			if self.view.state is not self.prediction:
+				# Something else has replaced the prediction in the meantime.
+				self.prediction = None
+			elif self.prediction_base_version >= 0 and state.game_state_version <= self.prediction_base_version:
+				# SGT has not acted on the command yet. Keep showing the prediction.
+				self.prediction_real_state = state
+				return
+			else:
+				# The views move from the prediction to the real state. If the prediction was wrong, that is the correction.
+				if state.state == self.prediction.state and state.seat == self.prediction.seat:
+					self.predictions_confirmed += 1
+				else:
+					self.predictions_rolled_back += 1
+					log.info('Prediction rolled back. (%s confirmed, %s rolled back)', self.predictions_confirmed, self.predictions_rolled_back)
+				self.prediction = None
+				self.prediction_real_state = None
+		if state is not self.live_state:
+			diff = GameStateDiff(state, self.view.state) if self.view.state != None else None
+		elif self.view.state is not state:
+			# The view is not showing the live state, so the diff of the update says nothing about what it shows.
+			diff = None
+		if self._is_resend(state, diff, shown_timings):
+			if state is not self.view.state:
+				self.view.state.move_timing_anchor(state)
+			self.skipped_state_updates += 1
+			log.debug('Skipped resent state. (%s skipped, %s applied)', self.skipped_state_updates, self.applied_state_updates)
+			return
+		self.applied_state_updates += 1
+		if state is self.live_state:
+			self._set_live_state(diff)
+		else:
+			self.view.set_state(state, diff=diff)
+
+	def _predict_primary(self, seat: int|None):
+		"""Show the state expected after a Primary: the next seat in the turn order is active, and the turn time starts over.
+		To be called by the subclasses once the Primary command has been queued.
+		Only the simple cases are predicted. The player time of the next player is not known in count-down
+		mode, and a next player with an action of their own (like having passed) may be skipped by SGT.
+		While a prediction is waiting for its reply, further presses are not predicted on top of it."""
+		state = self.view.state
+		if not self.predict_state or self.prediction != None or state == None or state.state != STATE_PLAYING:
+			return
+		if state.timer_mode in (TIMER_MODE_SAND_TIMER, TIMER_MODE_COUNT_DOWN) or len(state.seat) != 1 or len(state.players) < 2:
+			return
+		active_player = state.get_active_player()
+		if active_player == None or (seat != None and seat != active_player.seat):
+			return
+		active_index = state.players.index(active_player)
+		if state.players[(active_index + 1) % len(state.players)].action != None:
+			return
+		prediction = state.make_copy()
+		active_player = prediction.players[active_index]
+		next_player = prediction.players[(active_index + 1) % len(prediction.players)]
+		active_player.action, next_player.action = next_player.action, active_player.action
+		prediction.seat = [next_player.seat]
+		prediction.name = next_player.name if next_player.name != None else prediction.name
+		prediction.color_p = next_player.color
+		# The new turn starts now, when the command is issued, rather than at the start of the frame, which may
+		# be a whole idle frame ago. Only count-up and no-timer turns are predicted, where the total play time
+		# runs along with the turn.
+		now = monotonic()
+		prediction.timestamp = now
+		prediction.turn_time_sec = 0
+		prediction.total_play_time_sec = state.total_play_time_sec + (now - state.timestamp)
+		prediction.index_seats()
+		self.prediction_real_state = state
+		self.prediction_base_version = state.game_state_version
+		self.prediction = prediction
+		self.prediction_ts = now
+		self.view.set_state(prediction)
+
+	def _expire_prediction(self):
+		"Go back to the last real state if SGT never replied to a predicted command."
+		if self.prediction == None or monotonic() - self.prediction_ts < PREDICTION_TIMEOUT:
+			return
+		log.info('No reply to the predicted command. Going back to the last real state.')
+		self.predictions_rolled_back += 1
+		if self.view.state is self.prediction:
+			self.view.set_state(self.prediction_real_state)
+		self.prediction = None
+		self.prediction_real_state = None
+
+	def get_confirmed_state(self) -> GameState|None:
+		"The last state received from SGT, which is what the view shows unless it shows a prediction."
+		if self.prediction != None and self.view.state is self.prediction:
+			return self.prediction_real_state
+		return self.view.state
+
 	def enqueue_send_primary(self, seat: int|None = None, on_success: callable[[], None] = None, on_failure: callable[[], None] = None):
 		if self.view.state == None:
 			return _failure(on_failure)
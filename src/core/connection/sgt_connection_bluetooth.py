@@ -1,3 +1,13 @@
+from core.utils.settings import get_int, get_float
+# The size of the buffer that BLE input is read into. Lines of up to one byte less than this are read, longer ones are dropped.
+BLE_READ_BUFFER_SIZE = get_int('BLE_READ_BUFFER_SIZE', 1024)
+# 0 to acknowledge every read of BLE data, as SGT expects by default. Otherwise, ask SGT to only wait for
+# an ACK once this many bytes have been sent, or at the end of each line. Only set this if your SGT
+# honours it, as a sender that waits for an ACK after each chunk is slowed down by the idle timeout below.
+BLE_ACK_WINDOW = get_int('BLE_ACK_WINDOW', 0)
+# With an ACK window, acknowledge what has been read anyway once the input has stopped for this long (in seconds).
+BLE_ACK_IDLE_TIMEOUT = get_float('BLE_ACK_IDLE_TIMEOUT', 0.1)
+
 import adafruit_logging as logging
 log = logging.getLogger()
 import time
@@ -5,12 +15,15 @@ import json
 from adafruit_ble import BLERadio
 from adafruit_ble.advertising.standard import ProvideServicesAdvertisement
 from adafruit_ble.services.nordic import UARTService
-from traceback import print_exception
 
+import core.frame_clock as frame_clock
 from core.view.view import View
 from core.connection.sgt_connection import SgtConnection
-from core.game_state import GameState
+from core.connection.line_framer import LineFramer
+from core.connection.ack_window import AckWindow
+from core.game_state import BleStateDecoder, CompactStateDecoder
 from core.utils.log import log_memory_usage
+import core.latency as latency
 
 class SgtConnectionBluetooth(SgtConnection):
 	def __init__(self,
@@ -18,22 +31,29 @@ class SgtConnectionBluetooth(SgtConnection):
 				device_name: str,
 				field_order: list[str],
 				field_divider: str,
+				update_state_in_place: bool = False,
+				compact_state: bool = False,
+				predict_state: bool = False,
 				):
-		super().__init__(view)
+		super().__init__(view, update_state_in_place, predict_state)
 		self.ble = BLERadio()
 		self.uart = UARTService()
 		self.advertisement = ProvideServicesAdvertisement(self.uart)
 		self.ble.name = device_name
-		self.incomplete_line_read = None
 		self.last_is_connected_check = False
-		self.all_read_text = ''
-		self.text_read = ''
-		self.byte_array = bytearray(20)
+		self.framer = LineFramer(BLE_READ_BUFFER_SIZE)
+		self.ack_window = AckWindow(BLE_ACK_WINDOW, BLE_ACK_IDLE_TIMEOUT)
 		self.command_to_send = None
+		# The latency traces of the command to send, and of the one sent, which the next state acknowledges.
+		self.command_trace = None
+		self.sent_command_trace = None
 		self.line_to_process = None
 		self.field_order = field_order
 		self.field_divider = field_divider
-		self.suggestions = json.dumps({
+		self.decoder = BleStateDecoder(field_order, field_divider)
+		# If set, compact state lines are decoded as well. Only a relay hub sends them, so they are not advertised to SGT.
+		self.compact_decoder = CompactStateDecoder() if compact_state else None
+		suggestions = {
 			"script": [
 				f'0 %0A{field_divider.join(field_order)}%0A'
 			],
@@ -54,7 +74,12 @@ class SgtConnectionBluetooth(SgtConnection):
 					('TurnPauseOff', 'remoteActionTurnPauseOff'),
 				],
 				"actionMapName": "Hardcoded Actions",
-			})
+			}
+		if BLE_ACK_WINDOW > 0:
+			# Sent along with 'Enable ACK' as well. A sender that does not know about it keeps waiting
+			# for an ACK after each chunk, which the idle timeout of the AckWindow still provides.
+			suggestions["ackWindow"] = BLE_ACK_WINDOW
+		self.suggestions = json.dumps(suggestions)
 	def is_connected(self) -> bool:
 		if self.ble.connected and not self.last_is_connected_check:
 			self.view.set_connection_progress_text('Establishing Connection')
@@ -66,11 +91,14 @@ class SgtConnectionBluetooth(SgtConnection):
 					time_of_last_poll_request = time.monotonic()
 					log.debug('Waiting for ping')
 					self._send('Ping')
+				frame_clock.tick()
 				self.view.animate()
 			if self.ble.connected:
 				log.debug('Ping Acknowledged')
-				self._send('Enable ACK')
+				self._send('Enable ACK' if BLE_ACK_WINDOW == 0 else f'Enable ACK #{BLE_ACK_WINDOW}')
 				self.uart.reset_input_buffer()
+				self.framer.clear()
+				self.ack_window.reset()
 				self._send('Poll')
 			else:
 				raise Exception('Disconnected while waiting for ping')
@@ -82,63 +110,60 @@ class SgtConnectionBluetooth(SgtConnection):
 		self.view.set_connection_progress_text(f"Advertising BLE as {self.ble.name}")
 		self.ble.start_advertising(self.advertisement)
 
-	def poll_for_new_messages(self) -> None:
+	def poll_for_new_messages(self, view_busy: bool = False, max_wait: float|None = None) -> None:
+		self._expire_prediction()
 		if self.uart.in_waiting == 0:
-			if self.incomplete_line_read and time.monotonic() - self.incomplete_line_read[0] > 6:
-				log.debug('Old incomplete line. Clear the buffer and line, then call poll for new data. %s', self.incomplete_line_read)
+			if self.ack_window.on_idle(time.monotonic()):
+				self._send('ACK')
+			if self.framer.pending_length > 0 and time.monotonic() - self.framer.pending_ts > 6:
+				log.debug('Old incomplete line. Clear the buffer and line, then call poll for new data.')
 				self.uart.reset_input_buffer()
-				self.incomplete_line_read = None
+				self.framer.clear()
 				self._poll_for_latest_state()
-			return
 
 		while self.uart.in_waiting > 0:
-			bytes_read = self.uart.readinto(buf=self.byte_array, nbytes=self.uart.in_waiting)
-			read_text = str(self.byte_array[:bytes_read], 'utf-8')
-			# log.debug('ACK of line %s', read_text)
-			self._send('ACK')
-			self.all_read_text += read_text
-			lines = [(time.monotonic(), line) for line in read_text.split("\n")]
-			if self.incomplete_line_read != None:
-				lines[0] = (self.incomplete_line_read[0], self.incomplete_line_read[1]+lines[0][1])
-				self.incomplete_line_read = None
-
-			if len(lines) == 0:
-				return
-			last_item = lines.pop()
-			lines = [line for line in lines if line[1] != '']
-			if len(lines[:-1]) > 0:
-				print(f'SKIP: {lines[:-1]}')
+			newline_count = self.framer.newline_count
+			bytes_read = self.framer.read_from(self.uart, time.monotonic())
+			if bytes_read == 0:
+				break
+			if self.ack_window.on_read(bytes_read, self.framer.newline_count != newline_count, time.monotonic()):
+				self._send('ACK')
+			if self.framer.overflowed:
+				self.framer.overflowed = False
+				self._poll_for_latest_state()
+			if not self.framer.has_line() and self.framer.pending_length > 0:
+				time.sleep(0.05 if max_wait == None else min(0.05, max_wait))
 
-			# log.debug("Last Item: %s, lines: %s", last_item, lines)
-			if last_item[1] == '':
-				if len(lines) > 0:
-					do_this_line = lines.pop()
-					if do_this_line[1] == 'GET SETUP':
-						log.debug('SENDING SUGGESTED SETUP')
-						self._send(self.suggestions)
-					else:
-						log.debug(f"EXECUTE LINE: {do_this_line}")
-						try:
-							self.line_to_process = do_this_line
-						except Exception as e:
-							print_exception(e)
-							self._poll_for_latest_state()
+		line = self.framer.pop_line()
+		if line != None:
+			if line[1] == 'GET SETUP':
+				log.debug('SENDING SUGGESTED SETUP')
+				self._send(self.suggestions)
 			else:
-				# log.debug('incomplete line: "%s"', last_item[1])
-				self.incomplete_line_read = last_item
-				time.sleep(0.05)
+				log.debug(f"EXECUTE LINE: {line}")
+				self.line_to_process = line
+				if self.recorder != None:
+					from core.connection.sgt_recorder import RECORD_BLE
+					self.recorder.record(RECORD_BLE, line[1])
 	def handle_new_messages(self) -> None:
 		if self.line_to_process == None:
 			return False
-		new_state = GameState(
-			ble_state_string = self.line_to_process[1],
-			ble_field_order = self.field_order,
-			ble_field_divider = self.field_divider,
-			timestamp_offset = self.line_to_process[0] - time.monotonic()
-			)
-		self.line_to_process = None
-		log_memory_usage('Between line and set state')
-		self.view.set_state(new_state)
+		shown_timings = self._get_shown_timings()
+		decoder = self.decoder
+		if self.compact_decoder != None and self.compact_decoder.is_compact(self.line_to_process[1]):
+			decoder = self.compact_decoder
+		if self.update_state_in_place:
+			diff = decoder.decode_into(self._get_live_state(), self.line_to_process[1], timestamp=self.line_to_process[0])
+			self.line_to_process = None
+			log_memory_usage('Between line and set state')
+			self._show_state(self.live_state, shown_timings, diff)
+		else:
+			new_state = decoder.decode(self.line_to_process[1], timestamp=self.line_to_process[0])
+			self.line_to_process = None
+			log_memory_usage('Between line and set state')
+			self._show_state(new_state, shown_timings)
+		latency.on_acknowledged(self.sent_command_trace)
+		self.sent_command_trace = None
 		return True
 	def _send(self, value: str|None):
 		if value == None:
@@ -146,24 +171,33 @@ class SgtConnectionBluetooth(SgtConnection):
 		log.info("-> %s", value)
 		self.uart.write((value+"\n").encode("utf-8"))
 
-	def _enqueue_command(self, value: str):
-		if value != None:
-			self.command_to_send = value
+	def _enqueue_command(self, value: str) -> bool:
+		"Return true if the command was queued."
+		if value == None:
+			return False
+		self.command_to_send = value
+		self.command_trace = latency.on_enqueue(value)
+		return True
 
 	def send_command(self) -> bool:
 		if self.command_to_send == None:
 			return False
 		else:
 			self._send(self.command_to_send)
+			latency.on_sent(self.command_trace)
+			self.sent_command_trace = self.command_trace
 			self.command_to_send = None
+			self.command_trace = None
 			return True
 
 	def enqueue_send_primary(self, seat: int|None = None, on_success: callable[[], None] = None, on_failure: callable[[], None] = None):
 		action = super().enqueue_send_primary(seat, on_success, on_failure)
 		if action != None and seat != None:
-			self._enqueue_command(f'{action} #{seat}')
+			queued = self._enqueue_command(f'{action} #{seat}')
 		else:
-			self._enqueue_command(action)
+			queued = self._enqueue_command(action)
+		if queued:
+			self._predict_primary(seat)
 	def enqueue_send_secondary(self, seat: int|None = None, on_success: callable[[], None] = None, on_failure: callable[[], None] = None):
 		action = super().enqueue_send_secondary(seat, on_success, on_failure)
 		if action != None and seat != None:
@@ -9,37 +9,72 @@ MQTT_HOST = get_string('MQTT_HOST')
 MQTT_PORT = get_int('MQTT_PORT')
 MQTT_USERNAME = get_string('MQTT_USERNAME')
 MQTT_PASSWORD = get_string('MQTT_PASSWORD')
+# Set to 0 to connect without TLS, e.g. to the SGT simulator (bench/sgt_simulator.py) on the local network.
+MQTT_SSL = get_int('MQTT_SSL', 1)
 MQTT_SOCKET_TIMEOUT = get_float('MQTT_SOCKET_TIMEOUT', 0)
+# While no view is busy animating, the time spent waiting for MQTT messages each loop doubles from
+# MQTT_SOCKET_TIMEOUT_STEP up to this ceiling (in seconds), to spare the CPU and radio. As soon as a
+# view is busy, or there are commands to send or replies to wait for, it drops back to MQTT_SOCKET_TIMEOUT.
+MQTT_SOCKET_TIMEOUT_MAX = get_float('MQTT_SOCKET_TIMEOUT_MAX', 0.25)
+MQTT_SOCKET_TIMEOUT_STEP = get_float('MQTT_SOCKET_TIMEOUT_STEP', 0.01)
+# How many commands may be sent before SGT has replied to the first of them, and how long (in seconds) to wait for that reply.
+MQTT_MAX_COMMANDS_IN_FLIGHT = get_int('MQTT_MAX_COMMANDS_IN_FLIGHT', 3)
+MQTT_COMMAND_REPLY_TIMEOUT = get_float('MQTT_COMMAND_REPLY_TIMEOUT', 3.0)
+
+# If set, the command latencies (see core/latency.py) are published to this topic, as often as they are logged.
+MQTT_TELEMETRY_TOPIC = get_string('MQTT_TELEMETRY_TOPIC', '')
+
+# When the connection drops, try to get it back without leaving the game: at once, then backing off
+# exponentially from MQTT_RECONNECT_DELAY to MQTT_RECONNECT_DELAY_MAX seconds, with a random jitter of
+# this fraction of the wait. After MQTT_FAST_RECONNECT_ATTEMPTS failed attempts, fall back to a full
+# reconnect, which shows the connection screens.
+MQTT_RECONNECT_DELAY = get_float('MQTT_RECONNECT_DELAY', 0.5)
+MQTT_RECONNECT_DELAY_MAX = get_float('MQTT_RECONNECT_DELAY_MAX', 8.0)
+MQTT_RECONNECT_JITTER = get_float('MQTT_RECONNECT_JITTER', 0.25)
+MQTT_FAST_RECONNECT_ATTEMPTS = get_int('MQTT_FAST_RECONNECT_ATTEMPTS', 5)
 
 # Optional time offset in seconds to improve syncing between SGT and the MCU
 MQTT_MANUAL_TIME_OFFSET = get_int('MQTT_MANUAL_TIME_OFFSET', 0)
+# Where to get the current unix time from, how many samples to take when connecting, and how often (in
+# seconds) to take another sample while idle, to follow the drift of the clock.
+TIME_SYNC_URL = get_string('TIME_SYNC_URL', 'https://parakoos.com/time.php')
+TIME_SYNC_SAMPLES = get_int('TIME_SYNC_SAMPLES', 4)
+TIME_SYNC_INTERVAL = get_float('TIME_SYNC_INTERVAL', 900.0)
+# Where in non-volatile memory the time offset is kept over soft reloads.
+TIME_SYNC_NVM_ADDRESS = get_int('TIME_SYNC_NVM_ADDRESS', 0)
 
 import adafruit_logging as logging
 log = logging.getLogger()
 import ssl
 import socketpool
 import wifi
-from adafruit_minimqtt.adafruit_minimqtt import MQTT as ADA_MQTT
+from adafruit_minimqtt.adafruit_minimqtt import MQTT as ADA_MQTT, MMQTTException
 from adafruit_requests import Session
 import time
 import json
 
 from core.view.view import View
 from core.connection.sgt_connection import SgtConnection
+from core.connection.command_pipeline import CommandPipeline
+from core.connection.clock_sync import ClockSync
+from core.connection.reconnect_backoff import ReconnectBackoff
 from core.game_state import GameState
+import core.latency as latency
 
 class SgtConnectionMQTT(SgtConnection):
-	command_to_send: list[tuple[str, int|None, list[int]|None]]
-	def __init__(self, view: View):
-		super().__init__(view)
+	commands: CommandPipeline
+	def __init__(self, view: View, update_state_in_place: bool = False, predict_state: bool = False):
+		super().__init__(view, update_state_in_place, predict_state)
 		self.mqtt_topic_game = f"{SGT_USER_ID}/game"
 		self.mqtt_topic_command = f"{SGT_USER_ID}/commands"
 		self.last_poll_ts = -1000
-		self.unix_time_offset = 0
-		wifi.radio.connect(WIFI_SSID, WIFI_PASSWORD)
+		self.poll_timeout = MQTT_SOCKET_TIMEOUT
+		self._connect_wifi()
 		pool = socketpool.SocketPool(wifi.radio)
 		ssl_context = ssl.create_default_context()
 		self.session = Session(pool, ssl_context)
+		self.clock = ClockSync(self.session, TIME_SYNC_URL, TIME_SYNC_SAMPLES, TIME_SYNC_INTERVAL, MQTT_MANUAL_TIME_OFFSET, TIME_SYNC_NVM_ADDRESS)
+		self.clock.load()
 		self.mqtt_client = ADA_MQTT(
 			broker=MQTT_HOST,
 			port=MQTT_PORT,
@@ -47,7 +82,7 @@ class SgtConnectionMQTT(SgtConnection):
 			password=MQTT_PASSWORD,
 			socket_pool=pool,
 			ssl_context=ssl_context,
-			is_ssl=True,
+			is_ssl=MQTT_SSL != 0,
 			socket_timeout=MQTT_SOCKET_TIMEOUT,
 		)
 		self.mqtt_client.on_connect = self._on_connected
@@ -55,21 +90,67 @@ class SgtConnectionMQTT(SgtConnection):
 		self.mqtt_client.on_message = self._on_message
 		self.mqtt_client.on_subscribe = self._on_subscribe
 		self.mqtt_client.enable_logger(logging, log_level=20, logger_name="mqtt")
-		self.command_to_send = []
+		self.commands = CommandPipeline(MQTT_MAX_COMMANDS_IN_FLIGHT, MQTT_COMMAND_REPLY_TIMEOUT)
 		self.latest_message = None
+		# The last message, and the state shown for it. A republish of the exact same message is dropped unparsed.
+		# The strings themselves are compared, as string hashes are short on CircuitPython and would collide.
+		self.previous_message = None
+		self.latest_message_state = None
+		self.recorded_offset_ms = None
+		self.ts_last_telemetry = time.monotonic()
+		self.backoff = ReconnectBackoff(MQTT_RECONNECT_DELAY, MQTT_RECONNECT_DELAY_MAX, MQTT_RECONNECT_JITTER, MQTT_FAST_RECONNECT_ATTEMPTS)
 
 	def is_connected(self):
+		# While quick reconnects are being tried, the game stays on screen as if still connected.
+		# minimqtt may still say it is connected after a socket error, so the backoff has the last word.
+		if self.backoff.is_reconnecting():
+			return not self.backoff.should_fall_back()
 		return self.mqtt_client.is_connected()
 
 	def restart(self):
+		self.commands.clear()
 		if self.mqtt_client.is_connected():
 			self.mqtt_client.disconnect()
 
 	def connect(self) -> bool:
 		self.view.switch_to_not_connected()
+		self._connect_wifi()
 		self._lookup_unix_time_offset()
 		self.view.set_connection_progress_text(f"Connecting to MQTT")
+		self._close_socket()
 		self.mqtt_client.connect()
+		self._on_reconnected('Full reconnect')
+
+	def _connect_wifi(self):
+		"Keep the Wi-Fi association if there is one, as CircuitPython may have joined the network already."
+		if not wifi.radio.connected:
+			wifi.radio.connect(WIFI_SSID, WIFI_PASSWORD)
+
+	def _close_socket(self):
+		"Let go of the socket of a dropped connection, before opening a new one."
+		try:
+			self.mqtt_client.disconnect()
+		except Exception:
+			pass
+
+	def _fast_reconnect(self):
+		"Try to get the connection back, keeping the clock offset and, if it still stands, the Wi-Fi association."
+		if not self.backoff.attempt_due(time.monotonic()):
+			return
+		try:
+			self._connect_wifi()
+			self._close_socket()
+			self.mqtt_client.connect()
+		except Exception as e:
+			self.backoff.on_failed(time.monotonic())
+			log.info(f'MQTT: reconnect attempt {self.backoff.attempts} failed: {e}')
+			return
+		self._on_reconnected('Reconnected')
+
+	def _on_reconnected(self, label: str):
+		duration = self.backoff.on_connected(time.monotonic())
+		if duration != None:
+			log.info(f'MQTT: {label} after {duration*1000:,.0f}ms. {self.backoff}')
 
 	def _on_connected(self, client, userdata, flags, rc):
 		log.info(f"MQTT: Connected")
@@ -84,26 +165,39 @@ class SgtConnectionMQTT(SgtConnection):
 	def _on_message(self, client, topic, message:str):
 		log.info(f"MQTT message: {message}")
 		self.latest_message = message
+		if self.recorder != None:
+			self._record(message)
 
-	def _enqueue_command(self, value: str, seat: int|None = None, seats: list[int]|None = None):
-		if value != None:
-			self.command_to_send.append((value, seat, seats))
+	def _record(self, message: str):
+		from core.connection.sgt_recorder import RECORD_MQTT, RECORD_CLOCK
+		if self.clock.is_synced() and self.clock.offset_ms + self.clock.manual_offset_ms != self.recorded_offset_ms:
+			# The timestamps in the messages are unix times, so playing them back needs the offset they were received with.
+			self.recorded_offset_ms = self.clock.offset_ms + self.clock.manual_offset_ms
+			self.recorder.record(RECORD_CLOCK, str(self.recorded_offset_ms))
+		self.recorder.record(RECORD_MQTT, message)
+
+	def _enqueue_command(self, value: str, seat: int|None = None, seats: list[int]|None = None) -> bool:
+		"Return true if the command was queued, rather than dropped or merged into one already queued."
+		if value == None:
+			return False
+		return self.commands.enqueue(value, seat, seats, time.monotonic(), latency.on_enqueue(value))
 
 	def send_command(self) -> bool:
-		if len(self.command_to_send) == 0 or (self.view.state != None and self.view.state.ts_command_sent_based_on_this != None and self.view.state.game_state_version != None):
+		if self.view.state == None or not self.mqtt_client.is_connected():
 			return False
-		else:
-			log.info(f"MQTT command queue length: ${len(self.command_to_send)}")
-			self._send(*self.command_to_send.pop(0))
-			return True
+		command = self.commands.pop_next(self.view.state.game_state_version, time.monotonic())
+		if command == None:
+			return False
+		log.info(f"MQTT commands in flight: {len(self.commands.in_flight)}, queued: {len(self.commands.queued)}")
+		self._send(command.action, command.seat, command.seats, command.game_state_version)
+		return True
 
-	def _send(self, value: str, seat: int|None = None, seats: list[int]|None = None):
+	def _send(self, value: str, seat: int|None = None, seats: list[int]|None = None, gameStateVersion: int|None = None):
 		if value == None:
 			return
 		log.info("send: %s", value)
-		if not self.mqtt_client.is_connected():
-			self.connect()
-		gameStateVersion = self.view.state.game_state_version
+		if gameStateVersion == None:
+			gameStateVersion = self.view.state.game_state_version
 		action_map = {"gameStateVersion": gameStateVersion, "action": value}
 		if (value == 'StartGame'):
 			if seat != None:
@@ -117,43 +211,86 @@ class SgtConnectionMQTT(SgtConnection):
 		action = json.dumps(action_map)
 		log.debug('MQTT Publish to %s value %s', self.mqtt_topic_command, action)
 		self.mqtt_client.publish(self.mqtt_topic_command, action)
-		self.view.state.ts_command_sent_based_on_this = time.monotonic()
 
-	def poll_for_new_messages(self):
-		if not self.mqtt_client.is_connected():
-			self.connect()
+	def poll_for_new_messages(self, view_busy: bool = False, max_wait: float|None = None):
+		# After a socket error, minimqtt may still say it is connected, so a lost connection is also told by the backoff.
+		if self.backoff.is_reconnecting() or not self.mqtt_client.is_connected():
+			self.backoff.on_lost(time.monotonic())
+			self._fast_reconnect()
+			if self.backoff.is_reconnecting():
+				self._expire_prediction()
+				return
+		if view_busy or self.commands.is_waiting_for_reply() or self.commands.has_queued():
+			self.poll_timeout = MQTT_SOCKET_TIMEOUT
+		else:
+			self.poll_timeout = max(MQTT_SOCKET_TIMEOUT, min(MQTT_SOCKET_TIMEOUT_MAX, max(self.poll_timeout * 2, MQTT_SOCKET_TIMEOUT_STEP)))
+		timeout = self.poll_timeout if max_wait == None else max(MQTT_SOCKET_TIMEOUT, min(self.poll_timeout, max_wait))
 		start_ts = time.monotonic()
-		self.mqtt_client.loop(MQTT_SOCKET_TIMEOUT)
+		try:
+			self.mqtt_client.loop(timeout)
+		except (OSError, MMQTTException) as e:
+			log.info(f'MQTT: connection lost: {e}')
+			self.backoff.on_lost(time.monotonic())
+			self._fast_reconnect()
+			return
 		self.view.record_polling_delay(time.monotonic() - start_ts)
-		if self.view.state != None and self.view.state.ts_command_sent_based_on_this != None:
-			if time.monotonic() - self.view.state.ts_command_sent_based_on_this > 3:
-				self.view.state.ts_command_sent_based_on_this = None
+		self.commands.expire(time.monotonic())
+		self._expire_prediction()
+		if not view_busy and not self.commands.is_waiting_for_reply() and not self.commands.has_queued() and self.clock.resync_due():
+			self._resync_clock()
+		if MQTT_TELEMETRY_TOPIC and not view_busy and latency.LATENCY_REPORT_INTERVAL > 0 and time.monotonic() - self.ts_last_telemetry >= latency.LATENCY_REPORT_INTERVAL:
+			self.ts_last_telemetry = time.monotonic()
+			self.mqtt_client.publish(MQTT_TELEMETRY_TOPIC, latency.to_json())
 
 	def handle_new_messages(self) -> None:
 		if self.latest_message == None:
 			return False
-		game_state = None if len(self.latest_message.strip()) == 0 else GameState(json_state_string=self.latest_message, timestamp_offset=self.unix_time_offset)
-		self.latest_message = None
-		self.view.set_state(game_state)
+		if self.latest_message == self.previous_message and self.view.state != None and self.view.state is self.latest_message_state:
+			# The very same message, timestamp included, so not even the timing anchor has moved.
+			self.latest_message = None
+			self.skipped_state_updates += 1
+			log.debug('Skipped republished state. (%s skipped, %s applied)', self.skipped_state_updates, self.applied_state_updates)
+			return True
+		self.previous_message = self.latest_message
+		if len(self.latest_message.strip()) == 0:
+			self.latest_message = None
+			self.view.set_state(None)
+		elif self.update_state_in_place:
+			shown_timings = self._get_shown_timings()
+			diff = self._get_live_state().update(self.latest_message, timestamp_offset=self.clock.offset, timestamp_offset_fraction=self.clock.offset_fraction)
+			self.latest_message = None
+			self._show_state(self.live_state, shown_timings, diff)
+		else:
+			shown_timings = self._get_shown_timings()
+			game_state = GameState(json_state_string=self.latest_message, timestamp_offset=self.clock.offset, timestamp_offset_fraction=self.clock.offset_fraction)
+			self.latest_message = None
+			self._show_state(game_state, shown_timings)
+		self.latest_message_state = self.view.state
+		if self.view.state != None:
+			self.commands.on_state(self.view.state.game_state_version, time.monotonic())
 		return True
 
 	def _lookup_unix_time_offset(self):
-		if self.unix_time_offset != 0:
-			log.debug(f'Unix time already set to {self.unix_time_offset:,}')
+		if self.clock.is_synced():
+			log.debug(f'Unix time offset already set to {self.clock.offset_ms:,}ms')
 			return
 		log.info(' ============================= LOOK UP UNIX TIME ==========================================')
 		self.view.set_connection_progress_text('Getting current time')
-		unix_time_url = "https://parakoos.com/time.php"
-		with self.session.get(unix_time_url) as response:
-			now = round(time.monotonic())
-			json = response.json()
-			time_unix_sec = json['unixtime']
-			diff = now - time_unix_sec
-			log.info(f"Current Unix Time: {time_unix_sec} at mono {now} (diff: {diff})")
-			self.unix_time_offset = diff + MQTT_MANUAL_TIME_OFFSET
+		self.clock.sync()
+
+	def _resync_clock(self):
+		"Take another clock sample. Blocks for the length of an HTTP request, so only do it while idle."
+		try:
+			self.clock.sample()
+			self.clock.save()
+		except Exception as e:
+			# Not being able to resync is no reason to drop the connection. Try again next interval.
+			self.clock.ts_last_sample = time.monotonic()
+			log.info(f'Clock resync failed: {e}')
 
 	def enqueue_send_primary(self, seat: int|None = None, on_success: callable[[], None] = None, on_failure: callable[[], None] = None):
-		self._enqueue_command(super().enqueue_send_primary(seat, on_success, on_failure), seat=seat)
+		if self._enqueue_command(super().enqueue_send_primary(seat, on_success, on_failure), seat=seat):
+			self._predict_primary(seat)
 	def enqueue_send_secondary(self, seat: int|None = None, on_success: callable[[], None] = None, on_failure: callable[[], None] = None):
 		self._enqueue_command(super().enqueue_send_secondary(seat, on_success, on_failure), seat=seat)
 	def enqueue_send_toggle_admin(self, on_success: callable[[], None] = None, on_failure: callable[[], None] = None):
@@ -0,0 +1,36 @@
+from core.utils.settings import get_string
+# Peripherals of a relay hub advertise with this in front of their name, which is how the hub finds them.
+RELAY_NAME_PREFIX = get_string('RELAY_NAME_PREFIX', 'SGT>')
+
+import adafruit_logging as logging
+log = logging.getLogger()
+from core.view.view import View
+from core.connection.sgt_connection_bluetooth import SgtConnectionBluetooth
+from core.game_state import JsonStateDecoder
+
+class SgtConnectionRelay(SgtConnectionBluetooth):
+	"""Receives the game from a relay hub (see SgtRelayHub) instead of from SGT on a phone.
+	The hub is another device that keeps the one MQTT session. It sends compact state lines over BLE, or
+	JSON lines for states that do not fit a compact line, and forwards the commands sent here to SGT.
+	Speaks the same protocol as the BLE connection to SGT, so everything but the advertised name and the
+	state lines is the same. A line that is neither, like a field list from a hub running other firmware,
+	is dropped and the state asked for again.
+	"""
+	def __init__(self, view: View, device_name: str, update_state_in_place: bool = False):
+		super().__init__(view,
+			device_name=RELAY_NAME_PREFIX + device_name,
+			field_order=[],
+			field_divider=';',
+			update_state_in_place=update_state_in_place,
+			compact_state=True,
+		)
+		self.decoder = JsonStateDecoder()
+
+	def handle_new_messages(self) -> bool:
+		line = self.line_to_process
+		if line != None and not self.compact_decoder.is_compact(line[1]) and not line[1].startswith('{'):
+			log.info(f'Relay: not a state line: {line[1]}')
+			self.line_to_process = None
+			self._poll_for_latest_state()
+			return False
+		return super().handle_new_messages()
@@ -0,0 +1,134 @@
+import adafruit_logging as logging
+log = logging.getLogger()
+from time import monotonic
+
+from core.view.view import View
+from core.connection.sgt_connection import SgtConnection
+from core.utils.time_utils import monotonic_ms
+from core.connection.sgt_recorder import parse_record, RECORD_MQTT, RECORD_BLE, RECORD_CLOCK
+from core.game_state import GameState, BleStateDecoder, CompactStateDecoder
+
+class SgtConnectionReplay(SgtConnection):
+	"""Plays back a session recorded by SgtRecorder (see SGT_RECORD_PATH), so that the views can be run and
+	measured without a live game. The messages are fed through handle_new_messages as they were received.
+
+	speed is how many times faster than recorded to play back, or 0 to take the next message on every poll,
+	as fast as the loop can go. The timers of the states run from when each message is played back, at
+	normal speed. Commands go nowhere, as there is no SGT to act on them.
+	BLE lines need the field_order and field_divider of the recording device.
+	"""
+	def __init__(self,
+				view: View,
+				path: str,
+				speed: float = 1.0,
+				field_order: list[str]|None = None,
+				field_divider: str = ';',
+				update_state_in_place: bool = False,
+				):
+		super().__init__(view, update_state_in_place)
+		self.path = path
+		self.speed = speed
+		self.decoder = BleStateDecoder(field_order, field_divider) if field_order != None else None
+		self.compact_decoder = CompactStateDecoder()
+		self.file = None
+		self.next_entry = None
+		self.entry_to_process = None
+		self.done = False
+		# The recorded time of the first entry, and when it was played back, both in monotonic ms.
+		self.first_entry_ms = None
+		self.start_ms = None
+		# The clock offset of the recording, to turn the unix times in MQTT messages into monotonic time.
+		self.recorded_offset_ms = 0
+		self.replayed_count = 0
+		self.ts_started = None
+
+	def is_connected(self) -> bool:
+		return self.file != None
+
+	def is_done(self) -> bool:
+		"True once every message has been played back."
+		return self.done
+
+	def connect(self):
+		self.view.set_connection_progress_text(f"Replaying {self.path}")
+		self.file = open(self.path, 'r')
+		self.next_entry = None
+		self.entry_to_process = None
+		self.done = False
+		self.first_entry_ms = None
+		self.start_ms = None
+		self.replayed_count = 0
+		self.applied_state_updates = 0
+		self.skipped_state_updates = 0
+		self.ts_started = monotonic()
+
+	def restart(self):
+		if self.file != None:
+			self.file.close()
+			self.file = None
+
+	def _read_entry(self) -> tuple[int, str, str]|None:
+		while True:
+			line = self.file.readline()
+			if not line:
+				return None
+			entry = parse_record(line)
+			if entry != None:
+				return entry
+
+	def poll_for_new_messages(self, view_busy: bool = False, max_wait: float|None = None) -> None:
+		if self.done or self.entry_to_process != None:
+			return
+		if self.next_entry == None:
+			self.next_entry = self._read_entry()
+			if self.next_entry == None:
+				self.done = True
+				seconds = monotonic() - self.ts_started
+				log.info(f'Replay done: {self.replayed_count} messages in {seconds:.2f}s ({self.applied_state_updates} applied, {self.skipped_state_updates} skipped)')
+				return
+		now_ms = monotonic_ms()
+		if self.first_entry_ms == None:
+			self.first_entry_ms = self.next_entry[0]
+			self.start_ms = now_ms
+		if self.speed > 0 and (self.next_entry[0] - self.first_entry_ms) / self.speed > now_ms - self.start_ms:
+			return
+		(entry_ms, kind, payload) = self.next_entry
+		self.next_entry = None
+		if kind == RECORD_CLOCK:
+			self.recorded_offset_ms = int(payload)
+		else:
+			self.entry_to_process = (entry_ms, kind, payload)
+
+	def handle_new_messages(self) -> bool:
+		if self.entry_to_process == None:
+			return False
+		(entry_ms, kind, payload) = self.entry_to_process
+		self.entry_to_process = None
+		self.replayed_count += 1
+		shown_timings = self._get_shown_timings()
+		now_ms = monotonic_ms()
+		if kind == RECORD_MQTT:
+			if len(payload.strip()) == 0:
+				self.view.set_state(None)
+				return True
+			# Move the timestamps by as much as the message itself was moved in time.
+			offset_ms = self.recorded_offset_ms + now_ms - entry_ms
+			offset = offset_ms // 1000
+			offset_fraction = (offset_ms % 1000) / 1000
+			if self.update_state_in_place:
+				diff = self._get_live_state().update(payload, timestamp_offset=offset, timestamp_offset_fraction=offset_fraction)
+				self._show_state(self.live_state, shown_timings, diff)
+			else:
+				self._show_state(GameState(json_state_string=payload, timestamp_offset=offset, timestamp_offset_fraction=offset_fraction), shown_timings)
+		elif kind == RECORD_BLE:
+			decoder = self.compact_decoder if self.compact_decoder.is_compact(payload) else self.decoder
+			if decoder == None:
+				raise Exception('Replaying BLE lines needs the field order')
+			if self.update_state_in_place:
+				diff = decoder.decode_into(self._get_live_state(), payload, timestamp=monotonic())
+				self._show_state(self.live_state, shown_timings, diff)
+			else:
+				self._show_state(decoder.decode(payload, timestamp=monotonic()), shown_timings)
+		else:
+			log.debug('Skipped replay entry of unknown kind: %s', kind)
+		return True
@@ -0,0 +1,49 @@
+from core.utils.time_utils import monotonic_ms
+
+# The kinds of entries in a recorded session.
+RECORD_MQTT = 'mqtt'
+RECORD_BLE = 'ble'
+# The clock offset of the MQTT connection, in ms, recorded whenever it changes.
+RECORD_CLOCK = 'clock'
+# Entries start with this, so that other lines in a captured serial console are skipped when replayed.
+RECORD_PREFIX = '@'
+
+class SgtRecorder():
+	"""Writes the messages received from SGT to a log that SgtConnectionReplay can play back.
+	Each entry is one line: '@<monotonic ms>\\t<kind>\\t<payload>'. With the path '-' the entries are printed
+	to the serial console instead, to be captured on the host. Writing to a file needs a writable
+	filesystem, see storage.remount in boot.py.
+	"""
+	def __init__(self, path: str):
+		self.path = path
+		self.file = None if path == '-' else open(path, 'a')
+		self.count = 0
+
+	def record(self, kind: str, payload: str):
+		# A line break would end the entry early. JSON is just as valid with spaces instead.
+		payload = payload.replace('\n', ' ')
+		entry = f'{RECORD_PREFIX}{monotonic_ms()}\t{kind}\t{payload}'
+		self.count += 1
+		if self.file == None:
+			print(entry)
+		else:
+			self.file.write(entry)
+			self.file.write('\n')
+			self.file.flush()
+
+	def close(self):
+		if self.file != None:
+			self.file.close()
+			self.file = None
+
+def parse_record(line: str) -> tuple[int, str, str]|None:
+	"The (monotonic ms, kind, payload) of a recorded entry, or None if the line is not one."
+	if not line.startswith(RECORD_PREFIX):
+		return None
+	parts = line.rstrip('\r\n').split('\t', 2)
+	if len(parts) != 3:
+		return None
+	try:
+		return (int(parts[0][len(RECORD_PREFIX):]), parts[1], parts[2])
+	except ValueError:
+		return None
@@ -0,0 +1,176 @@
+from core.utils.settings import get_int, get_float
+# How many relay peripherals to look for. The hub stops scanning once this many are connected.
+RELAY_PERIPHERAL_COUNT = get_int('RELAY_PERIPHERAL_COUNT', 0)
+# How often (in seconds) to scan for missing peripherals, and for how long. The scan blocks the loop, so it
+# is only run while the view is standing still.
+RELAY_SCAN_INTERVAL = get_float('RELAY_SCAN_INTERVAL', 10.0)
+RELAY_SCAN_TIMEOUT = get_float('RELAY_SCAN_TIMEOUT', 0.3)
+
+import adafruit_logging as logging
+log = logging.getLogger()
+from time import monotonic
+from adafruit_ble import BLERadio
+from adafruit_ble.advertising import Advertisement
+from adafruit_ble.advertising.standard import ProvideServicesAdvertisement
+from adafruit_ble.services.nordic import UARTService
+
+from core.connection.sgt_connection import SgtConnection
+from core.connection.sgt_connection_relay import RELAY_NAME_PREFIX
+from core.game_state import encode_compact_state, encode_json_state
+
+class RelayPeripheral():
+	def __init__(self, name: str, connection, uart: UARTService):
+		self.name = name
+		self.connection = connection
+		self.uart = uart
+		# Commands received but not yet ended by a newline. Every line counts, so they are not framed with a LineFramer.
+		self.buffer = b''
+		# Set when the peripheral has asked for the state, to send it the next loop whether it changed or not.
+		self.needs_state = True
+
+class SgtRelayHub():
+	"""Relays the game from the connection of this device to BLE peripherals running SgtConnectionRelay,
+	so only this device needs a session with SGT. The hub connects to the peripherals as a BLE central,
+	and plays the part of SGT for them: it sends them the last state received from SGT as compact state
+	lines, or as JSON lines if a state does not fit in one, and forwards their commands to its own
+	connection, which checks them and sends them on to SGT. A turn predicted here is not relayed, so the
+	peripherals never have to roll one back.
+	Add loop to the loops of main_loop, and scan as a low priority task, so the blocking scan for missing
+	peripherals does not hold up an animation.
+	"""
+	def __init__(self, connection: SgtConnection):
+		self.connection = connection
+		self.ble = BLERadio()
+		self.peripherals = []
+		self.ts_last_scan = -RELAY_SCAN_INTERVAL
+		# What was last sent, so the state is only sent on when it has changed.
+		self.sent_state = None
+		self.sent_version = None
+		self.sent_timestamp = None
+		self.relayed_states = 0
+		self.forwarded_commands = 0
+
+	def loop(self) -> bool:
+		self.peripherals = [peripheral for peripheral in self.peripherals if self._is_connected(peripheral)]
+		for peripheral in self.peripherals:
+			self._read(peripheral)
+		self._relay_state()
+		return False
+
+	def _is_connected(self, peripheral: RelayPeripheral) -> bool:
+		if peripheral.connection.connected:
+			return True
+		log.info(f'Relay: {peripheral.name} disconnected')
+		return False
+
+	def scan(self) -> bool:
+		if len(self.peripherals) < RELAY_PERIPHERAL_COUNT and monotonic() - self.ts_last_scan >= RELAY_SCAN_INTERVAL:
+			self._scan()
+		return False
+
+	def _scan(self):
+		self.ts_last_scan = monotonic()
+		connected_names = [peripheral.name for peripheral in self.peripherals]
+		# The name and the services may come in separate advertisements, the scan response holding the name.
+		names = {}
+		uart_addresses = set()
+		found = None
+		for advertisement in self.ble.start_scan(ProvideServicesAdvertisement, Advertisement, timeout=RELAY_SCAN_TIMEOUT):
+			address = advertisement.address
+			if advertisement.complete_name:
+				names[address] = advertisement.complete_name
+			if isinstance(advertisement, ProvideServicesAdvertisement) and UARTService in advertisement.services:
+				uart_addresses.add(address)
+			name = names.get(address)
+			if address in uart_addresses and name != None and name.startswith(RELAY_NAME_PREFIX) and name not in connected_names:
+				found = (name, advertisement)
+				break
+		self.ble.stop_scan()
+		if found == None:
+			return
+		(name, advertisement) = found
+		log.info(f'Relay: connecting to {name}')
+		connection = self.ble.connect(advertisement)
+		self.peripherals.append(RelayPeripheral(name, connection, connection[UARTService]))
+
+	def _read(self, peripheral: RelayPeripheral):
+		if peripheral.uart.in_waiting == 0:
+			return
+		peripheral.buffer += peripheral.uart.read(peripheral.uart.in_waiting)
+		end = peripheral.buffer.find(b'\n')
+		while end >= 0:
+			line = str(peripheral.buffer[:end], 'utf-8').strip()
+			peripheral.buffer = peripheral.buffer[end+1:]
+			if len(line) > 0:
+				self._on_line(peripheral, line)
+			end = peripheral.buffer.find(b'\n')
+
+	def _on_line(self, peripheral: RelayPeripheral, line: str):
+		if line in ('Ping', 'Poll'):
+			peripheral.needs_state = True
+		elif line == 'ACK' or line.startswith('Enable ACK'):
+			# The hub never waits for ACKs.
+			pass
+		else:
+			log.info(f'Relay: {peripheral.name} -> {line}')
+			self.forwarded_commands += 1
+			self._forward(line)
+
+	def _forward(self, line: str):
+		"Hand a command in the form of the BLE protocol, like 'Primary #3', to the connection of the hub."
+		(action, _hash, arguments) = line.partition(' #')
+		seats = [int(seat) for seat in arguments.split(',')] if len(arguments) > 0 else []
+		seat = seats[0] if len(seats) == 1 else None
+		connection = self.connection
+		if action == 'Primary':
+			connection.enqueue_send_primary(seat)
+		elif action == 'Secondary':
+			connection.enqueue_send_secondary(seat)
+		elif action == 'ToggleAdmin':
+			connection.enqueue_send_toggle_admin()
+		elif action == 'TurnAdminOn':
+			connection.enqueue_send_admin_on()
+		elif action == 'TurnAdminOff':
+			connection.enqueue_send_admin_off()
+		elif action == 'TogglePause':
+			connection.enqueue_send_toggle_pause()
+		elif action == 'TurnPauseOn':
+			connection.enqueue_send_pause_on()
+		elif action == 'TurnPauseOff':
+			connection.enqueue_send_pause_off()
+		elif action == 'Undo':
+			connection.enqueue_send_undo()
+		elif action == 'StartGame':
+			connection.enqueue_send_start_game(seat=seat, seats=seats if len(seats) > 1 else None)
+		elif action == 'StartSimTurn':
+			connection.enqueue_send_start_sim_turn(set(seats))
+		elif action in ('AddHotseatPlayer', 'CyclePlayerColor') and seat != None:
+			connection.enqueue_send_join_game_or_cycle_colors(seat)
+		elif action == 'RemovePlayer' and seat != None:
+			connection.enqueue_send_leave_game(seat)
+		else:
+			log.info(f'Relay: unknown command {line}')
+
+	def _relay_state(self):
+		state = self.connection.get_confirmed_state()
+		if state == None or len(self.peripherals) == 0:
+			return
+		changed = state is not self.sent_state or state.game_state_version != self.sent_version or state.timestamp != self.sent_timestamp
+		if not changed and not any(peripheral.needs_state for peripheral in self.peripherals):
+			return
+		line = encode_compact_state(state)
+		if line == None:
+			line = encode_json_state(state)
+		line = (line + '\n').encode('utf-8')
+		for peripheral in self.peripherals:
+			if changed or peripheral.needs_state:
+				try:
+					peripheral.uart.write(line)
+					peripheral.needs_state = False
+				except Exception as e:
+					# The peripheral went away mid-write. It is dropped once its connection says so.
+					log.info(f'Relay: could not send to {peripheral.name}: {e}')
+		self.sent_state = state
+		self.sent_version = state.game_state_version
+		self.sent_timestamp = state.timestamp
+		self.relayed_states += 1
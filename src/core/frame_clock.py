@@ -0,0 +1,13 @@
+from time import monotonic
+
+# A clock that only moves once per frame, meaning once per iteration of the main loop.
+# Everything worked out during a frame should read frame_clock.now rather than call monotonic(),
+# so that all the views agree on the time.
+frame = 0
+now = monotonic()
+
+def tick():
+	"Start a new frame. Called once per iteration by the loops that animate the views."
+	global frame, now
+	frame += 1
+	now = monotonic()
@@ -0,0 +1,85 @@
+from core.utils.settings import get_float
+# Frames per second to animate at while the view is busy animating. 0 to animate on every pass of the loop.
+MAIN_LOOP_FPS = get_float('MAIN_LOOP_FPS', 50.0)
+# Frames per second to animate at while the view is standing still. A new state or a button press animates at once.
+MAIN_LOOP_IDLE_FPS = get_float('MAIN_LOOP_IDLE_FPS', 2.0)
+# The longest (in seconds) to sleep between frames before checking the buttons and the connection again.
+# Bounds how long a button press or an incoming message waits before it is seen to.
+MAIN_LOOP_SLEEP_SLICE = get_float('MAIN_LOOP_SLEEP_SLICE', 0.01)
+
+from time import monotonic, sleep
+
+import core.frame_clock as frame_clock
+
+# The frame rate asked for with request_fps while animating the latest frame. 0 if none was.
+requested_fps = 0.0
+
+def start_frame():
+	"Call right before animating a frame. The animations ask for their frame rate anew every frame."
+	global requested_fps
+	requested_fps = 0.0
+
+def request_fps(fps: float):
+	"""Call from animate, for something that moves too slowly to make the view busy, like a slow pulse or
+	dots creeping along. Frames are then animated at least fps times per second, if below the busy rate."""
+	global requested_fps
+	if fps > requested_fps:
+		requested_fps = fps
+
+def get_frame_seconds(view_busy: bool, frame_seconds: float, idle_frame_seconds: float) -> float:
+	"The time between frames, for the view being busy or not and the frame rate asked for by the animations."
+	if view_busy:
+		return frame_seconds
+	if requested_fps > 0:
+		return min(idle_frame_seconds, max(frame_seconds, 1 / requested_fps))
+	return idle_frame_seconds
+
+class FramePacer():
+	"""Decides when the main loop animates a frame, and sleeps away the time in between.
+	A view that stands still gets the same pixels shown over and over, so while it is not busy, frames
+	are only animated at the idle rate, or at the rate asked for with request_fps by anything that moves
+	slowly. Anything that changes what is shown, like a button press or a new state, should call wake, to
+	have the next frame animated at once.
+	The sleeps are short slices rather than one sleep until the next frame: the keypad holds the pins, so
+	they can not be alarms to wake up on, and the buttons and the connection are checked between slices.
+	A slice is the most a whole pass of the loop may wait, so polling the connection should wait no longer
+	than get_max_wait, and the pass then sleeps what is left of the slice. CircuitPython light sleeps
+	through time.sleep.
+	"""
+	def __init__(self, fps: float = MAIN_LOOP_FPS, idle_fps: float = MAIN_LOOP_IDLE_FPS, sleep_slice: float = MAIN_LOOP_SLEEP_SLICE):
+		self.frame_seconds = 1 / fps if fps > 0 else 0
+		self.idle_frame_seconds = 1 / idle_fps if idle_fps > 0 else self.frame_seconds
+		self.sleep_slice = sleep_slice
+		self.wake_requested = True
+		self.skipped_passes = 0
+		self.ts_pass_start = monotonic()
+
+	def wake(self):
+		self.wake_requested = True
+
+	def _get_frame_seconds(self, view_busy: bool) -> float:
+		return get_frame_seconds(view_busy, self.frame_seconds, self.idle_frame_seconds)
+
+	def is_frame_due(self, view_busy: bool) -> bool:
+		"Call at the start of each pass."
+		self.ts_pass_start = monotonic()
+		if self.wake_requested or monotonic() - frame_clock.now >= self._get_frame_seconds(view_busy):
+			self.wake_requested = False
+			start_frame()
+			return True
+		self.skipped_passes += 1
+		return False
+
+	def get_max_wait(self, view_busy: bool) -> float:
+		"How long the rest of this pass may wait: until the next frame is due, but no longer than what is left of the slice."
+		if self.wake_requested:
+			return 0
+		now = monotonic()
+		remaining = min(self._get_frame_seconds(view_busy) - (now - frame_clock.now), self.sleep_slice - (now - self.ts_pass_start))
+		return remaining if remaining > 0 else 0
+
+	def sleep(self, view_busy: bool):
+		"Sleep away what is left of the wait of this pass. See get_max_wait."
+		remaining = self.get_max_wait(view_busy)
+		if remaining > 0:
+			sleep(remaining)
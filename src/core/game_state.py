@@ -1,40 +1,55 @@
 import adafruit_logging as logging
 log = logging.getLogger()
 import json
-import time
 
+import core.frame_clock as frame_clock
 from core.utils.log import log_exception
 from core.color import PlayerColor, WHITE
 
 def get_state_int(state, key, default=0):
 	return int(state[key]) if key in state and state[key] != None and state[key] != "" else default
 
+# Colors are cached between consecutive states, so that an unchanged player color keeps
+# the very same PlayerColor object. Only the colors used by the latest state are kept.
 color_cache_old = dict()
 color_cache_new = dict()
-def get_state_color(state, keyRgb, keyHsv, default=WHITE) -> PlayerColor:
-	key = keyHsv if keyHsv in state else keyRgb
-	color_hex = get_state_string(state, key, '')
+def start_color_cache():
+	global color_cache_new
+	color_cache_new = dict()
+
+def end_color_cache():
+	global color_cache_old
+	color_cache_old = color_cache_new
+
+def get_color(color_hex: str, hsv: bool, default=WHITE) -> PlayerColor:
 	if len(color_hex) != 6:
 		return default
 	if color_hex in color_cache_old:
 		color = color_cache_old[color_hex]
 	else:
-		color = PlayerColor(color_hex, key == keyHsv)
+		color = PlayerColor(color_hex, hsv)
 		color_cache_old[color_hex] = color
-	color_cache_new[color_hex] = color_cache_old[color_hex]
+	color_cache_new[color_hex] = color
 	return color
 
+def get_state_color(state, keyRgb, keyHsv, default=WHITE) -> PlayerColor:
+	key = keyHsv if keyHsv in state else keyRgb
+	return get_color(get_state_string(state, key, ''), key == keyHsv, default)
+
 def get_state_string(state, key, default=""):
 	return state[key] if key in state and state[key] != None and len(state[key].strip()) > 0 else default
 
-def get_sub_state(state, key) -> dict:
-	return state[key] if key in state and state[key] != None else {}
+def parse_int(value: str, default=0):
+	return int(value) if value != "" else default
 
-def get_action(state, key):
-	return Action(state[key]) if key in state and state[key] != None else None
+def parse_string(value: str, default=""):
+	return value if len(value.strip()) > 0 else default
 
-def get_players(state, key):
-	return [Player(x) for x in state[key]] if key in state and state[key] != None else []
+def parse_int_list(value: str, default=None):
+	return [int(v) for v in value.split(',')] if len(value.strip()) > 0 else default
+
+def get_sub_state(state, key) -> dict:
+	return state[key] if key in state and state[key] != None else {}
 
 class Action():
 	def __init__(self, actionState) -> None:
@@ -45,12 +60,22 @@ class Action():
 		return f'Action<{self.action} {self.label}>'
 
 class Player():
-	def __init__(self, playerState) -> None:
+	def __init__(self, playerState: dict|None = None) -> None:
+		if playerState == None:
+			playerState = {}
 		self.name = get_state_string(playerState, 'name', default=None)
 		self.seat = get_state_int(playerState, 'seat', default=None)
 		self.action = get_state_string(playerState, 'action', default=None)
 		self.color = get_state_color(playerState, 'color', 'colorHsv')
 
+	def make_copy(self):
+		copy = Player()
+		copy.name = self.name
+		copy.seat = self.seat
+		copy.action = self.action
+		copy.color = self.color
+		return copy
+
 	def __repr__(self):
 		if self.action == '':
 			return f'Player<{self.seat}, {self.color} {self.name}>'
@@ -100,150 +125,297 @@ TIMER_MODE_COUNT_DOWN = 'cd'
 TIMER_MODE_SAND_TIMER = 'st'
 TIMER_MODE_NO_TIMER = 'nt'
 
+# The GameState attributes compared by GameStateDiff. The actions and players are compared separately.
+GAME_STATE_DIFF_FIELDS = ('timestamp', 'game_state_version', 'timer_mode', 'state', 'state_type', 'turn_time_sec', 'player_time_sec', 'total_play_time_sec', 'name', 'color_p', 'seat', 'time_reminders')
+# The GameState attributes that make up the timing anchor. They change every time SGT resends a state.
+GAME_STATE_TIMING_FIELDS = ('timestamp', 'turn_time_sec', 'player_time_sec', 'total_play_time_sec')
+
+def _same_action(a: Action|None, b: Action|None):
+	if a == None or b == None:
+		return a == b
+	return a.action == b.action and a.label == b.label
+
+class GameStateDiff():
+	"""What changed between two consecutive game states.
+	fields holds the names of the changed GameState attributes, plus 'actions' and 'players' for the
+	action_* attributes and the player list. seats holds the seats whose player was added, removed or
+	changed, or who joined or left the active seats. Without an old state to compare with, everything
+	is considered changed. Comparing a state with itself finds nothing changed. Created without any
+	states, it starts out empty, ready to be filled in by an in-place update of a GameState.
+	"""
+	def __init__(self, state = None, old_state = None, full=False):
+		self.fields = set()
+		self.seats = set()
+		self.full = full
+		if state == None and old_state == None:
+			return
+		self.full = full or state == None or old_state == None
+		if self.full or state is old_state:
+			# A state updated in place can not be compared with itself, so the update returns what it changed.
+			return
+
+		for field in GAME_STATE_DIFF_FIELDS:
+			if getattr(state, field) != getattr(old_state, field):
+				self.fields.add(field)
+		if not (_same_action(state.action_primary, old_state.action_primary) and _same_action(state.action_secondary, old_state.action_secondary) and _same_action(state.action_admin, old_state.action_admin) and _same_action(state.action_pause, old_state.action_pause)):
+			self.fields.add('actions')
+
+		for player in state.players:
+			old_player = old_state.get_player_by_seat(player.seat)
+			if old_player == None or player.action != old_player.action or player.color is not old_player.color or player.name != old_player.name:
+				self.seats.add(player.seat)
+		for old_player in old_state.players:
+			if state.get_player_by_seat(old_player.seat) == None:
+				self.seats.add(old_player.seat)
+		if 'seat' in self.fields:
+			self.add_active_seat_changes(state.seat, old_state.seat)
+		if len(self.seats) > 0 or len(state.players) != len(old_state.players):
+			self.fields.add('players')
+		else:
+			for player, old_player in zip(state.players, old_state.players):
+				if player.seat != old_player.seat:
+					self.fields.add('players')
+					break
+
+	def add_active_seat_changes(self, seats: list[int], old_seats: list[int]):
+		for seat in seats:
+			if seat not in old_seats:
+				self.seats.add(seat)
+		for seat in old_seats:
+			if seat not in seats:
+				self.seats.add(seat)
+
+	def changed(self, *fields: str) -> bool:
+		"Return true if any of the given fields have changed."
+		if self.full:
+			return True
+		for field in fields:
+			if field in self.fields:
+				return True
+		return False
+
+	def seat_changed(self, seat: int) -> bool:
+		return self.full or seat in self.seats
+
+	def only_timings_changed(self) -> bool:
+		"Return true if nothing but the timing anchor has changed, as when SGT resends the same state."
+		if self.full or len(self.seats) > 0:
+			return False
+		for field in self.fields:
+			if field not in GAME_STATE_TIMING_FIELDS:
+				return False
+		return True
+
+	def __repr__(self):
+		if self.full:
+			return '<GameStateDiff: full>'
+		return f'<GameStateDiff: fields={self.fields}, seats={self.seats}>'
+
 class GameState():
 
-	def __init__(self,
-				ble_state_string: str|None = None, ble_field_order: list[str]|None = None, ble_field_divider: str|None = None,
-				json_state_string: str|None = None,
-				timestamp_offset = 0):
-		global color_cache_old, color_cache_new
-		color_cache_new = dict()
-		state = {}
-		if (json_state_string != None):
-			try:
-				state = json.loads(json_state_string)
-			except Exception as e:
-				print(json_state_string)
-				log_exception(e)
-		elif ble_state_string != None and ble_field_order != None and ble_field_divider != None:
-			values = ble_state_string.split(ble_field_divider)
-			if len(values) != len(ble_field_order):
-				raise Exception(f"Different number of values from the keys. ({len(values)} != {len(ble_field_order)})")
-			state["ts"]=time.monotonic()
-
-			simple_mappings = [
-				('sgtTimerMode', 'timerMode'),
-				('sgtColor', 'color'),
-				('sgtColorHsv', 'colorHsv'),
-				('sgtTurnTime', 'turnTime'),
-				('sgtState', 'state'),
-				('sgtStateType', 'stateType'),
-				('sgtName', 'name'),
-				('sgtPlayerTime', 'playerTime'),
-				('sgtTotalPlayTime', 'totalPlayTime'),
-				('sgtActionAdmin', 'actionAdmin'),
-				('sgtActionInactive', 'actionInactive'),
-				('sgtActionPause', 'actionPause'),
-				('sgtActionPrimary', 'actionPrimary'),
-				('sgtActionSecondary', 'actionSecondary'),
-				('sgtActionUndo', 'actionUndo'),
-				('sgtGameStateVersion', 'gameStateVersion'),
-				('sgtPlayerActions', 'playerActions'),
-				('sgtPlayerColors', 'playerColors'),
-				('sgtPlayerColorsHsv', 'playerColorsHsv'),
-				('sgtPlayerNames', 'playerNames'),
-				('sgtPlayerSeats', 'playerSeats'),
-			]
-			for (sgt_name, state_name) in simple_mappings:
-				if sgt_name in ble_field_order:
-					state[state_name] = values[ble_field_order.index(sgt_name)]
-
-			if 'sgtSeat' in ble_field_order:
-				val = values[ble_field_order.index('sgtSeat')]
-				state['seat'] = json.loads(f"[{val}]")
-
-			if 'sgtTimeReminders' in ble_field_order:
-				val = values[ble_field_order.index('sgtTimeReminders')]
-				if len(val) > 0:
-					state['timeReminders'] = json.loads(f"[{val}]")
-
-			players = None
-			sgtPlayerActions = values[ble_field_order.index('sgtPlayerActions')].split(',') if 'sgtPlayerActions' in ble_field_order else None
-			sgtPlayerColors = values[ble_field_order.index('sgtPlayerColors')].split(',') if 'sgtPlayerColors' in ble_field_order else None
-			sgtPlayerColorsHsv = values[ble_field_order.index('sgtPlayerColorsHsv')].split(',') if 'sgtPlayerColorsHsv' in ble_field_order else None
-			sgtPlayerNames = values[ble_field_order.index('sgtPlayerNames')].split(',') if 'sgtPlayerNames' in ble_field_order else None
-			sgtPlayerSeats = values[ble_field_order.index('sgtPlayerSeats')].split(',') if 'sgtPlayerSeats' in ble_field_order else None
-			nonNullPlayerArr = sgtPlayerActions or sgtPlayerColors or sgtPlayerNames or sgtPlayerSeats or None
-			if (nonNullPlayerArr != None):
-				players = [{} for _item in nonNullPlayerArr]
-				if sgtPlayerActions:
-					for index, val in enumerate(sgtPlayerActions):
-						players[index]['action'] = val
-				if sgtPlayerColors:
-					for index, val in enumerate(sgtPlayerColors):
-						players[index]['color'] = val
-				if sgtPlayerColorsHsv:
-					for index, val in enumerate(sgtPlayerColorsHsv):
-						players[index]['colorHsv'] = val
-				if sgtPlayerNames:
-					for index, val in enumerate(sgtPlayerNames):
-						players[index]['name'] = val
-				if sgtPlayerSeats:
-					for index, val in enumerate(sgtPlayerSeats):
-						players[index]['seat'] = val
-				state['players'] = players
+	def __init__(self, json_state_string: str|None = None, timestamp_offset = 0, timestamp_offset_fraction = 0.0):
 		# When was this state sent? (in monotonic space)
-		ts = get_state_int(state, 'ts', 0)
-		self.timestamp = ts + timestamp_offset
+		self.timestamp = 0
 
 		# The last version of the state, used to prevent doing actions against old states. Must be sent with each command.
-		self.game_state_version = get_state_int(state, 'gameStateVersion', -1)
+		self.game_state_version = -1
 
 		# Current timer-mode (cd/cu/st/nt for Count-Down/Up, SandTimer, No Timer)
-		self.timer_mode = get_state_string(state, 'timerMode', TIMER_MODE_COUNT_UP)
+		self.timer_mode = TIMER_MODE_COUNT_UP
 
 		# The current state.
 		# Sand, ru/nr/pa/en for running, not running, paused or end
 		# Not Sand, st/en/pa/ad/pl for start, end, pause, admin or playing
-		self.state = get_state_string(state, 'state', STATE_NOT_CONNECTED)
+		self.state = STATE_NOT_CONNECTED
 
 		# mt/ms/et/er/bg/se for Mid-Turn, Mid-Sim-Turn, End-of-Turn, End-of-Round, Before-Game, Setup if in Admin Time
-		self.state_type = get_state_string(state, 'stateType')
+		self.state_type = ""
 
 		# Count-Up, time taken this turn or pause time or admin time
 		# Count-Down, same as above, but negative values during Delay Time
 		# Sand, time taken out of the sand timer
-		self.turn_time_sec = get_state_int(state, 'turnTime')
+		self.turn_time_sec = 0
 
-		self.player_time_sec = get_state_int(state, 'playerTime')
+		self.player_time_sec = 0
 
 		# Count-Up/Down, total play time, not counting this turn and not admin/pause time
-		self.total_play_time_sec = get_state_int(state, 'totalPlayTime')
+		self.total_play_time_sec = 0
 
 		# (not sand) The current or next-up player name
-		self.name = get_state_string(state, 'name', "(no name)")
+		self.name = "(no name)"
 
 		# (not sand) The current or next-up player color
-		self.color_p = get_state_color(state, 'color', 'colorHsv')
+		self.color_p = WHITE
 
 		# Different actions. Either None or a string starting with 'game/{action}' that
 		# can be sent to the MQTT commands queue to issue commands
+		self.action_primary = None
+		self.action_secondary = None
+		self.action_admin = None
+		self.action_pause = None
+
+		self.players = []
+		# One Player object per seat (index is seat-1), reused when the state is updated in place.
+		self.player_pool = []
+		# The players in the game by seat (index is seat-1, None if nobody sits there), and the players
+		# whose turn it is. Rebuilt by index_seats whenever the players or the active seats change.
+		self.seat_index = []
+		self.active_players = []
+		self.active_player = None
+
+		self.seat = []
+
+		self.time_reminders = None
+
+		# The timings of the current frame, worked out on the first call to get_current_timings each frame.
+		self.current_times = None
+		self.current_times_frame = -1
+
+		if (json_state_string != None):
+			self.update(json_state_string, timestamp_offset, timestamp_offset_fraction)
+
+	def update(self, json_state_string: str, timestamp_offset = 0, timestamp_offset_fraction = 0.0) -> GameStateDiff:
+		"""Overwrite this state in place with a newly received JSON state. Returns what changed.
+		The unix time of the state is turned into monotonic time by adding the timestamp offset in whole
+		seconds first, while the numbers are still integers, and then the fraction of a second.
+		"""
+		diff = GameStateDiff()
+		start_color_cache()
+		state = {}
+		try:
+			state = json.loads(json_state_string)
+		except Exception as e:
+			log.error(f'Could not parse the state: {json_state_string}')
+			log_exception(e)
+		self.set_field('timestamp', (get_state_int(state, 'ts', 0) + timestamp_offset) + timestamp_offset_fraction, diff)
+		self.set_field('game_state_version', get_state_int(state, 'gameStateVersion', -1), diff)
+		self.set_field('timer_mode', get_state_string(state, 'timerMode', TIMER_MODE_COUNT_UP), diff)
+		self.set_field('state', get_state_string(state, 'state', STATE_NOT_CONNECTED), diff)
+		self.set_field('state_type', get_state_string(state, 'stateType'), diff)
+		self.set_field('turn_time_sec', get_state_int(state, 'turnTime'), diff)
+		self.set_field('player_time_sec', get_state_int(state, 'playerTime'), diff)
+		self.set_field('total_play_time_sec', get_state_int(state, 'totalPlayTime'), diff)
+		self.set_field('name', get_state_string(state, 'name', "(no name)"), diff)
+		self.set_field('color_p', get_state_color(state, 'color', 'colorHsv'), diff)
+
 		actions = get_sub_state(state, 'actions')
-		self.action_primary = get_action(actions, 'primary')
-		self.action_secondary = get_action(actions, 'secondary')
-		self.action_admin = get_action(actions, 'admin')
-		self.action_pause = get_action(actions, 'pause')
+		self.set_action('action_primary', actions.get('primary'), diff)
+		self.set_action('action_secondary', actions.get('secondary'), diff)
+		self.set_action('action_admin', actions.get('admin'), diff)
+		self.set_action('action_pause', actions.get('pause'), diff)
 
-		self.players = get_players(state, 'players')
+		player_states = state['players'] if 'players' in state and state['players'] != None else ()
+		for index, player_state in enumerate(player_states):
+			self.set_player(index, get_state_int(player_state, 'seat', default=None), get_state_string(player_state, 'name', default=None), get_state_string(player_state, 'action', default=None), get_state_color(player_state, 'color', 'colorHsv'), diff)
+		self.end_players(len(player_states), diff)
 
 		state_var = state['seat'] if 'seat' in state and state['seat'] != None else None
 		if isinstance(state_var, int):
-			self.seat = [state_var]
+			self.set_field('seat', [state_var], diff)
 		elif isinstance(state_var, list):
-			self.seat = [int(seat) for seat in state_var]
+			self.set_field('seat', [int(seat) for seat in state_var], diff)
 		else:
-			self.seat = []
+			self.set_field('seat', [], diff)
 
 		time_reminders_var = state['timeReminders'] if 'timeReminders' in state and state['timeReminders'] != None else None
 		if isinstance(time_reminders_var, list):
-			self.time_reminders = [int(tr) for tr in time_reminders_var]
+			self.set_field('time_reminders', [int(tr) for tr in time_reminders_var], diff)
 		else:
-			self.time_reminders = None
+			self.set_field('time_reminders', None, diff)
+
+		if diff.changed('players', 'seat'):
+			self.index_seats()
+		self.current_times_frame = -1
+		end_color_cache()
+		return diff
+
+	def set_field(self, field: str, value, diff: GameStateDiff):
+		old_value = getattr(self, field)
+		if old_value != value:
+			setattr(self, field, value)
+			diff.fields.add(field)
+			if field == 'seat':
+				diff.add_active_seat_changes(value, old_value)
+
+	def set_action(self, field: str, action_state: dict|None, diff: GameStateDiff):
+		action = getattr(self, field)
+		if action_state == None:
+			if action != None:
+				setattr(self, field, None)
+				diff.fields.add('actions')
+		elif action == None or action.action != get_state_string(action_state, 'action', default=None) or action.label != get_state_string(action_state, 'label', default=None):
+			setattr(self, field, Action(action_state))
+			diff.fields.add('actions')
+
+	def get_pooled_player(self, seat: int|None) -> Player:
+		"The Player object kept for this seat. Grows the pool to the highest seat seen."
+		if seat == None or seat < 1:
+			return Player()
+		while len(self.player_pool) < seat:
+			self.player_pool.append(None)
+		player = self.player_pool[seat-1]
+		if player == None:
+			player = Player()
+			player.seat = seat
+			self.player_pool[seat-1] = player
+		return player
+
+	def set_player(self, index: int, seat: int|None, name: str|None, action: str|None, color: PlayerColor, diff: GameStateDiff):
+		"Write the player at this position of the turn order, reusing the pooled Player of the seat."
+		player = self.get_pooled_player(seat)
+		if player.name != name or player.action != action or player.color is not color:
+			player.name = name
+			player.action = action
+			player.color = color
+			diff.seats.add(seat)
+		if index == len(self.players):
+			self.players.append(player)
+			diff.seats.add(seat)
+		elif self.players[index] is not player:
+			# A player joined, left or the turn order changed. Both seats are marked as changed.
+			diff.seats.add(self.players[index].seat)
+			diff.seats.add(seat)
+			self.players[index] = player
+
+	def end_players(self, player_count: int, diff: GameStateDiff):
+		"Drop the players beyond the new player count after calling set_player for each player."
+		while len(self.players) > player_count:
+			diff.seats.add(self.players.pop().seat)
+		if len(diff.seats) > 0:
+			diff.fields.add('players')
+
+	def index_seats(self):
+		"Rebuild the seat lookups from the players and the active seats. Call after changing either."
+		seat_index = self.seat_index
+		for i in range(len(seat_index)):
+			seat_index[i] = None
+		for player in self.players:
+			if player.seat == None or player.seat < 1:
+				continue
+			while len(seat_index) < player.seat:
+				seat_index.append(None)
+			seat_index[player.seat-1] = player
+
+		self.active_players.clear()
+		for seat in self.seat:
+			player = self.get_player_by_seat(seat)
+			if player != None:
+				self.active_players.append(player)
 
-		self.current_times = None
-		color_cache_old = color_cache_new
+		if len(self.seat) == 1:
+			self.active_player = self.get_player_by_seat(self.seat[0])
+		elif len(self.seat) == 0:
+			self.active_player = next((p for p in self.players if p.action == 'pr' or p.action == 'se'), None)
+		else:
+			self.active_player = None
 
-		self.ts_command_sent_based_on_this = None
+	def move_timing_anchor(self, other):
+		"Take over the timing anchor of another GameState, which is otherwise the same as this one."
+		self.timestamp = other.timestamp
+		self.turn_time_sec = other.turn_time_sec
+		self.player_time_sec = other.player_time_sec
+		self.total_play_time_sec = other.total_play_time_sec
+		self.current_times_frame = -1
 
 	def has_action(self, action):
 		return self.action_admin == action or self.action_pause == action or self.action_primary == action or self.action_secondary == action
@@ -253,18 +425,25 @@ class GameState():
 	def allow_reorder(self):
 		return self.state == STATE_ADMIN and self.state_type == STATE_TYPE_END_OF_ROUND
 	def get_active_player(self) -> Player | None:
-		if len(self.seat) == 1:
-			return next((p for p in self.players if p.seat == self.seat[0]), None)
-		elif len(self.seat) == 0:
-			return next((p for p in self.players if p.action == 'pr' or p.action == 'se'), None)
-		else:
-			return None
+		"The player whose turn it is, or None if there is no single such player."
+		return self.active_player
 
-	def get_player_by_seat(self, seat: int) -> Player | None:
-		return next((p for p in self.players if p.seat == seat), None)
+	def get_active_players(self) -> list[Player]:
+		"The players of the active seats, in seat order of the state. Do not modify the returned list."
+		return self.active_players
 
-	def get_current_timings(self):
-		now = time.monotonic()
+	def get_player_by_seat(self, seat: int|None) -> Player | None:
+		if seat == None or seat < 1 or seat > len(self.seat_index):
+			return None
+		return self.seat_index[seat-1]
+
+	def get_current_timings(self) -> CurrentTimes:
+		"""The timings as of the current frame. They are only worked out on the first call each frame,
+		and the same CurrentTimes object is updated in place every frame, so do not hold on to it.
+		"""
+		if self.current_times_frame == frame_clock.frame:
+			return self.current_times
+		now = frame_clock.now
 
 		if self.timer_mode == None:
 			raise Exception(f'Unkown timer mode: {self.timer_mode}')
@@ -320,7 +499,14 @@ class GameState():
 		else:
 			raise Exception(f'Unkown timer mode: {self.timer_mode}')
 
-		self.current_times = CurrentTimes(now, turn_time, player_time, total_play_time)
+		if self.current_times == None:
+			self.current_times = CurrentTimes(now, turn_time, player_time, total_play_time)
+		else:
+			self.current_times.ts = now
+			self.current_times.turn_time = turn_time
+			self.current_times.player_time = player_time
+			self.current_times.total_play_time = total_play_time
+		self.current_times_frame = frame_clock.frame
 		return self.current_times
 
 	def __repr__(self):
@@ -370,12 +556,320 @@ class GameState():
 		copy.turn_time_sec = self.turn_time_sec
 		copy.player_time_sec = self.player_time_sec
 		copy.total_play_time_sec = self.total_play_time_sec
+		copy.state_type = self.state_type
+		copy.time_reminders = self.time_reminders
 		copy.name = self.name
 		copy.color_p = self.color_p
 		copy.action_primary = self.action_primary
 		copy.action_secondary = self.action_secondary
 		copy.action_admin = self.action_admin
 		copy.action_pause = self.action_pause
-		copy.players = self.players
+		# The players are copied, as the originals are reused when this state is updated in place.
+		copy.players = [player.make_copy() for player in self.players]
 		copy.seat = self.seat
-		return copy
\ No newline at end of file
+		copy.index_seats()
+		return copy
+
+# (BLE field name, GameState attribute, parser, default)
+BLE_SIMPLE_FIELDS = (
+	('sgtGameStateVersion', 'game_state_version', parse_int, -1),
+	('sgtTimerMode', 'timer_mode', parse_string, TIMER_MODE_COUNT_UP),
+	('sgtState', 'state', parse_string, STATE_NOT_CONNECTED),
+	('sgtStateType', 'state_type', parse_string, ""),
+	('sgtTurnTime', 'turn_time_sec', parse_int, 0),
+	('sgtPlayerTime', 'player_time_sec', parse_int, 0),
+	('sgtTotalPlayTime', 'total_play_time_sec', parse_int, 0),
+	('sgtName', 'name', parse_string, "(no name)"),
+	('sgtSeat', 'seat', parse_int_list, []),
+	('sgtTimeReminders', 'time_reminders', parse_int_list, None),
+)
+
+class BleStateDecoder():
+	"""Decodes the lines of the BLE write script into GameStates.
+	The field positions are resolved once, so decoding a line is a single pass over its values.
+	"""
+	def __init__(self, field_order: list[str], field_divider: str):
+		self.field_divider = field_divider
+		self.field_count = len(field_order)
+		index = {name: i for i, name in enumerate(field_order)}
+		self.simple_fields = tuple((index[ble_name], attr, parser, default) for (ble_name, attr, parser, default) in BLE_SIMPLE_FIELDS if ble_name in index)
+
+		# HSV colors take precedence over RGB ones if both are present.
+		self.color_hsv = 'sgtColorHsv' in index
+		self.i_color = index.get('sgtColorHsv', index.get('sgtColor'))
+		self.player_colors_hsv = 'sgtPlayerColorsHsv' in index
+		self.i_player_colors = index.get('sgtPlayerColorsHsv', index.get('sgtPlayerColors'))
+		self.i_player_seats = index.get('sgtPlayerSeats')
+		self.i_player_actions = index.get('sgtPlayerActions')
+		self.i_player_names = index.get('sgtPlayerNames')
+		self.i_player_fields = tuple(i for i in (self.i_player_seats, self.i_player_actions, self.i_player_colors, self.i_player_names) if i != None)
+
+	def decode(self, line: str, timestamp: float) -> GameState:
+		"Decode a line into a new GameState. The timestamp is when the line was received, in monotonic space."
+		state = GameState()
+		self.decode_into(state, line, timestamp)
+		return state
+
+	def decode_into(self, state: GameState, line: str, timestamp: float) -> GameStateDiff:
+		"Decode a line by overwriting an existing GameState in place. Returns what changed."
+		values = line.split(self.field_divider)
+		if len(values) != self.field_count:
+			raise Exception(f"Different number of values from the keys. ({len(values)} != {self.field_count})")
+
+		diff = GameStateDiff()
+		start_color_cache()
+		state.set_field('timestamp', timestamp, diff)
+		for (i, attr, parser, default) in self.simple_fields:
+			state.set_field(attr, parser(values[i], default), diff)
+		if self.i_color != None:
+			state.set_field('color_p', get_color(values[self.i_color].strip(), self.color_hsv), diff)
+
+		if len(self.i_player_fields) > 0:
+			player_count = 0
+			if len(values[self.i_player_fields[0]]) > 0:
+				seats = values[self.i_player_seats].split(',') if self.i_player_seats != None else None
+				actions = values[self.i_player_actions].split(',') if self.i_player_actions != None else None
+				colors = values[self.i_player_colors].split(',') if self.i_player_colors != None else None
+				names = values[self.i_player_names].split(',') if self.i_player_names != None else None
+				player_count = len(seats or actions or colors or names)
+				for n in range(player_count):
+					state.set_player(n,
+						parse_int(seats[n], None) if seats != None else None,
+						parse_string(names[n], None) if names != None else None,
+						parse_string(actions[n], None) if actions != None else None,
+						get_color(colors[n].strip(), self.player_colors_hsv) if colors != None else WHITE,
+						diff)
+			state.end_players(player_count, diff)
+
+		if diff.changed('players', 'seat'):
+			state.index_seats()
+		state.current_times_frame = -1
+		end_color_cache()
+		return diff
+
+
+# Compact state lines are a denser alternative to the field_divider separated lines, used between a relay
+# hub and its peripherals (see SgtRelayHub). SGT does not send them.
+# Every value is written with the 64 characters of COMPACT_DIGITS, so a compact line never holds a
+# newline or a field divider, and it is framed like any other line. Numbers have a fixed width, the
+# codes (timer mode, state, state type and player actions) take one character each and colors are
+# packed into four characters. Names are written as their length in one digit followed by the name
+# itself, cut to COMPACT_NAME_MAX_LENGTH characters and with any line breaks turned into spaces.
+# Seats and counts take one digit, so a state with a seat or a count above 63 can not be written as
+# a compact line, and is sent as a JSON line instead (see encode_json_state).
+# A line is laid out as:
+#   ~ version(1) color-flags(1) gameStateVersion(4) timerMode(1) state(1) stateType(1) color(4)
+#   turnTime(4) playerTime(4) totalPlayTime(4) name(1+) seat-count(1) seats(1 each)
+#   reminder-count(1) timeReminders(3 each) player-count(1) players(seat(1) action(1) color(4) name(1+) each)
+# The action digit of a player also holds whether the color of that player is HSV.
+# SGT sends the values as short text already, so a compact line is only about 1.4 times shorter than
+# the same state as a field_divider separated line, and 1.1 to 1.2 times with the names included (see
+# bench/bench_ble_decode.py).
+COMPACT_STATE_MARKER = '~'
+COMPACT_STATE_VERSION = '2'
+COMPACT_DIGITS = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/'
+COMPACT_DIGIT_VALUES = {digit: value for value, digit in enumerate(COMPACT_DIGITS)}
+COMPACT_DIGIT_MAX = len(COMPACT_DIGITS) - 1
+# Color flag. Set if the color of the state is HSV rather than RGB.
+COMPACT_COLOR_HSV = 1
+COMPACT_TIMER_MODES = (TIMER_MODE_COUNT_UP, TIMER_MODE_COUNT_DOWN, TIMER_MODE_SAND_TIMER, TIMER_MODE_NO_TIMER)
+COMPACT_STATES = (STATE_NOT_CONNECTED, STATE_START, STATE_PLAYING, STATE_ADMIN, STATE_PAUSE, STATE_FINISHED, STATE_RUNNING, STATE_NOT_RUNNING, STATE_SIM_TURN)
+COMPACT_STATE_TYPES = ("", STATE_TYPE_MID_TURN, STATE_TYPE_MID_SIM_TURN, STATE_TYPE_END_OF_TURN, STATE_TYPE_END_OF_ROUND, STATE_TYPE_BEFORE_GAME, STATE_TYPE_SETUP_ADMIN)
+# Player actions that none of the views look at more closely are sent as COMPACT_OTHER_ACTION.
+COMPACT_OTHER_ACTION = '?'
+COMPACT_PLAYER_ACTIONS = (None, 'pr', 'se', 'in', COMPACT_OTHER_ACTION)
+# Added to the action code of a player whose color is HSV rather than RGB.
+COMPACT_PLAYER_HSV = 8
+COMPACT_NAME_MAX_LENGTH = 63
+
+def compact_digits(value: int, width: int) -> str:
+	"Write a non-negative integer as exactly width digits, keeping the lowest bits if it does not fit."
+	digits = ''
+	for _n in range(width):
+		digits = COMPACT_DIGITS[value & 63] + digits
+		value >>= 6
+	return digits
+
+def compact_signed(value: int, width: int) -> str:
+	offset = 1 << (6 * width - 1)
+	return compact_digits(min(max(value + offset, 0), 2 * offset - 1), width)
+
+def compact_code(value, codes: tuple) -> str:
+	return COMPACT_DIGITS[codes.index(value) if value in codes else 0]
+
+def compact_color(color: PlayerColor) -> str:
+	return compact_digits(int(color.hex, 16), 4)
+
+def compact_name(name: str|None) -> str:
+	name = (name or '')[:COMPACT_NAME_MAX_LENGTH].replace('\n', ' ').replace('\r', ' ')
+	return COMPACT_DIGITS[len(name)] + name
+
+def can_encode_compact_state(state: GameState) -> bool:
+	"False if a seat or a count of the state does not fit in one compact digit."
+	time_reminders = state.time_reminders or ()
+	if len(state.seat) > COMPACT_DIGIT_MAX or len(state.players) > COMPACT_DIGIT_MAX or len(time_reminders) > COMPACT_DIGIT_MAX:
+		return False
+	for seat in state.seat:
+		if seat < 0 or seat > COMPACT_DIGIT_MAX:
+			return False
+	for player in state.players:
+		if player.seat != None and (player.seat < 0 or player.seat > COMPACT_DIGIT_MAX):
+			return False
+	return True
+
+def encode_compact_state(state: GameState) -> str|None:
+	"""Encode a GameState as a compact state line, with the timings as of the current frame.
+	Returns None if the state does not fit in a compact line. Send it with encode_json_state instead."""
+	if not can_encode_compact_state(state):
+		return None
+	times = state.get_current_timings()
+	parts = [
+		COMPACT_STATE_MARKER,
+		COMPACT_STATE_VERSION,
+		COMPACT_DIGITS[COMPACT_COLOR_HSV if state.color_p.hsv else 0],
+		compact_digits(max(state.game_state_version, 0), 4),
+		compact_code(state.timer_mode, COMPACT_TIMER_MODES),
+		compact_code(state.state, COMPACT_STATES),
+		compact_code(state.state_type, COMPACT_STATE_TYPES),
+		compact_color(state.color_p),
+		compact_signed(round(times.turn_time), 4),
+		compact_signed(round(times.player_time), 4),
+		compact_signed(round(times.total_play_time), 4),
+		compact_name(state.name),
+		COMPACT_DIGITS[len(state.seat)],
+	]
+	for seat in state.seat:
+		parts.append(COMPACT_DIGITS[seat])
+	time_reminders = state.time_reminders or ()
+	parts.append(COMPACT_DIGITS[len(time_reminders)])
+	for time_reminder in time_reminders:
+		parts.append(compact_digits(time_reminder, 3))
+	parts.append(COMPACT_DIGITS[len(state.players)])
+	for player in state.players:
+		action = COMPACT_PLAYER_ACTIONS.index(player.action) if player.action in COMPACT_PLAYER_ACTIONS else COMPACT_PLAYER_ACTIONS.index(COMPACT_OTHER_ACTION)
+		parts.append(COMPACT_DIGITS[player.seat or 0])
+		parts.append(COMPACT_DIGITS[action + (COMPACT_PLAYER_HSV if player.color.hsv else 0)])
+		parts.append(compact_color(player.color))
+		parts.append(compact_name(player.name))
+	return ''.join(parts)
+
+def get_json_color(color: PlayerColor) -> dict:
+	return {'colorHsv': color.hex} if color.hsv else {'color': color.hex}
+
+def encode_json_state(state: GameState) -> str:
+	"""Encode a GameState as a JSON state like the ones SGT sends over MQTT, with the timings as of the
+	current frame. The timestamp is left at 0, so the receiver dates it to when the line arrived (see
+	JsonStateDecoder). Used for states that encode_compact_state can not write."""
+	times = state.get_current_timings()
+	json_state = {
+		'ts': 0,
+		'gameStateVersion': state.game_state_version,
+		'timerMode': state.timer_mode,
+		'state': state.state,
+		'stateType': state.state_type,
+		'turnTime': round(times.turn_time),
+		'playerTime': round(times.player_time),
+		'totalPlayTime': round(times.total_play_time),
+		'name': state.name,
+		'seat': state.seat,
+		'timeReminders': state.time_reminders,
+		'players': [],
+	}
+	json_state.update(get_json_color(state.color_p))
+	for player in state.players:
+		json_player = {'seat': player.seat, 'name': player.name, 'action': player.action}
+		json_player.update(get_json_color(player.color))
+		json_state['players'].append(json_player)
+	return json.dumps(json_state)
+
+class JsonStateDecoder():
+	"""Decodes the JSON lines of encode_json_state into GameStates, dated to when the line was received.
+	Has the same interface as BleStateDecoder, so the two can be used interchangeably.
+	"""
+	def decode(self, line: str, timestamp: float) -> GameState:
+		"Decode a line into a new GameState. The timestamp is when the line was received, in monotonic space."
+		state = GameState()
+		self.decode_into(state, line, timestamp)
+		return state
+
+	def decode_into(self, state: GameState, line: str, timestamp: float) -> GameStateDiff:
+		"Decode a line by overwriting an existing GameState in place. Returns what changed."
+		return state.update(line, timestamp_offset=timestamp)
+
+class CompactStateDecoder():
+	"""Decodes compact state lines (see encode_compact_state) into GameStates.
+	Has the same interface as BleStateDecoder, so the two can be used interchangeably.
+	"""
+	def __init__(self):
+		self.line = ''
+		self.i = 0
+
+	def is_compact(self, line: str) -> bool:
+		return line.startswith(COMPACT_STATE_MARKER)
+
+	def decode(self, line: str, timestamp: float) -> GameState:
+		"Decode a line into a new GameState. The timestamp is when the line was received, in monotonic space."
+		state = GameState()
+		self.decode_into(state, line, timestamp)
+		return state
+
+	def read(self, width: int) -> int:
+		value = 0
+		for digit in self.line[self.i:self.i+width]:
+			value = (value << 6) | COMPACT_DIGIT_VALUES[digit]
+		self.i += width
+		return value
+
+	def read_signed(self, width: int) -> int:
+		return self.read(width) - (1 << (6 * width - 1))
+
+	def read_color(self, hsv: bool) -> PlayerColor:
+		return get_color(f'{self.read(4):06x}', hsv)
+
+	def read_name(self, default: str|None) -> str|None:
+		length = self.read(1)
+		self.i += length
+		return self.line[self.i-length:self.i] if length > 0 else default
+
+	def decode_into(self, state: GameState, line: str, timestamp: float) -> GameStateDiff:
+		"Decode a line by overwriting an existing GameState in place. Returns what changed."
+		if not line.startswith(COMPACT_STATE_MARKER + COMPACT_STATE_VERSION):
+			raise Exception(f"Not a compact state line of version {COMPACT_STATE_VERSION}: {line}")
+		self.line = line
+		self.i = 2
+		try:
+			diff = GameStateDiff()
+			start_color_cache()
+			color_flags = self.read(1)
+			state.set_field('timestamp', timestamp, diff)
+			state.set_field('game_state_version', self.read(4), diff)
+			state.set_field('timer_mode', COMPACT_TIMER_MODES[self.read(1)], diff)
+			state.set_field('state', COMPACT_STATES[self.read(1)], diff)
+			state.set_field('state_type', COMPACT_STATE_TYPES[self.read(1)], diff)
+			state.set_field('color_p', self.read_color(color_flags & COMPACT_COLOR_HSV != 0), diff)
+			state.set_field('turn_time_sec', self.read_signed(4), diff)
+			state.set_field('player_time_sec', self.read_signed(4), diff)
+			state.set_field('total_play_time_sec', self.read_signed(4), diff)
+			state.set_field('name', self.read_name("(no name)"), diff)
+			state.set_field('seat', [self.read(1) for _n in range(self.read(1))], diff)
+			time_reminder_count = self.read(1)
+			state.set_field('time_reminders', [self.read(3) for _n in range(time_reminder_count)] if time_reminder_count > 0 else None, diff)
+
+			player_count = self.read(1)
+			for n in range(player_count):
+				seat = self.read(1)
+				action_code = self.read(1)
+				action = COMPACT_PLAYER_ACTIONS[action_code & (COMPACT_PLAYER_HSV - 1)]
+				color = self.read_color(action_code & COMPACT_PLAYER_HSV != 0)
+				state.set_player(n, seat, self.read_name(None), action, color, diff)
+			state.end_players(player_count, diff)
+			if self.i != len(line):
+				raise Exception(f"Compact state line of the wrong length. ({len(line)} != {self.i})")
+
+			if diff.changed('players', 'seat'):
+				state.index_seats()
+			state.current_times_frame = -1
+			end_color_cache()
+			return diff
+		finally:
+			self.line = ''
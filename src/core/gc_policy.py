@@ -0,0 +1,53 @@
+from core.utils.settings import get_int, get_string
+# How the main loops collect garbage. 'frame' collects after every frame. 'budget' only collects when
+# free memory runs low, or after something known to allocate a lot, like a new game state.
+GC_POLICY = get_string('GC_POLICY', 'budget')
+# With the 'budget' policy, collect after a frame once free memory has dropped below this many bytes.
+GC_FREE_THRESHOLD = get_int('GC_FREE_THRESHOLD', 32768)
+# With the 'budget' policy, have the allocator collect by itself once this many bytes have been allocated
+# since the last collection, where gc.threshold is available. 0 to leave it to the allocator.
+GC_ALLOCATION_THRESHOLD = get_int('GC_ALLOCATION_THRESHOLD', 16384)
+
+import gc
+from time import monotonic_ns
+
+POLICY_FRAME = 'frame'
+POLICY_BUDGET = 'budget'
+
+policy = POLICY_BUDGET
+# How many collections were made, and how long they took, in microseconds.
+collections = 0
+collect_us_total = 0
+collect_us_max = 0
+
+def configure(new_policy: str = GC_POLICY):
+	"Pick the policy the main loops collect garbage with."
+	global policy
+	if new_policy not in (POLICY_FRAME, POLICY_BUDGET):
+		raise Exception(f'Unknown GC policy: {new_policy}')
+	policy = new_policy
+	if hasattr(gc, 'threshold'):
+		gc.threshold(GC_ALLOCATION_THRESHOLD if policy == POLICY_BUDGET and GC_ALLOCATION_THRESHOLD > 0 else -1)
+
+def collect():
+	"Collect now, whatever the policy, and time it."
+	global collections, collect_us_total, collect_us_max
+	start_ns = monotonic_ns()
+	gc.collect()
+	collect_us = (monotonic_ns() - start_ns) // 1000
+	collections += 1
+	collect_us_total += collect_us
+	collect_us_max = max(collect_us_max, collect_us)
+
+def on_frame():
+	"Call after each frame has been animated."
+	if policy == POLICY_FRAME or gc.mem_free() < GC_FREE_THRESHOLD:
+		collect()
+
+def on_allocation_heavy():
+	"Call after something that leaves a lot of garbage behind, like handling a new game state."
+	collect()
+
+def get_stats() -> str:
+	average_us = collect_us_total // collections if collections > 0 else 0
+	return f'{policy}: {collections} collections, avg/max={average_us:,}/{collect_us_max:,}us'
@@ -0,0 +1,143 @@
+from core.utils.settings import get_float, get_string
+# How often (in seconds) to log the latency histograms to the serial console, if there is anything new. 0 to never.
+LATENCY_REPORT_INTERVAL = get_float('LATENCY_REPORT_INTERVAL', 600.0)
+# Sent along with the latencies, to tell the firmware builds apart when comparing them.
+LATENCY_BUILD_LABEL = get_string('LATENCY_BUILD_LABEL', '')
+
+import adafruit_logging as logging
+log = logging.getLogger()
+import json
+
+from core.utils.time_utils import monotonic_ms
+
+# Follows a command from the button press that caused it, until the first frame that shows the state
+# acknowledging it. The stages, each timed from the end of the one before:
+#  dispatch: the keypad event that concluded the press, until its callback runs. Includes the wait for more presses.
+#  queue:    the callback, until the command is published or written.
+#  reply:    published, until the state that acknowledges it has been handled.
+#  render:   that state, until the first frame animated with it.
+#  total:    the keypad event, until that frame.
+# The histograms are kept per command type, in fixed buckets, so they never grow.
+LATENCY_STAGES = ('dispatch', 'queue', 'reply', 'render', 'total')
+# The upper edges of the buckets, in ms. Anything slower goes in one more bucket.
+LATENCY_BUCKETS_MS = (5, 10, 20, 30, 50, 75, 100, 150, 200, 300, 500, 750, 1000, 1500, 2000, 3000, 5000, 10000)
+# The keypad timestamps are supervisor.ticks_ms, which wrap around at 2**29.
+TICKS_PERIOD = 1 << 29
+
+class LatencyHistogram():
+	__slots__ = ('counts', 'count', 'max_ms')
+	def __init__(self):
+		self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+		self.count = 0
+		self.max_ms = 0
+
+	def add(self, ms: int):
+		bucket = 0
+		while bucket < len(LATENCY_BUCKETS_MS) and ms > LATENCY_BUCKETS_MS[bucket]:
+			bucket += 1
+		self.counts[bucket] += 1
+		self.count += 1
+		self.max_ms = max(self.max_ms, ms)
+
+	def percentile(self, percent: int) -> int:
+		"The upper edge of the bucket the percentile falls in, in ms, or the max if that is lower."
+		if self.count == 0:
+			return 0
+		rank = (self.count * percent + 99) // 100
+		seen = 0
+		for bucket, count in enumerate(self.counts):
+			seen += count
+			if seen >= rank:
+				return min(LATENCY_BUCKETS_MS[bucket], self.max_ms) if bucket < len(LATENCY_BUCKETS_MS) else self.max_ms
+		return self.max_ms
+
+	def __repr__(self):
+		return f'n={self.count} p50={self.percentile(50)} p95={self.percentile(95)} p99={self.percentile(99)} max={self.max_ms}'
+
+class CommandTrace():
+	__slots__ = ('action', 'press_ms', 'dispatch_ms', 'sent_ms', 'ack_ms')
+	def __init__(self, press_ms: int, dispatch_ms: int):
+		self.action = None
+		self.press_ms = press_ms
+		self.dispatch_ms = dispatch_ms
+		self.sent_ms = None
+		self.ack_ms = None
+
+# Per command type, one histogram per stage.
+histograms = {}
+# The trace of the button press whose callback is running, to be picked up by the command it enqueues.
+dispatching = None
+# Traces acknowledged, waiting for the next frame.
+acknowledged = []
+new_samples = 0
+ts_last_report_ms = monotonic_ms()
+
+def on_button_dispatch(event_ticks_ms: int, ticks_ms: int):
+	"Call right before running a button callback, with the keypad timestamp of the event that concluded the press."
+	global dispatching
+	now_ms = monotonic_ms()
+	dispatching = CommandTrace(now_ms - (ticks_ms - event_ticks_ms) % TICKS_PERIOD, now_ms)
+
+def on_button_done():
+	"Call once the button callback has returned. Presses that enqueued no command are not traced."
+	global dispatching
+	dispatching = None
+
+def on_enqueue(action: str) -> CommandTrace|None:
+	"The trace for a command being enqueued, if it comes from a button press."
+	global dispatching
+	trace = dispatching
+	if trace != None:
+		trace.action = action
+		dispatching = None
+	return trace
+
+def on_sent(trace: CommandTrace|None):
+	if trace != None:
+		trace.sent_ms = monotonic_ms()
+
+def on_acknowledged(trace: CommandTrace|None):
+	if trace != None and trace.sent_ms != None:
+		trace.ack_ms = monotonic_ms()
+		acknowledged.append(trace)
+
+def on_frame():
+	"Call after each frame has been animated."
+	global new_samples
+	if len(acknowledged) > 0:
+		now_ms = monotonic_ms()
+		for trace in acknowledged:
+			stages = get_histograms(trace.action)
+			stages[0].add(trace.dispatch_ms - trace.press_ms)
+			stages[1].add(trace.sent_ms - trace.dispatch_ms)
+			stages[2].add(trace.ack_ms - trace.sent_ms)
+			stages[3].add(now_ms - trace.ack_ms)
+			stages[4].add(now_ms - trace.press_ms)
+		new_samples += len(acknowledged)
+		acknowledged.clear()
+	if LATENCY_REPORT_INTERVAL > 0 and new_samples > 0 and monotonic_ms() - ts_last_report_ms >= LATENCY_REPORT_INTERVAL * 1000:
+		log_report()
+
+def get_histograms(action: str) -> tuple[LatencyHistogram]:
+	stages = histograms.get(action)
+	if stages == None:
+		stages = tuple(LatencyHistogram() for _stage in LATENCY_STAGES)
+		histograms[action] = stages
+	return stages
+
+def log_report():
+	"Log the percentiles of every stage, per command type, to the serial console."
+	global new_samples, ts_last_report_ms
+	new_samples = 0
+	ts_last_report_ms = monotonic_ms()
+	log.info(f'Command latencies in ms, from button press to frame shown. {LATENCY_BUILD_LABEL}')
+	for action, stages in histograms.items():
+		for stage, histogram in zip(LATENCY_STAGES, stages):
+			log.info(f'  {action:>16} {stage:>8}: {histogram}')
+
+def to_json() -> str:
+	"The percentiles of every stage, per command type, e.g. for a telemetry topic."
+	report = {'build': LATENCY_BUILD_LABEL, 'commands': {}}
+	for action, stages in histograms.items():
+		report['commands'][action] = {stage: {'n': histogram.count, 'p50': histogram.percentile(50), 'p95': histogram.percentile(95), 'p99': histogram.percentile(99), 'max': histogram.max_ms} for stage, histogram in zip(LATENCY_STAGES, stages)}
+	return json.dumps(report)
@@ -1,10 +1,15 @@
 import adafruit_logging as logging
 log = logging.getLogger()
 from microcontroller import Pin
-from gc import collect
 from time import monotonic
 
 import core.reorder as reorder
+import core.frame_clock as frame_clock
+import core.latency as latency
+import core.gc_policy as gc_policy
+import core.loop_profiler as loop_profiler
+from core.frame_pacer import FramePacer
+from core.scheduler import Scheduler, Task, PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW
 from core.utils.settings import get_float
 from core.utils.log import log_memory_usage, log_exception
 from core.connection.sgt_connection import SgtConnection
@@ -14,43 +19,83 @@ from core.buttons import Buttons
 # The speed of the animation, in Pixels/Seconds
 REORDER_COMMAND_DELAY = get_float('TABLE_REORDER_COMMAND_DELAY', 2.0)
 
+def send_reorder_when_settled(connection: SgtConnection, view: View):
+	"Send the new turn order once reordering is done, meaning all seats are in it and it has stayed the same for a while."
+	if reorder.singleton is not None and not reorder.singleton.is_done:
+		have_complete_seat_order = view.state is not None and len(reorder.singleton.new_seat_order) == len(view.state.players)
+		have_stayed_constant_long_enough = monotonic() - reorder.singleton.ts_last_change >= REORDER_COMMAND_DELAY
+		if have_complete_seat_order and have_stayed_constant_long_enough:
+			connection.enqueue_send_new_turn_order(reorder.singleton.new_seat_order)
+			reorder.singleton.is_done = True
+
 def main_loop(
 		connection: SgtConnection,
 		view: View,
 		on_connect: callable[[None], None] = None,
 		on_error: callable[[Exception], None] = None,
-		loops: tuple[callable[[None], bool]] = (),
+		loops: tuple[Task|callable[[None], bool]] = (),
 		):
+	"Loops are the tasks run besides animating the view and talking to SGT, either Tasks or plain callables. See Scheduler."
+	pacer = FramePacer()
+	scheduler = Scheduler(loops)
+	gc_policy.configure()
 	while True:
 		try:
+			gc_policy.collect()
 			log_memory_usage('Start of Loop')
 			if not connection.is_connected():
 				connection.connect()
 			while not connection.is_connected():
+				frame_clock.tick()
 				view.animate()
-				collect()
+				gc_policy.on_frame()
 			view.switch_to_no_game()
 			if on_connect:
 				on_connect()
-			collect()
+			gc_policy.collect()
+			view_busy = True
+			loops_busy = False
+			pacer.wake()
 			while connection.is_connected():
-				view.animate()
-				collect()
-				for loop in loops:
-					loop()
-				# Check if reordering is done
-				if reorder.singleton is not None and not reorder.singleton.is_done:
-					have_complete_seat_order = view.state is not None and len(reorder.singleton.new_seat_order) == len(view.state.players)
-					have_stayed_constant_long_enough = monotonic() - reorder.singleton.ts_last_change >= REORDER_COMMAND_DELAY
-					if have_complete_seat_order and have_stayed_constant_long_enough:
-						connection.enqueue_send_new_turn_order(reorder.singleton.new_seat_order)
-						reorder.singleton.is_done = True
-				connection.send_command()
-				connection.poll_for_new_messages()
+				loop_profiler.start()
+				if pacer.is_frame_due(view_busy or loops_busy):
+					frame_clock.tick()
+					view_busy = view.animate()
+					latency.on_frame()
+					loop_profiler.lap(loop_profiler.PHASE_ANIMATE)
+					gc_policy.on_frame()
+					loop_profiler.lap(loop_profiler.PHASE_COLLECT)
+					# Keep up the cadence of the high priority tasks after the slow phases of the pass.
+					scheduler.run(PRIORITY_HIGH)
+				loop_profiler.skip()
+				# While the buttons are busy, frames are animated at the busy rate. The pass that ends a busy spell
+				# may have run their callbacks, so it has the next frame animated at once.
+				was_loops_busy = loops_busy
+				loops_busy = scheduler.run(PRIORITY_NORMAL if view_busy else PRIORITY_LOW)
+				if was_loops_busy and not loops_busy:
+					pacer.wake()
+				loop_profiler.lap(loop_profiler.PHASE_LOOPS)
+				send_reorder_when_settled(connection, view)
+				loop_profiler.lap(loop_profiler.PHASE_REORDER)
+				if connection.send_command():
+					pacer.wake()
+				loop_profiler.lap(loop_profiler.PHASE_SEND)
+				# The high priority tasks run right before and after the poll, and the poll waits no longer than
+				# until the next of them falls due, so their deadlines hold through a quiet connection.
+				scheduler.run(PRIORITY_HIGH)
+				loop_profiler.skip()
+				max_wait = min(pacer.get_max_wait(view_busy or loops_busy), scheduler.get_max_wait(PRIORITY_HIGH))
+				connection.poll_for_new_messages(view_busy or loops_busy, max_wait)
+				loop_profiler.lap(loop_profiler.PHASE_POLL)
+				scheduler.run(PRIORITY_HIGH)
+				loop_profiler.skip()
 				if connection.handle_new_messages():
+					pacer.wake()
+					gc_policy.on_allocation_heavy()
 					log_memory_usage('After Game State Update')
-				else:
-					collect()
+				loop_profiler.lap(loop_profiler.PHASE_HANDLE)
+				loop_profiler.end()
+				pacer.sleep(view_busy or loops_busy)
 			log.debug('-------------------- DISCONNECTED --------------------')
 		except Exception as e:
 			log_exception(e)
@@ -92,6 +137,7 @@ class ErrorHandlerResumeOnButtonPress:
 
 		log.info('Animating error view until any button pressed')
 		while self.in_error:
+			frame_clock.tick()
 			self.view.animate()
 			self.buttons.loop()
 		self.buttons.clear_callbacks()
@@ -105,6 +151,7 @@ class ErrorHandlerNoResume:
 		log.info('Animating error until end of time')
 		try:
 			while True:
+				frame_clock.tick()
 				self.view.animate()
 		except Exception:
 			while True:
@@ -0,0 +1,81 @@
+from core.utils.settings import get_int, get_float
+# How many of the latest passes of the main loop to keep the phase timings of. 0 to not profile at all.
+LOOP_PROFILE_SAMPLES = get_int('LOOP_PROFILE_SAMPLES', 0)
+# How often (in seconds) to log the phase timings to the serial console. 0 to only log them when asked to.
+LOOP_PROFILE_REPORT_INTERVAL = get_float('LOOP_PROFILE_REPORT_INTERVAL', 60.0)
+
+import adafruit_logging as logging
+log = logging.getLogger()
+from array import array
+from time import monotonic_ns
+
+# The phases of a pass of the main loop, in the order they run. Each is timed from the end of the one before.
+PHASE_ANIMATE = 0
+PHASE_COLLECT = 1
+PHASE_LOOPS = 2
+PHASE_REORDER = 3
+PHASE_SEND = 4
+PHASE_POLL = 5
+PHASE_HANDLE = 6
+PHASE_NAMES = ('animate', 'collect', 'loops', 'reorder', 'send', 'poll', 'handle')
+
+# Whether the profiler is on. The hooks return at once when it is not, so they can stay in the loop.
+enabled = LOOP_PROFILE_SAMPLES > 0
+# One ring buffer of durations, in microseconds, per phase. Allocated once, up front.
+samples = tuple(array('L', [0] * LOOP_PROFILE_SAMPLES) for _phase in PHASE_NAMES) if enabled else ()
+# How many durations each phase has recorded. The next one goes at count % LOOP_PROFILE_SAMPLES.
+counts = array('L', [0] * len(PHASE_NAMES)) if enabled else None
+ts_lap_ns = 0
+ts_last_report_ns = monotonic_ns()
+
+def start():
+	"Call at the start of each pass, to time the first phase from."
+	global ts_lap_ns
+	if not enabled:
+		return
+	ts_lap_ns = monotonic_ns()
+
+def lap(phase: int):
+	"Call at the end of a phase, with its PHASE_ constant. A phase that did not run this pass records nothing."
+	global ts_lap_ns
+	if not enabled:
+		return
+	now_ns = monotonic_ns()
+	count = counts[phase]
+	samples[phase][count % LOOP_PROFILE_SAMPLES] = (now_ns - ts_lap_ns) // 1000
+	counts[phase] = count + 1
+	ts_lap_ns = now_ns
+
+def skip():
+	"Call instead of lap when a phase did not run, so the next phase is not timed with it."
+	global ts_lap_ns
+	if not enabled:
+		return
+	ts_lap_ns = monotonic_ns()
+
+def end():
+	"Call at the end of each pass. Logs the timings now and then."
+	if not enabled or LOOP_PROFILE_REPORT_INTERVAL <= 0:
+		return
+	if monotonic_ns() - ts_last_report_ns >= LOOP_PROFILE_REPORT_INTERVAL * 1_000_000_000:
+		log_report()
+
+def get_stats(phase: int) -> tuple[int, int, int, int, int]:
+	"The number of durations kept of a phase, and their min, mean, 95th percentile and max, in microseconds."
+	kept = min(counts[phase], LOOP_PROFILE_SAMPLES)
+	if kept == 0:
+		return (0, 0, 0, 0, 0)
+	durations = sorted(samples[phase][:kept])
+	return (kept, durations[0], sum(durations) // kept, durations[(kept * 95 + 99) // 100 - 1], durations[-1])
+
+def log_report(*_args):
+	"Log the timings of every phase to the serial console. Takes and ignores any arguments, so it can be a button callback."
+	global ts_last_report_ns
+	if not enabled:
+		log.info('Loop profiler is off. Set LOOP_PROFILE_SAMPLES to turn it on.')
+		return
+	ts_last_report_ns = monotonic_ns()
+	log.info(f'Main loop phases in us, over the last {LOOP_PROFILE_SAMPLES} passes each:')
+	for phase, name in enumerate(PHASE_NAMES):
+		(kept, min_us, mean_us, p95_us, max_us) = get_stats(phase)
+		log.info(f'  {name:>8}: n={kept} min={min_us:,} mean={mean_us:,} p95={p95_us:,} max={max_us:,}')
@@ -0,0 +1,107 @@
+from core.utils.settings import get_float
+# How often (in seconds) to log the tasks that missed their deadlines, if any did since the last time. 0 to never.
+SCHEDULER_REPORT_INTERVAL = get_float('SCHEDULER_REPORT_INTERVAL', 300.0)
+# How often (in seconds) the devices scan their buttons, and how late a scan may be before it counts as an overrun.
+BUTTONS_SCAN_PERIOD = get_float('BUTTONS_SCAN_PERIOD', 0.01)
+BUTTONS_SCAN_DEADLINE = get_float('BUTTONS_SCAN_DEADLINE', 0.05)
+
+import adafruit_logging as logging
+log = logging.getLogger()
+
+from core.utils.time_utils import monotonic_ms
+
+# Run even between the phases of a pass of the main loop, like the buttons.
+PRIORITY_HIGH = 2
+# Run once per pass of the main loop.
+PRIORITY_NORMAL = 1
+# Run once per pass of the main loop, but only while the view is not busy animating, like telemetry.
+PRIORITY_LOW = 0
+
+class Task():
+	"""Something for the main loop to run now and then, besides animating the view and talking to SGT.
+	The callback returns True while it is busy, like Buttons.loop does while presses are pending.
+	The task is run at most once every period seconds. With a deadline, a run that ends more than deadline
+	seconds after the task became due counts as an overrun. The scheduler is cooperative, so an overrun
+	means something else held up the loop, like a slow frame or a long poll of the connection.
+	Calling the task runs the callback, so a task can be passed wherever a loop callable is expected.
+	"""
+	def __init__(self, callback: callable[[None], bool], period: float = 0.0, priority: int = PRIORITY_NORMAL, deadline: float|None = None, name: str|None = None):
+		self.callback = callback
+		self.name = name if name != None else getattr(callback, '__name__', 'task')
+		self.period_ms = int(period * 1000)
+		self.priority = priority
+		self.deadline_ms = int(deadline * 1000) if deadline != None else None
+		self.ts_due_ms = monotonic_ms()
+		self.busy = False
+		self.runs = 0
+		self.overruns = 0
+		self.max_late_ms = 0
+
+	def __call__(self) -> bool:
+		return self.callback()
+
+	def run(self, now_ms: int):
+		self.busy = self.callback()
+		if self.deadline_ms != None and self.runs > 0:
+			late_ms = monotonic_ms() - self.ts_due_ms
+			if late_ms > self.deadline_ms:
+				self.overruns += 1
+				self.max_late_ms = max(self.max_late_ms, late_ms)
+		self.runs += 1
+		self.ts_due_ms = now_ms + self.period_ms
+
+	def __repr__(self):
+		return f'<{self.name}: runs={self.runs}, overruns={self.overruns}, max late={self.max_late_ms}ms>'
+
+class Scheduler():
+	"""Runs the tasks of the main loop that are due, the higher priorities first.
+	Plain callables are taken as normal priority tasks that run on every pass, which is how the loops
+	of main_loop used to be run.
+	"""
+	def __init__(self, tasks: tuple[Task|callable[[None], bool]]):
+		self.tasks = sorted([task if isinstance(task, Task) else Task(task) for task in tasks], key=lambda task: -task.priority)
+		self.reported_overruns = 0
+		self.ts_last_report_ms = monotonic_ms()
+
+	def run(self, min_priority: int = PRIORITY_LOW) -> bool:
+		"Run the due tasks of at least min_priority. Returns True if any task is busy, whether it ran now or not."
+		busy = False
+		for task in self.tasks:
+			if task.priority < min_priority:
+				break
+			now_ms = monotonic_ms()
+			if now_ms - task.ts_due_ms >= 0:
+				task.run(now_ms)
+			if task.busy:
+				busy = True
+		if SCHEDULER_REPORT_INTERVAL > 0 and monotonic_ms() - self.ts_last_report_ms >= SCHEDULER_REPORT_INTERVAL * 1000:
+			self.log_report()
+		return busy
+
+	def get_max_wait(self, min_priority: int = PRIORITY_HIGH) -> float:
+		"How long (in seconds) the loop may block before a task of at least min_priority falls due, so it is not held up."
+		now_ms = monotonic_ms()
+		wait_ms = None
+		for task in self.tasks:
+			if task.priority < min_priority:
+				break
+			task_wait_ms = task.ts_due_ms - now_ms
+			if wait_ms == None or task_wait_ms < wait_ms:
+				wait_ms = task_wait_ms
+		if wait_ms == None:
+			return 1000.0
+		return wait_ms / 1000 if wait_ms > 0 else 0
+
+	def log_report(self):
+		"Log the tasks that have missed their deadlines, if any did since the last report."
+		self.ts_last_report_ms = monotonic_ms()
+		overruns = 0
+		for task in self.tasks:
+			overruns += task.overruns
+		if overruns == self.reported_overruns:
+			return
+		self.reported_overruns = overruns
+		log.info(f'Scheduler: {overruns} overruns')
+		for task in self.tasks:
+			if task.overruns > 0:
+				log.info(f'  {task}')
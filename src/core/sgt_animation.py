@@ -1,5 +1,6 @@
 import time
 from adafruit_led_animation.animation import Animation
+from adafruit_led_animation.animation.solid import Solid
 from adafruit_pixelbuf import PixelBuf
 import adafruit_logging as logging
 log = logging.getLogger()
@@ -7,6 +8,7 @@ log = logging.getLogger()
 from core.transition.easing import EasingBase
 from core.color import StaticColor
 from core.transition.transition import ColorTransitionFunction
+import core.frame_pacer as frame_pacer
 
 class SgtAnimation():
 	def __init__(self, color_s: StaticColor, *members: tuple[Animation, float|int|None, bool]) -> None:
@@ -49,7 +51,8 @@ class SgtAnimation():
 		else:
 			if time.monotonic() - self.animation_start_ts >= animation_timing:
 				self.next()
-		return not(self.transition == None and self.members[self.current_index][2])
+		request_frame_rate(animation)
+		return self.transition != None
 
 	def transition_color(self, color: StaticColor, transition: EasingBase):
 		self.transition = ColorTransitionFunction(self.displayed_color, color, transition)
@@ -76,3 +79,12 @@ class SgtSolid(Animation):
 
 	def draw(self):
 		self.pixel_object.fill(self.color)
+
+# The animations that do not move, so need no frame rate of their own.
+STATIC_ANIMATIONS = (Solid, SgtSolid)
+
+def request_frame_rate(animation: Animation):
+	"""Ask the main loop for the frame rate a led_animation animation draws at, its speed being the seconds
+	between its frames. Its animate returns whether it drew a frame, not whether it is moving."""
+	if not isinstance(animation, STATIC_ANIMATIONS) and animation.speed > 0:
+		frame_pacer.request_fps(1 / animation.speed)
@@ -1,5 +1,5 @@
 import adafruit_logging as logging
-from gc import collect, mem_free
+from gc import mem_free
 log = logging.getLogger()
 
 def log_exception(e: any):
@@ -9,5 +9,5 @@ def log_exception(e: any):
 		log.error(e)
 
 def log_memory_usage(label: str):
-	collect()
+	"Logs the free memory as it is, without collecting first. See core.gc_policy for when garbage is collected."
 	log.debug(f'--> Free memory: {mem_free():,} @ {label}')
\ No newline at end of file
@@ -0,0 +1,6 @@
+from time import monotonic_ns
+
+def monotonic_ms() -> int:
+	"""Monotonic time in whole milliseconds. Floats are only single precision on CircuitPython, so
+	timings that must stay exact for as long as the device runs are kept as integer milliseconds."""
+	return monotonic_ns() // 1000000
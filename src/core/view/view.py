@@ -1,15 +1,15 @@
 import adafruit_logging as logging
 log = logging.getLogger()
-from time import monotonic
-
-from core.game_state import GameState, STATE_PLAYING, STATE_ADMIN, STATE_PAUSE, STATE_START, STATE_FINISHED, STATE_NOT_CONNECTED, STATE_RUNNING, STATE_NOT_RUNNING, STATE_SIM_TURN, CurrentTimes
+import core.frame_clock as frame_clock
+from core.game_state import GameState, STATE_PLAYING, STATE_ADMIN, STATE_PAUSE, STATE_START, STATE_FINISHED, STATE_NOT_CONNECTED, STATE_RUNNING, STATE_NOT_RUNNING, STATE_SIM_TURN, GameStateDiff
 
 class View():
-	current_times: CurrentTimes
 	def __init__(self):
 		self.state = None
 		self.polling_delays = []
-		self.current_times = None
+		# The turn time at the last time reminder check, and when that check was made.
+		self.time_reminder_turn_time = None
+		self.time_reminder_ts = 0
 		self.time_reminder_check_timeout = 0
 		# Note that if we use the MultiView, it is the only one that will make the checks.
 		self.enable_time_reminder_check = True
@@ -18,19 +18,22 @@ class View():
 		"Return true of the animation is busy. Returns false if the animation is static."
 
 		# Note that if we use the MultiView, it is the only one that will make the checks.
-		if self.enable_time_reminder_check and self.state and self.state.time_reminders and self.state.state in (STATE_PLAYING, STATE_SIM_TURN) and monotonic() >= self.time_reminder_check_timeout:
+		if self.enable_time_reminder_check and self.state and self.state.time_reminders and self.state.state in (STATE_PLAYING, STATE_SIM_TURN) and frame_clock.now >= self.time_reminder_check_timeout:
 			# We have time reminders set, and we are close to performing one of its border crossings.
 			# We should return True from here to mark this view as busy.
-			if self.current_times == None:
-				self.current_times = self.state.get_current_timings()
+			if self.time_reminder_turn_time == None:
+				current_times = self.state.get_current_timings()
+				self.time_reminder_turn_time = current_times.turn_time
+				self.time_reminder_ts = current_times.ts
 				return True
-			if (monotonic() - self.current_times.ts) > 1:
+			if (frame_clock.now - self.time_reminder_ts) > 1:
 				current_times = self.state.get_current_timings()
-				if self.current_times.turn_time == current_times.turn_time:
+				if self.time_reminder_turn_time == current_times.turn_time:
 					# We haven't made a change in the time. Just return busy
 					return True
-				crossed_borders = check_if_crossed_time_border(self.state.time_reminders, self.current_times.turn_time, current_times.turn_time)
-				self.current_times = current_times
+				crossed_borders = check_if_crossed_time_border(self.state.time_reminders, self.time_reminder_turn_time, current_times.turn_time)
+				self.time_reminder_turn_time = current_times.turn_time
+				self.time_reminder_ts = current_times.ts
 				if crossed_borders > 0:
 					self.on_time_reminder(crossed_borders)
 					return True
@@ -40,7 +43,7 @@ class View():
 					stop_animating_this_close_to_next_border_crossing = average_polling_delay + 1
 					time_to_start_checking_border_crossings = time_to_next_border_crossing - stop_animating_this_close_to_next_border_crossing
 					if time_to_start_checking_border_crossings > 0:
-						self.time_reminder_check_timeout = monotonic() + time_to_start_checking_border_crossings
+						self.time_reminder_check_timeout = frame_clock.now + time_to_start_checking_border_crossings
 						log.info('Start checking time reminders at t=%s', self.time_reminder_check_timeout)
 						return False
 					else:
@@ -77,20 +80,22 @@ class View():
 	def switch_to_error(self):
 		self.state = None
 		self._clear_time_reminder()
-	def on_state_update(self, state: GameState|None, old_state: GameState|None):
+	def on_state_update(self, state: GameState|None, old_state: GameState|None, diff: GameStateDiff|None = None):
 		pass
 	def on_time_reminder(self, time_reminder_count: int):
 		"Sub-classes should implement this to handle triggered time reminders"
 		pass
 
-	def set_state(self, state: GameState | None, force=False):
+	def set_state(self, state: GameState | None, force=False, diff: GameStateDiff|None = None):
 		old_state = self.state
+		if diff == None:
+			diff = GameStateDiff(state, old_state, full=force)
 		self.state = state
 		self._clear_time_reminder()
 		if self.state == None:
 			log.debug('No state in view.set_state. Go to no game')
 			self.switch_to_no_game()
-		elif old_state == None or self.state.state != old_state.state or force:
+		elif old_state == None or force or diff.changed('state'):
 			if state.state == STATE_PLAYING:
 				self.switch_to_playing(state, old_state)
 			elif state.state == STATE_SIM_TURN:
@@ -111,7 +116,7 @@ class View():
 				self.switch_to_not_connected
 			else:
 				raise Exception(f'Unknown state: {state.state}')
-		self.on_state_update(state, old_state)
+		self.on_state_update(state, old_state, diff)
 
 	def record_polling_delay(self, delay: float):
 		self.polling_delays.append(delay)
@@ -120,7 +125,7 @@ class View():
 	def _clear_time_reminder(self):
 		if self.enable_time_reminder_check:
 			self.time_reminder_check_timeout = 0
-			self.current_times = None
+			self.time_reminder_turn_time = None
 			self.on_time_reminder(0)
 
 def check_if_crossed_time_border(time_borders: tuple[int], time_lower_bound: int, time_upper_bound: int):
@@ -1,7 +1,7 @@
 import adafruit_logging as logging
 log = logging.getLogger()
 
-from core.game_state import GameState
+from core.game_state import GameState, GameStateDiff
 from core.view.view import View
 
 class ViewConsole(View):
@@ -37,7 +37,7 @@ class ViewConsole(View):
 	def switch_to_error(self):
 		super().switch_to_error()
 		log.info(f"-> Error")
-	def on_state_update(self, state: GameState|None, old_state: GameState|None):
+	def on_state_update(self, state: GameState|None, old_state: GameState|None, diff: GameStateDiff|None = None):
 		pass
 		log.info("State: %s", state)
 	def on_time_reminder(self, time_reminder_count: int):
@@ -1,4 +1,4 @@
-from core.game_state import GameState
+from core.game_state import GameState, GameStateDiff
 from core.view.view import View
 
 class ViewMulti(View):
@@ -54,10 +54,13 @@ class ViewMulti(View):
 		super().switch_to_error()
 		for view in self.views:
 			view.switch_to_error()
-	def set_state(self, state: GameState):
-		super().set_state(state)
+	def set_state(self, state: GameState, force=False, diff: GameStateDiff|None = None):
+		# Work out the diff once and share it with all the views.
+		if diff == None:
+			diff = GameStateDiff(state, self.state, full=force)
+		super().set_state(state, force, diff)
 		for view in self.views:
-			view.set_state(state)
+			view.set_state(state, force, diff)
 	def on_time_reminder(self, time_reminder_count: int):
 		for view in self.views:
 			view.on_time_reminder(time_reminder_count)
\ No newline at end of file
@@ -46,9 +46,19 @@ view.set_state(None)
 
 # ---------- WIFI -------------#
 from core.connection.sgt_connection_mqtt import SgtConnectionMQTT
-sgt_connection = SgtConnectionMQTT(view)
+sgt_connection = SgtConnectionMQTT(view, update_state_in_place=True, predict_state=True)
 viewTableOutline.set_connection(sgt_connection)
 
+# ---------- RELAY -------------#
+# With RELAY_PERIPHERAL_COUNT set, nearby peripherals (e.g. a Jewel with RELAY_PERIPHERAL set) get the game from here.
+from core.utils.settings import get_int
+loops = ()
+if get_int('RELAY_PERIPHERAL_COUNT', 0) > 0:
+	from core.connection.sgt_relay_hub import SgtRelayHub
+	relay_hub = SgtRelayHub(sgt_connection)
+	from core.scheduler import Task, PRIORITY_LOW
+	loops = (Task(relay_hub.loop, name='relay'), Task(relay_hub.scan, priority=PRIORITY_LOW, name='relay scan'))
+
 # ---------- BUTTONS SETUP -------------#
 from core.buttons import Buttons
 from microcontroller import Pin
@@ -129,6 +139,12 @@ def pressed_keys_update_callback(pressed_keys: set[Pin]):
 
 # ---------- MAIN LOOP -------------#
 from core.loop import main_loop, ErrorHandlerResumeOnButtonPress
+# With ASYNC_RUNTIME set, run the buttons, the connection and the rendering as asyncio tasks instead.
+if get_int('ASYNC_RUNTIME', 0) != 0:
+	from core.async_loop import async_main_loop as main_loop
+from core.scheduler import Task, PRIORITY_HIGH, BUTTONS_SCAN_PERIOD, BUTTONS_SCAN_DEADLINE
+buttons_task = Task(buttons.loop, BUTTONS_SCAN_PERIOD, PRIORITY_HIGH, BUTTONS_SCAN_DEADLINE, 'buttons')
+import core.loop_profiler as loop_profiler
 error_handler = ErrorHandlerResumeOnButtonPress(view, buttons)
 def on_connect():
 	buttons.clear_callbacks()
@@ -140,5 +156,7 @@ def on_connect():
 		buttons.set_callback(btn_pin, presses=1, long_press=True, callback = btn_callback)
 		buttons.set_callback(btn_pin, presses=2, long_press=True, callback = btn_callback)
 		buttons.set_callback(btn_pin, presses=3, long_press=True, callback = btn_callback)
+		if loop_profiler.enabled:
+			buttons.set_callback(btn_pin, presses=4, long_press=True, callback = loop_profiler.log_report)
 
-main_loop(sgt_connection, view, on_connect, error_handler.on_error, (buttons.loop,))
\ No newline at end of file
+main_loop(sgt_connection, view, on_connect, error_handler.on_error, (buttons_task,) + loops)
\ No newline at end of file
@@ -59,6 +59,7 @@ sgt_connection = SgtConnectionBluetooth(view,
 					device_name=BLE_DEVICE_NAME,
 					field_order=BLUETOOTH_FIELD_ORDER,
 					field_divider=BLUETOOTH_FIELD_DIVIDER,
+					update_state_in_place=True,
 				)
 viewTableOutline.set_connection(sgt_connection)
 
@@ -117,6 +118,12 @@ def pressed_keys_update_callback(pressed_keys: set[Pin]):
 
 # ---------- MAIN LOOP -------------#
 from core.loop import main_loop, ErrorHandlerResumeOnButtonPress
+# With ASYNC_RUNTIME set, run the buttons, the connection and the rendering as asyncio tasks instead.
+from core.utils.settings import get_int
+if get_int('ASYNC_RUNTIME', 0) != 0:
+	from core.async_loop import async_main_loop as main_loop
+from core.scheduler import Task, PRIORITY_HIGH, BUTTONS_SCAN_PERIOD, BUTTONS_SCAN_DEADLINE
+buttons_task = Task(buttons.loop, BUTTONS_SCAN_PERIOD, PRIORITY_HIGH, BUTTONS_SCAN_DEADLINE, 'buttons')
 error_handler = ErrorHandlerResumeOnButtonPress(view, buttons)
 def on_connect():
 	buttons.clear_callbacks()
@@ -131,4 +138,4 @@ def on_connect():
 		buttons.set_fallback(btn_callback)
 		# buttons.set_callback_multikey({board.BUTTON_A, board.BUTTON_B}, callback=lambda : sgt_connection.send("Button AB", on_success=on_success))
 
-main_loop(sgt_connection, view, on_connect, error_handler.on_error, (buttons.loop,))
\ No newline at end of file
+main_loop(sgt_connection, view, on_connect, error_handler.on_error, (buttons_task,))
\ No newline at end of file
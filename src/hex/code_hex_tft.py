@@ -38,7 +38,7 @@ view.set_state(None)
 
 # ---------- WIFI -------------#
 from core.connection.sgt_connection_mqtt import SgtConnectionMQTT
-sgt_connection = SgtConnectionMQTT(view)
+sgt_connection = SgtConnectionMQTT(view, update_state_in_place=True)
 viewTableOutline.set_connection(sgt_connection)
 
 # ---------- BUTTONS SETUP -------------#
@@ -118,6 +118,12 @@ def pressed_keys_update_callback(pressed_keys: set[Pin]):
 
 # ---------- MAIN LOOP -------------#
 from core.loop import main_loop, ErrorHandlerResumeOnButtonPress
+# With ASYNC_RUNTIME set, run the buttons, the connection and the rendering as asyncio tasks instead.
+from core.utils.settings import get_int
+if get_int('ASYNC_RUNTIME', 0) != 0:
+	from core.async_loop import async_main_loop as main_loop
+from core.scheduler import Task, PRIORITY_HIGH, BUTTONS_SCAN_PERIOD, BUTTONS_SCAN_DEADLINE
+buttons_task = Task(buttons.loop, BUTTONS_SCAN_PERIOD, PRIORITY_HIGH, BUTTONS_SCAN_DEADLINE, 'buttons')
 error_handler = ErrorHandlerResumeOnButtonPress(view, buttons)
 def on_connect():
 	buttons.clear_callbacks()
@@ -130,4 +136,4 @@ def on_connect():
 		buttons.set_callback(btn_pin, presses=2, long_press=True, callback = btn_callback)
 		buttons.set_callback(btn_pin, presses=3, long_press=True, callback = btn_callback)
 
-main_loop(sgt_connection, view, on_connect, error_handler.on_error, (buttons.loop,))
\ No newline at end of file
+main_loop(sgt_connection, view, on_connect, error_handler.on_error, (buttons_task,))
\ No newline at end of file
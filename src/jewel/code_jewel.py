@@ -39,12 +39,19 @@ view = ViewMulti([
 view.set_state(None)
 
 # ---------- BLUETOOTH SETUP -------------#
-from core.connection.sgt_connection_bluetooth import SgtConnectionBluetooth
-sgt_connection = SgtConnectionBluetooth(view,
-		device_name=BLE_DEVICE_NAME,
-		field_order=BLUETOOTH_FIELD_ORDER,
-		field_divider=BLUETOOTH_FIELD_DIVIDER,
-	)
+# With RELAY_PERIPHERAL set, get the game from a relay hub (e.g. the table) rather than from SGT on a phone.
+from core.utils.settings import get_int
+if get_int('RELAY_PERIPHERAL', 0) != 0:
+	from core.connection.sgt_connection_relay import SgtConnectionRelay
+	sgt_connection = SgtConnectionRelay(view, device_name=BLE_DEVICE_NAME, update_state_in_place=True)
+else:
+	from core.connection.sgt_connection_bluetooth import SgtConnectionBluetooth
+	sgt_connection = SgtConnectionBluetooth(view,
+			device_name=BLE_DEVICE_NAME,
+			field_order=BLUETOOTH_FIELD_ORDER,
+			field_divider=BLUETOOTH_FIELD_DIVIDER,
+			update_state_in_place=True,
+		)
 
 # ---------- BUTTONS SETUP -------------#
 from core.buttons import Buttons
@@ -80,6 +87,12 @@ def pressed_keys_callback(pins: set[Pin]):
 
 # ---------- MAIN LOOP -------------#
 from core.loop import main_loop, ErrorHandlerResumeOnButtonPress
+# With ASYNC_RUNTIME set, run the buttons, the connection and the rendering as asyncio tasks instead.
+if get_int('ASYNC_RUNTIME', 0) != 0:
+	from core.async_loop import async_main_loop as main_loop
+from core.scheduler import Task, PRIORITY_HIGH, BUTTONS_SCAN_PERIOD, BUTTONS_SCAN_DEADLINE
+buttons_task = Task(buttons.loop, BUTTONS_SCAN_PERIOD, PRIORITY_HIGH, BUTTONS_SCAN_DEADLINE, 'buttons')
+import core.loop_profiler as loop_profiler
 error_handler = ErrorHandlerResumeOnButtonPress(view, buttons)
 def on_connect():
 	buttons.clear_callbacks()
@@ -87,6 +100,8 @@ def on_connect():
 	buttons.set_callback(pin=btn_pin, presses=2, callback = btn_callback)
 	buttons.set_callback(pin=btn_pin, presses=1, long_press=True, callback = btn_callback)
 	buttons.set_callback(pin=btn_pin, presses=2, long_press=True, callback = btn_callback)
+	if loop_profiler.enabled:
+		buttons.set_callback(pin=btn_pin, presses=3, long_press=True, callback = loop_profiler.log_report)
 	buttons.set_pressed_keys_update_callback(pressed_keys_callback)
 
-main_loop(sgt_connection, view, on_connect, error_handler.on_error, (buttons.loop,))
\ No newline at end of file
+main_loop(sgt_connection, view, on_connect, error_handler.on_error, (buttons_task,))
\ No newline at end of file
@@ -11,8 +11,8 @@ from adafruit_led_animation.animation.pulse import Pulse
 from adafruit_led_animation.animation.blink import Blink
 from adafruit_led_animation.animation.rainbow import Rainbow
 
-from core.game_state import GameState, STATE_RUNNING
-from core.sgt_animation import SgtAnimation, SgtSolid
+from core.game_state import GameState, GameStateDiff, STATE_RUNNING
+from core.sgt_animation import SgtAnimation, SgtSolid, request_frame_rate
 from core.transition.transition import BoomerangEase
 from core.view.view import View
 from core.color import PlayerColor, RED, BLUE, BLACK, GREEN, ColorMix, LED_BRIGHTNESS_HIGHLIGHT, LED_BRIGHTNESS_NORMAL
@@ -27,11 +27,16 @@ class ViewMonoLight(View):
 	def animate(self) -> bool:
 		shared_stuff_busy = super().animate()
 		this_animation_busy = self.animation.animate()
+		if isinstance(self.animation, Animation):
+			request_frame_rate(self.animation)
+			this_animation_busy = False
 		return this_animation_busy or shared_stuff_busy
 
-	def on_state_update(self, state: GameState|None, old_state: GameState|None):
+	def on_state_update(self, state: GameState|None, old_state: GameState|None, diff: GameStateDiff|None = None):
 		if state is None:
 			return
+		if diff != None and not diff.changed('color_p', 'state'):
+			return
 		if isinstance(self.animation, Animation):
 			self.animation.color = state.color_p.highlight.create_display_color().current_color
 		elif isinstance(self.animation, SgtAnimation):
@@ -93,7 +98,7 @@ class SandtimerAnimation():
 		if current_times == None:
 			self.parent_view.pixels.fill(0x0)
 			self.parent_view.pixels.show()
-			return
+			return False
 		remaining_time = max(current_times.player_time - current_times.turn_time, 0)
 		new_fancy = None
 		if (remaining_time == 0):
@@ -103,4 +108,6 @@ class SandtimerAnimation():
 		new_brightness = LED_BRIGHTNESS_HIGHLIGHT if state.state != STATE_RUNNING else self.runnning_ease.func(current_times.turn_time)
 		self.mixed_color.update(new_fancy, new_brightness)
 		self.parent_view.pixels.fill(self.mixed_color.current_color)
-		self.parent_view.pixels.show()
\ No newline at end of file
+		self.parent_view.pixels.show()
+		# Breathes while running, and the color drifts with the turn time.
+		return state.state == STATE_RUNNING
@@ -25,7 +25,7 @@ class ViewTimeReminderOnOff(View):
 	def animate(self) -> bool:
 		shared_stuff_busy = super().animate()
 		if self.time_reminder_ts == None:
-			return
+			return shared_stuff_busy
 		completed_cycles, time_into_cycle = divmod(monotonic() - self.time_reminder_ts, TIME_ON+TIME_OFF)
 		if completed_cycles >= self.time_reminder_count:
 			self.time_reminder_ts = None
@@ -36,4 +36,5 @@ class ViewTimeReminderOnOff(View):
 		elif time_into_cycle >= TIME_ON and self.current_status:
 			self.off_fn()
 			self.current_status = False
-		return shared_stuff_busy
\ No newline at end of file
+		# Busy while blinking out the reminder, to keep the blinks on time.
+		return True
\ No newline at end of file
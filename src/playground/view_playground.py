@@ -10,6 +10,7 @@ from adafruit_circuitplayground import cp
 
 from core.game_state import TIMER_MODE_NO_TIMER, STATE_NOT_RUNNING, STATE_RUNNING
 from core.view.view import View
+import core.frame_pacer as frame_pacer
 
 SEC_PER_LIGHT = 60				# How many seconds does each lit light represent?
 
@@ -25,7 +26,12 @@ class ViewPlayground(View):
 		self.animation = Solid(self.pixels, BLACK)
 
 	def animate(self):
-		return self.animation.animate()
+		self.animation.animate()
+		if isinstance(self.animation, (Pulse, Comet)):
+			# These return whether they drew a frame, not whether they are moving. Their speed is the seconds between frames.
+			frame_pacer.request_fps(1 / self.animation.speed)
+			return False
+		return isinstance(self.animation, PlayingAnimation)
 
 	def set_connection_progress_text(self, text):
 		self.switch_to_trying_to_connect()
@@ -16,13 +16,17 @@ SPARKLE_COVER = get_float('TABLE_SPARKLE_COVER', 1.0)
 SPARKLE_DURATION_MIN = get_float('TABLE_SPARKLE_DURATION_MIN', 0.1)
 SPARKLE_DURATION_MAX = get_float('TABLE_SPARKLE_DURATION_MAX', 0.5)
 
+# Frames per second for what keeps moving slowly, like the minute dots, the pause lines, sparks and
+# sparkles, while no transition is running.
+SLOW_ANIMATION_FPS = get_float('TABLE_SLOW_ANIMATION_FPS', 15.0)
+
 import adafruit_logging as logging
 log = logging.getLogger()
 from random import uniform, choice
 import adafruit_fancyled.adafruit_fancyled as fancy
 from math import modf
 
-from core.game_state import GameState
+from core.game_state import GameState, GameStateDiff
 from core.color import DisplayedColor, StaticColor
 from core.transition.transition import TransitionFunction, SerialTransitionFunctions
 from table.view_table_outline import ViewTableOutline
@@ -117,7 +121,7 @@ class SgtSeatedAnimation():
 		b_high = (1-f) * fade_into_brightness + f * brightness
 		return (i_lower % self.length, b_low, i_upper % self.length, b_high, range(i_lower + 1, i_upper))
 
-	def on_state_update(self, state: GameState, old_state: GameState):
+	def on_state_update(self, state: GameState, old_state: GameState, diff: GameStateDiff|None = None):
 		pass
 
 	def on_time_reminder(self, time_reminder_count: int):
@@ -19,9 +19,10 @@ import time
 import adafruit_logging as logging
 log = logging.getLogger()
 
-from core.game_state import GameState, STATE_START, STATE_SIM_TURN, STATE_ADMIN, Player
+from core.game_state import GameState, GameStateDiff, STATE_START, STATE_SIM_TURN, STATE_ADMIN, Player
 from core.transition.transition import PropertyTransition, SerialTransitionFunctions, ColorTransitionFunction, ParallellTransitionFunctions, BoomerangEase
-from table.seated_animation.seated_animation import SgtSeatedAnimation, Line, LineTransition, TIME_REMINDER_EASINGS, TIME_REMINDER_MAX_PULSES, TIME_REMINDER_PULSE_DURATION
+import core.frame_pacer as frame_pacer
+from table.seated_animation.seated_animation import SgtSeatedAnimation, Line, LineTransition, TIME_REMINDER_EASINGS, TIME_REMINDER_MAX_PULSES, TIME_REMINDER_PULSE_DURATION, SLOW_ANIMATION_FPS
 from table.view_table_outline import ViewTableOutline, BLACK, FADE_EASE, FADE_DURATION
 
 class SgtSeatedMultiplayerAnimation(SgtSeatedAnimation):
@@ -79,6 +80,8 @@ class SgtSeatedMultiplayerAnimation(SgtSeatedAnimation):
 				if(seat_line.transitions[0].loop()):
 					seat_line.transitions = seat_line.transitions[1:]
 			is_busy = is_busy or len(seat_line.transitions) > 0
+			if seat_line.line.sparkle or len(seat_line.line.sparkles) > 0:
+				frame_pacer.request_fps(SLOW_ANIMATION_FPS)
 			seat_line.line.sparkle = self.parent.state.state == STATE_START and (seat_0+1) in self.parent.seats_with_pressed_keys
 			if self.order_player_index == None:
 				# We must be in fully random or not-starting mode. So, full lengths for all
@@ -92,11 +95,20 @@ class SgtSeatedMultiplayerAnimation(SgtSeatedAnimation):
 				length_percentage = REORDER_LINE_LENGTH_FRACTION
 			seat_line.line.draw(self.pixels, length_percentage=length_percentage)
 		self.pixels.show()
+		# The order animation pulses the line of one player after the other. Between two rounds, the clock is
+		# kept an eye on to start the next one on time.
+		if self.order_player_index != None and self.order_player_index >= 0:
+			is_busy = True
+		elif self.order_player_index != None:
+			frame_pacer.request_fps(SLOW_ANIMATION_FPS)
 		if self.start_game_mode != None:
 			self.first_player_check()
 		return is_busy
 
-	def on_state_update(self, state: GameState, old_state: GameState):
+	def on_state_update(self, state: GameState, old_state: GameState, diff: GameStateDiff|None = None):
+		# The lines of all seats must be worked out on the first state, or when the state changes,
+		# after which only the seats that have changed need updating.
+		update_all_seats = diff == None or self.state == None or diff.changed('state')
 		self.state = state
 		if state.state != STATE_START:
 			self.start_game_mode = None
@@ -106,9 +118,11 @@ class SgtSeatedMultiplayerAnimation(SgtSeatedAnimation):
 			self.cycle_start_game_mode()
 
 		for seat_0, line_definition in enumerate(self.seat_definitions):
+			if not update_all_seats and not diff.seat_changed(seat_0+1):
+				continue
 			new_color_s = None
 			new_length = line_definition[1]
-			player = next((p for p in state.players if p.seat == seat_0+1), None)
+			player = state.get_player_by_seat(seat_0+1)
 			if not isinstance(player, Player):
 				new_color_s = None
 			elif state.state == STATE_SIM_TURN:
@@ -7,13 +7,15 @@ import time
 import adafruit_logging as logging
 log = logging.getLogger()
 
-from core.game_state import GameState
-from table.seated_animation.seated_animation import SgtSeatedAnimation, Line
+from core.game_state import GameState, GameStateDiff
+import core.frame_pacer as frame_pacer
+from table.seated_animation.seated_animation import SgtSeatedAnimation, Line, SLOW_ANIMATION_FPS
 from table.view_table_outline import ViewTableOutline
 
 class SgtPauseAnimation(SgtSeatedAnimation):
 	def __init__(self, parent_view: ViewTableOutline):
 		super().__init__(parent_view)
+		self.seat_lines = None
 
 	def animate(self):
 		self.pixels.fill(self.bg_color.current_color)
@@ -25,9 +27,14 @@ class SgtPauseAnimation(SgtSeatedAnimation):
 			line.draw(self.pixels)
 		self.pixels.show()
 		self.last_animation_ts = now
+		# The lines keep moving, but slowly enough for a low frame rate.
+		frame_pacer.request_fps(SLOW_ANIMATION_FPS)
 		return False
 
-	def on_state_update(self, state: GameState, old_state: GameState):
+	def on_state_update(self, state: GameState, old_state: GameState, diff: GameStateDiff|None = None):
+		if diff != None and self.seat_lines != None and not diff.changed('seat', 'players', 'color_p'):
+			# Keep the lines spinning where they are.
+			return
 		active_player = state.get_active_player()
 		sd = self.parent.seat_definitions[active_player.seat-1] if active_player else self.parent.seat_definitions[0]
 		color_p = active_player.color if active_player else state.color_p
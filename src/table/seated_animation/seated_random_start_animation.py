@@ -50,45 +50,43 @@ class SgtSeatedRandomStartAnimation(SgtSeatedAnimation):
 		self.end_ts = time.monotonic() + self.spin_transition.duration
 		self.random_player = None
 		self.start_game_command_sent = False
+		# In scramble mode, once the first player is picked, the seats of the other players pulse in their
+		# shuffled order before the game is started. Built up front, and run a step per frame.
+		self.pulse_lines = []
+		self.pulse_animations = None
+		self.pulsing = False
+		if self.start_game_mode == 'scramble_player_order' and len(self.shuffled_players) > 1:
+			pulse_transitions = []
+			for player in self.shuffled_players[1:]:
+				seat_def = self.seat_definitions[player.seat-1]
+				pulse_line = Line(midpoint=seat_def[0], length=0, color_ds=player.color.highlight)
+				self.pulse_lines.append(pulse_line)
+				pulse_transitions.append(PropertyTransition(pulse_line, 'length', seat_def[1], START_GAME_SPIN_EASE_IN, START_GAME_SPIN_EASE_IN_DURATION))
+				pulse_transitions.append(PropertyTransition(pulse_line, 'length', 0, START_GAME_SPIN_EASE_IN, START_GAME_SPIN_EASE_IN_DURATION))
+			self.pulse_animations = SerialTransitionFunctions(pulse_transitions)
 
 	def animate(self):
 		done = self.spin_transition.loop()
 		self.line.midpoint = self.spin_transition.value
 		if self.start_game_command_sent:
 			pass
+		elif self.pulsing:
+			if self.pulse_animations.loop():
+				self.pulsing = False
+				seats = [player.seat for player in self.shuffled_players]
+				self.parent.sgt_connection.enqueue_send_start_game(seats=seats)
+				self.start_game_command_sent = True
 		elif done:
 			self.line.sparkle = True
 			self.line.color_d = self.selected_player.color.highlight.create_display_color()
 			self.bg_color = self.selected_player.color.dim.create_display_color()
 
-			if self.start_game_mode == 'scramble_player_order' and len(self.shuffled_players) > 1:
-				index = 1
-				pulse_transitions = list()
-				pulse_lines = list()
-				while index < len(self.shuffled_players):
-					player = self.shuffled_players[index]
-					seat = player.seat
-					seat_def = self.seat_definitions[seat-1]
-					pulse_line = Line(midpoint=seat_def[0], length=0, color_ds=player.color.highlight)
-					pulse_lines.append(pulse_line)
-					pulse_transitions.append(PropertyTransition(pulse_line, 'length', seat_def[1], START_GAME_SPIN_EASE_IN, START_GAME_SPIN_EASE_IN_DURATION))
-					pulse_transitions.append(PropertyTransition(pulse_line, 'length', 0, START_GAME_SPIN_EASE_IN, START_GAME_SPIN_EASE_IN_DURATION))
-					index += 1
-				pulse_animations = SerialTransitionFunctions(pulse_transitions)
-				while True:
-					is_done = pulse_animations.loop()
-					self.pixels.fill(self.bg_color.current_color)
-					self.line.draw(self.pixels)
-					for pulse_line in pulse_lines:
-						pulse_line.draw(self.pixels)
-					self.pixels.show()
-					if is_done:
-						break
-				seats = [player.seat for player in self.shuffled_players]
-				self.parent.sgt_connection.enqueue_send_start_game(seats=seats)
+			if self.pulse_animations != None:
+				self.pulsing = True
+				self.pulse_animations.loop()
 			else:
 				self.parent.sgt_connection.enqueue_send_start_game(seat=self.selected_player.seat)
-			self.start_game_command_sent = True
+				self.start_game_command_sent = True
 		else:
 			if self.color_transition_fg == None or self.color_transition_bg == None:
 				time_left = self.end_ts - time.monotonic()
@@ -111,6 +109,9 @@ class SgtSeatedRandomStartAnimation(SgtSeatedAnimation):
 
 		self.pixels.fill(self.bg_color.current_color)
 		self.line.draw(self.pixels)
+		if self.pulsing:
+			for pulse_line in self.pulse_lines:
+				pulse_line.draw(self.pixels)
 		self.pixels.show()
 
 		if (done and len(self.parent.seats_with_pressed_keys) > 1):
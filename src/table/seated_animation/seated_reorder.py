@@ -15,7 +15,8 @@ import adafruit_logging as logging
 log = logging.getLogger()
 
 import core.reorder as reorder
-from table.seated_animation.seated_animation import SgtSeatedAnimation, Line
+import core.frame_pacer as frame_pacer
+from table.seated_animation.seated_animation import SgtSeatedAnimation, Line, SLOW_ANIMATION_FPS
 from table.view_table_outline import ViewTableOutline, BLACK
 
 class SgtSeatedReorder(SgtSeatedAnimation):
@@ -36,6 +37,7 @@ class SgtSeatedReorder(SgtSeatedAnimation):
 
 	def animate(self):
 		self.pixels.fill(0x0)
+		pulsing = False
 		if reorder.singleton is not None:
 			for seat_0, s in enumerate(self.seat_definitions):
 				seat = seat_0+1
@@ -46,6 +48,7 @@ class SgtSeatedReorder(SgtSeatedAnimation):
 			animation_progress = monotonic() - self.ts_animation_start
 			animating_order_index, seat_animation_progress_in_seconds= divmod(animation_progress, REORDER_DURATION_PER_SEAT)
 			if animating_order_index < len(reorder.singleton.new_seat_order):
+				pulsing = True
 				animating_seat = reorder.singleton.new_seat_order[int(animating_order_index)]
 				animating_seat_index = animating_seat - 1
 				full_line_length = self.seat_definitions[animating_seat_index][1]
@@ -60,4 +63,7 @@ class SgtSeatedReorder(SgtSeatedAnimation):
 		for seat_line in self.seat_lines:
 			seat_line.draw(self.pixels)
 		self.pixels.show()
-		return False
+		if not pulsing and reorder.singleton is not None:
+			# Between two rounds of pulses. Keep an eye on the clock to start the next one on time.
+			frame_pacer.request_fps(SLOW_ANIMATION_FPS)
+		return pulsing
@@ -2,7 +2,8 @@ import adafruit_logging as logging
 log = logging.getLogger()
 
 from core.transition.transition import PropertyTransition
-from table.seated_animation.seated_animation import SgtSeatedAnimation, Line, LineTransition
+import core.frame_pacer as frame_pacer
+from table.seated_animation.seated_animation import SgtSeatedAnimation, Line, LineTransition, SLOW_ANIMATION_FPS
 from table.view_table_outline import ViewTableOutline, BLACK, FADE_EASE, FADE_DURATION
 
 class SgtSeatedSimTurnSelection(SgtSeatedAnimation):
@@ -29,13 +30,17 @@ class SgtSeatedSimTurnSelection(SgtSeatedAnimation):
 
 	def animate(self):
 		self.pixels.fill(0x0)
+		is_busy = False
 		for seat_line in self.seat_lines:
 			if len(seat_line.transitions) > 0:
 				if(seat_line.transitions[0].loop()):
 					seat_line.transitions = seat_line.transitions[1:]
+			is_busy = is_busy or len(seat_line.transitions) > 0
+			if seat_line.line.sparkle or len(seat_line.line.sparkles) > 0:
+				frame_pacer.request_fps(SLOW_ANIMATION_FPS)
 			seat_line.line.draw(self.pixels)
 		self.pixels.show()
-		return False
+		return is_busy
 
 	def on_pressed_keys_change(self):
 		if self.selection_completed:
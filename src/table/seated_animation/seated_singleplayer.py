@@ -45,10 +45,11 @@ from math import modf
 import adafruit_logging as logging
 log = logging.getLogger()
 
-from core.game_state import GameState, Player, STATE_PLAYING, STATE_ADMIN
+from core.game_state import GameState, GameStateDiff, Player, STATE_PLAYING, STATE_ADMIN
 from core.color import LED_BRIGHTNESS_NORMAL, LED_BRIGHTNESS_HIGHLIGHT
 from core.transition.transition import PropertyTransition, SerialTransitionFunctions, ColorTransitionFunction, ParallellTransitionFunctions
-from table.seated_animation.seated_animation import SgtSeatedAnimation, Line, LineTransition, TIME_REMINDER_EASINGS, TIME_REMINDER_MAX_PULSES, TIME_REMINDER_PULSE_DURATION
+import core.frame_pacer as frame_pacer
+from table.seated_animation.seated_animation import SgtSeatedAnimation, Line, LineTransition, TIME_REMINDER_EASINGS, TIME_REMINDER_MAX_PULSES, TIME_REMINDER_PULSE_DURATION, SLOW_ANIMATION_FPS
 from table.view_table_outline import ViewTableOutline, FADE_EASE, FADE_DURATION
 
 class Spark():
@@ -80,6 +81,7 @@ class SgtSeatedSingleplayerAnimation(SgtSeatedAnimation):
 		self.current_times = None
 		self.sparks = []
 		self.last_spawn_ts = 0
+		self.active_player = None
 		if random_first_player:
 			player_line_midpoint, player_line_length = self.seat_definitions[random_first_player.seat-1]
 			self.seat_line = LineTransition(Line(player_line_midpoint, player_line_length, random_first_player.color.highlight), [])
@@ -153,9 +155,17 @@ class SgtSeatedSingleplayerAnimation(SgtSeatedAnimation):
 		self.seat_line.line.draw(arr)
 		self.pixels[0:self.length] = arr
 		self.pixels.show()
+		# The minute dots creep along while playing, and the sparks drift during admin time.
+		if self.parent.state.state in (STATE_PLAYING, STATE_ADMIN) or self.seat_line.line.sparkle or len(self.seat_line.line.sparkles) > 0:
+			frame_pacer.request_fps(SLOW_ANIMATION_FPS)
 		return len(self.seat_line.transitions) > 0 or self.blinks_left > 0 or self.blink_transition != None
 
-	def on_state_update(self, state: GameState, old_state: GameState):
+	def on_state_update(self, state: GameState, old_state: GameState, diff: GameStateDiff|None = None):
+		# Nothing to do unless the state, the active player or the players changed. While the line is
+		# sparkling at the start of the game, keep checking so the sparkles stop once the game gets going.
+		if diff != None and self.active_player != None and not self.seat_line.line.sparkle and not diff.changed('state', 'seat', 'players'):
+			return
+
 		active_player = state.get_active_player()
 
 		if active_player == None:
@@ -1,18 +1,20 @@
 from digitalio import DigitalInOut
 
 from core.view.view import View
-from core.game_state import GameState
+from core.game_state import GameState, GameStateDiff
 
 class ViewSeatedActionLeds(View):
 	def __init__(self, leds: list[DigitalInOut]):
 		super().__init__()
 		self.leds = leds
-	def on_state_update(self, state: GameState|None, old_state: GameState|None):
+	def on_state_update(self, state: GameState|None, old_state: GameState|None, diff: GameStateDiff|None = None):
 		if state == None:
 			for led in self.leds:
 				led.value = False
 		else:
 			for player in state.players:
+				if diff != None and not diff.seat_changed(player.seat):
+					continue
 				index = player.seat - 1
 				if index < len(self.leds):
 					self.leds[index].value = player.action != None
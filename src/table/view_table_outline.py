@@ -19,7 +19,7 @@ from gc import collect, mem_free
 import core.reorder as reorder
 from core.connection.sgt_connection import SgtConnection
 from core.view.view import View
-from core.game_state import GameState
+from core.game_state import GameState, GameStateDiff
 from core.sgt_animation import SgtAnimation, SgtSolid
 from core.color import BLUE as BLUE_PC, RED as RED_PC, BLACK as BLACK_PC
 from core.transition.transition import SerialTransitionFunctions, PropertyTransition
@@ -121,10 +121,10 @@ class ViewTableOutline(View):
 	def switch_to_random_start_animation(self, start_game_mode: str):
 		from table.seated_animation.seated_random_start_animation import SgtSeatedRandomStartAnimation
 		self.fade_to_new_animation(SgtSeatedRandomStartAnimation(self, start_game_mode))
-	def on_state_update(self, state: GameState|None, old_state: GameState|None):
+	def on_state_update(self, state: GameState|None, old_state: GameState|None, diff: GameStateDiff|None = None):
 		from table.seated_animation.seated_animation import SgtSeatedAnimation
 		if isinstance(self.animation, SgtSeatedAnimation):
-			self.animation.on_state_update(state, old_state)
+			self.animation.on_state_update(state, old_state, diff)
 	def _activate_multiplayer_animation(self):
 		from table.seated_animation.seated_multiplayer import SgtSeatedMultiplayerAnimation
 		if not isinstance(self.animation, SgtSeatedMultiplayerAnimation):
@@ -0,0 +1,12 @@
+# Host tests of the logic that does not need the hardware. Run from the src folder, with the CircuitPython
+# libraries installed: python -m pytest tests
+import os
+import sys
+import gc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# core.utils.log imports the heap figures of the CircuitPython gc module, which CPython does not have.
+if not hasattr(gc, 'mem_free'):
+	gc.mem_free = lambda: 0
+	gc.mem_alloc = lambda: 0
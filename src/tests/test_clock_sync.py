@@ -0,0 +1,86 @@
+import core.connection.clock_sync as clock_sync
+from core.connection.clock_sync import ClockSync
+
+class Response():
+	def __init__(self, json: dict):
+		self.body = json
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		pass
+
+	def json(self) -> dict:
+		return self.body
+
+class Session():
+	"Answers each get with the next reply, advancing the clock of the device by the round trip time."
+	def __init__(self, clock: list, replies: list):
+		self.clock = clock
+		self.replies = replies
+
+	def get(self, url: str) -> Response:
+		(rtt_ms, json) = self.replies.pop(0)
+		self.clock[0] += rtt_ms
+		return Response(json)
+
+def make_clock_sync(monkeypatch, replies: list, sample_count: int = 3) -> tuple[ClockSync, list]:
+	clock = [5000]
+	monkeypatch.setattr(clock_sync, 'monotonic_ms', lambda: clock[0])
+	return (ClockSync(Session(clock, replies), 'http://time', sample_count, 600), clock)
+
+def test_intersection_of_samples():
+	sync = ClockSync(None, 'http://time', 3, 600)
+	sync.samples = [(0, 100), (50, 150), (20, 80)]
+	sync._update_offset()
+	assert sync.offset_ms == 65
+	assert sync.precision_ms() == 15
+
+def test_older_sample_that_disagrees_is_ignored():
+	sync = ClockSync(None, 'http://time', 3, 600)
+	sync.samples = [(0, 10), (40, 60), (50, 150)]
+	sync._update_offset()
+	assert sync.offset_ms == 55
+	assert sync.precision_range_ms == 10
+
+def test_sample_in_whole_seconds_is_a_second_wide(monkeypatch):
+	(sync, clock) = make_clock_sync(monkeypatch, [(100, {'unixtime': 1000})])
+	sync.sample()
+	# Sent at 5000ms, received at 5100ms, and the server clock read somewhere in [1000000, 1001000).
+	assert sync.samples == [(5000 - 1001000, 5100 - 1000000)]
+	assert sync.offset_ms == (5000 - 1001000 + 5100 - 1000000) // 2
+	assert sync.precision_ms() == 550
+	assert sync.offset + sync.offset_fraction == sync.offset_ms / 1000
+
+def test_samples_narrow_the_offset_down(monkeypatch):
+	(sync, clock) = make_clock_sync(monkeypatch, [
+		(20, {'unixtime': 1000}),
+		(20, {'unixtime': 1001}),
+		(20, {'unixtime_ms': 1001500}),
+	])
+	sync.sample()
+	clock[0] += 980
+	sync.sample()
+	wide = sync.precision_ms()
+	clock[0] += 480
+	sync.sample()
+	assert sync.precision_ms() < wide
+	assert sync.precision_ms() <= 10
+	# The offset agrees with every sample.
+	for (lowest, highest) in sync.samples:
+		assert lowest <= sync.offset_ms <= highest
+
+def test_only_the_latest_samples_are_kept(monkeypatch):
+	(sync, clock) = make_clock_sync(monkeypatch, [(10, {'unixtime_ms': 1000000 + n * 1000}) for n in range(5)], sample_count=2)
+	for n in range(5):
+		sync.sample()
+		clock[0] += 990
+	assert len(sync.samples) == 2
+
+def test_manual_offset_is_added():
+	sync = ClockSync(None, 'http://time', 3, 600, manual_offset=2)
+	sync.samples = [(1250, 1250)]
+	sync._update_offset()
+	assert sync.offset == 3
+	assert sync.offset_fraction == 0.25
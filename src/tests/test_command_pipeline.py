@@ -0,0 +1,77 @@
+import pytest
+
+from core.connection.command_pipeline import CommandPipeline, CANCELLING_COMMANDS, REPLACING_COMMANDS
+
+def queued_actions(pipeline: CommandPipeline) -> list[str]:
+	return [command.action for command in pipeline.queued]
+
+@pytest.mark.parametrize('first,second', CANCELLING_COMMANDS)
+def test_cancelling_pair_drops_both(first, second):
+	pipeline = CommandPipeline(1, 5)
+	assert pipeline.enqueue('Primary', 1, None, 0)
+	assert pipeline.enqueue(first, None, None, 0)
+	assert not pipeline.enqueue(second, None, None, 0)
+	assert queued_actions(pipeline) == ['Primary']
+	assert pipeline.coalesced_count == 2
+
+@pytest.mark.parametrize('first,second', CANCELLING_COMMANDS)
+def test_cancelling_pair_apart_is_kept(first, second):
+	pipeline = CommandPipeline(1, 5)
+	pipeline.enqueue(first, None, None, 0)
+	pipeline.enqueue('Undo', None, None, 0)
+	assert pipeline.enqueue(second, None, None, 0)
+	assert queued_actions(pipeline) == [first, 'Undo', second]
+	assert pipeline.coalesced_count == 0
+
+def test_cancelling_pair_already_sent_is_kept():
+	pipeline = CommandPipeline(1, 5)
+	pipeline.enqueue('TogglePause', None, None, 0)
+	pipeline.pop_next(3, 0)
+	assert pipeline.enqueue('TogglePause', None, None, 0)
+	assert queued_actions(pipeline) == ['TogglePause']
+
+@pytest.mark.parametrize('action', REPLACING_COMMANDS)
+def test_replacing_command_keeps_the_last_arguments(action):
+	pipeline = CommandPipeline(1, 5)
+	pipeline.enqueue(action, None, [1, 2, 3], 0)
+	assert not pipeline.enqueue(action, None, [3, 2, 1], 1)
+	assert queued_actions(pipeline) == [action]
+	assert pipeline.queued[0].seats == [3, 2, 1]
+	# Queued when the first one was.
+	assert pipeline.queued[0].ts_enqueued == 0
+	assert pipeline.coalesced_count == 1
+
+def test_repeated_primary_is_kept():
+	pipeline = CommandPipeline(1, 5)
+	pipeline.enqueue('Primary', 1, None, 0)
+	assert pipeline.enqueue('Primary', 1, None, 0)
+	assert queued_actions(pipeline) == ['Primary', 'Primary']
+
+def test_versions_of_commands_in_flight_are_predicted():
+	pipeline = CommandPipeline(2, 5)
+	pipeline.enqueue('Primary', 1, None, 0)
+	pipeline.enqueue('Primary', 2, None, 0)
+	pipeline.enqueue('Primary', 3, None, 0)
+	assert pipeline.pop_next(10, 1).game_state_version == 10
+	assert pipeline.pop_next(10, 1).game_state_version == 11
+	# No more than two in flight.
+	assert pipeline.pop_next(10, 1) == None
+	pipeline.on_state(11, 2)
+	assert len(pipeline.in_flight) == 1
+	assert pipeline.pop_next(11, 2).game_state_version == 12
+	pipeline.on_state(13, 3)
+	assert not pipeline.is_waiting_for_reply()
+	assert pipeline.get_latencies('Primary').count == 3
+
+def test_unanswered_commands_expire_together():
+	pipeline = CommandPipeline(2, 5)
+	pipeline.enqueue('Primary', 1, None, 0)
+	pipeline.enqueue('Undo', None, None, 0)
+	pipeline.pop_next(10, 0)
+	pipeline.pop_next(10, 1)
+	pipeline.expire(5)
+	assert pipeline.is_waiting_for_reply()
+	pipeline.expire(5.1)
+	assert not pipeline.is_waiting_for_reply()
+	assert pipeline.get_latencies('Primary').lost == 1
+	assert pipeline.get_latencies('Undo').lost == 1
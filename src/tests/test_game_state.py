@@ -0,0 +1,142 @@
+import json
+
+import core.frame_clock as frame_clock
+from core.game_state import GameState, GameStateDiff, CompactStateDecoder, JsonStateDecoder, encode_compact_state, encode_json_state, COMPACT_OTHER_ACTION
+
+def make_json(seat: int = 1, turn_time: int = 42, players: list|None = None, version: int = 7) -> str:
+	if players == None:
+		players = [
+			{'seat': 1, 'name': 'Al', 'action': 'pr', 'colorHsv': '00ffff'},
+			{'seat': 2, 'name': 'Bo', 'action': None, 'colorHsv': '55ffff'},
+			{'seat': 3, 'name': None, 'action': None, 'color': 'ff0000'},
+		]
+	return json.dumps({
+		'ts': 1000,
+		'gameStateVersion': version,
+		'timerMode': 'cu',
+		'state': 'pl',
+		'stateType': 'mt',
+		'turnTime': turn_time,
+		'playerTime': 120,
+		'totalPlayTime': 3600,
+		'name': 'Al',
+		'colorHsv': '00ffff',
+		'seat': [seat],
+		'timeReminders': [60, 300],
+		'players': players,
+		'actions': {'primary': {'action': 'game/primary', 'label': 'End Turn'}},
+	})
+
+def test_diff_of_unchanged_state_is_empty():
+	old_state = GameState(make_json())
+	state = GameState(make_json())
+	diff = GameStateDiff(state, old_state)
+	assert not diff.full
+	assert diff.fields == set()
+	assert diff.seats == set()
+	assert diff.only_timings_changed()
+
+def test_diff_of_state_with_itself_is_empty():
+	state = GameState(make_json())
+	diff = GameStateDiff(state, state)
+	assert not diff.full
+	assert diff.fields == set()
+	assert not diff.changed('state', 'players')
+
+def test_diff_without_old_state_is_full():
+	diff = GameStateDiff(GameState(make_json()), None)
+	assert diff.full
+	assert diff.changed('anything')
+	assert diff.seat_changed(5)
+	assert not diff.only_timings_changed()
+
+def test_diff_of_active_seat_change():
+	old_state = GameState(make_json(seat=1))
+	state = GameState(make_json(seat=2))
+	diff = GameStateDiff(state, old_state)
+	assert 'seat' in diff.fields
+	assert diff.seats == {1, 2}
+	assert not diff.seat_changed(3)
+
+def test_diff_of_removed_player():
+	old_state = GameState(make_json())
+	state = GameState(make_json(players=[{'seat': 1, 'name': 'Al', 'action': 'pr', 'colorHsv': '00ffff'}, {'seat': 2, 'name': 'Bo', 'action': None, 'colorHsv': '55ffff'}]))
+	diff = GameStateDiff(state, old_state)
+	assert diff.seats == {3}
+	assert 'players' in diff.fields
+
+def test_diff_of_reordered_players():
+	old_state = GameState(make_json())
+	players = json.loads(make_json())['players']
+	state = GameState(make_json(players=[players[1], players[0], players[2]]))
+	diff = GameStateDiff(state, old_state)
+	assert diff.seats == set()
+	assert 'players' in diff.fields
+
+def test_update_in_place_returns_what_changed():
+	state = GameState(make_json())
+	diff = state.update(make_json())
+	assert diff.fields == set()
+	assert diff.seats == set()
+	diff = state.update(make_json(turn_time=50))
+	assert diff.fields == {'turn_time_sec'}
+	assert diff.only_timings_changed()
+	diff = state.update(make_json(seat=2, turn_time=50, version=8))
+	assert diff.fields == {'game_state_version', 'seat'}
+	assert diff.seats == {1, 2}
+	assert not diff.only_timings_changed()
+
+def assert_same_state(state: GameState, expected: GameState):
+	for field in ('game_state_version', 'timer_mode', 'state', 'state_type', 'turn_time_sec', 'player_time_sec', 'total_play_time_sec', 'name', 'seat', 'time_reminders'):
+		assert getattr(state, field) == getattr(expected, field), field
+	assert state.color_p.hex == expected.color_p.hex
+	assert state.color_p.hsv == expected.color_p.hsv
+	assert len(state.players) == len(expected.players)
+	for player, expected_player in zip(state.players, expected.players):
+		assert (player.seat, player.name, player.action) == (expected_player.seat, expected_player.name, expected_player.action)
+		assert (player.color.hex, player.color.hsv) == (expected_player.color.hex, expected_player.color.hsv)
+
+def test_compact_round_trip():
+	state = GameState(make_json(), timestamp_offset=-1000)
+	frame_clock.now = state.timestamp
+	line = encode_compact_state(state)
+	assert line.startswith('~')
+	assert '\n' not in line and ';' not in line
+	assert_same_state(CompactStateDecoder().decode(line, 0), state)
+
+def test_compact_round_trip_in_place_finds_nothing_changed():
+	state = GameState(make_json(), timestamp_offset=-1000)
+	frame_clock.now = state.timestamp
+	line = encode_compact_state(state)
+	decoder = CompactStateDecoder()
+	decoded = decoder.decode(line, 5)
+	diff = decoder.decode_into(decoded, line, 5)
+	assert diff.fields == set()
+	assert diff.seats == set()
+
+def test_compact_round_trip_of_other_action():
+	players = json.loads(make_json())['players']
+	players[1]['action'] = 'xx'
+	state = GameState(make_json(players=players), timestamp_offset=-1000)
+	frame_clock.now = state.timestamp
+	decoded = CompactStateDecoder().decode(encode_compact_state(state), 0)
+	assert decoded.players[1].action == COMPACT_OTHER_ACTION
+
+def test_seat_above_compact_digit_falls_back_to_json():
+	players = json.loads(make_json())['players']
+	players[1]['seat'] = 70
+	state = GameState(make_json(players=players), timestamp_offset=-1000)
+	frame_clock.now = state.timestamp
+	assert encode_compact_state(state) == None
+	decoded = JsonStateDecoder().decode(encode_json_state(state), 0)
+	assert_same_state(decoded, state)
+
+def test_compact_line_of_wrong_version_is_rejected():
+	state = GameState(make_json(), timestamp_offset=-1000)
+	frame_clock.now = state.timestamp
+	line = encode_compact_state(state)
+	try:
+		CompactStateDecoder().decode('~0' + line[2:], 0)
+		assert False, 'decoded a line of another version'
+	except Exception as e:
+		assert 'version' in str(e)
@@ -0,0 +1,85 @@
+from core.connection.line_framer import LineFramer
+
+class Stream():
+	"Bytes waiting to be read, like a UART."
+	def __init__(self, data: bytes = b''):
+		self.data = bytearray(data)
+
+	@property
+	def in_waiting(self) -> int:
+		return len(self.data)
+
+	def readinto(self, buffer, nbytes: int) -> int:
+		nbytes = min(nbytes, len(self.data))
+		buffer[0:nbytes] = self.data[:nbytes]
+		del self.data[:nbytes]
+		return nbytes
+
+def read_all(framer: LineFramer, stream: Stream, ts: float = 0):
+	while framer.read_from(stream, ts) > 0:
+		pass
+
+def test_keeps_only_the_latest_line():
+	framer = LineFramer(32)
+	read_all(framer, Stream(b'one\ntwo\nthr'))
+	assert framer.newline_count == 2
+	assert framer.pop_line() == (0, 'two')
+	assert framer.pop_line() == None
+	assert framer.pending_length == 3
+
+def test_empty_lines_are_skipped():
+	framer = LineFramer(32)
+	read_all(framer, Stream(b'one\n\n\r\n'))
+	assert framer.pop_line() == (0, '\r')
+	read_all(framer, Stream(b'two\n\n\n'))
+	assert framer.pop_line() == (0, 'two')
+
+def test_line_of_size_minus_one_fits():
+	framer = LineFramer(8)
+	read_all(framer, Stream(b'1234567\n'))
+	assert not framer.overflowed
+	assert framer.pop_line() == (0, '1234567')
+
+def test_longer_line_is_dropped():
+	framer = LineFramer(8)
+	read_all(framer, Stream(b'12345678\nok\n'))
+	assert framer.overflowed
+	assert framer.pop_line() == (0, 'ok')
+
+def test_line_wrapping_around_the_end_of_the_buffer():
+	framer = LineFramer(8)
+	stream = Stream(b'abcde\nfg')
+	read_all(framer, stream)
+	assert framer.pop_line() == (0, 'abcde')
+	stream.data += b'hijk\n'
+	read_all(framer, stream)
+	assert framer.pop_line() == (0, 'fghijk')
+
+def test_full_buffer_waits_for_the_latest_line_to_be_taken():
+	framer = LineFramer(8)
+	stream = Stream(b'abc\ndefghij\n')
+	read_all(framer, stream)
+	assert framer.has_line()
+	assert framer.read_from(stream, 0) == 0
+	assert framer.pop_line() == (0, 'abc')
+	read_all(framer, stream)
+	assert framer.pop_line() == (0, 'defghij')
+	assert not framer.overflowed
+
+def test_line_is_dated_to_its_first_byte():
+	framer = LineFramer(32)
+	stream = Stream(b'ab')
+	read_all(framer, stream, 1.0)
+	stream.data += b'c\nd'
+	read_all(framer, stream, 2.0)
+	assert framer.pop_line() == (1.0, 'abc')
+	assert framer.pending_ts == 2.0
+
+def test_clear_drops_everything():
+	framer = LineFramer(32)
+	read_all(framer, Stream(b'one\ntw'))
+	framer.clear()
+	assert framer.pop_line() == None
+	assert framer.pending_length == 0
+	read_all(framer, Stream(b'three\n'))
+	assert framer.pop_line() == (0, 'three')
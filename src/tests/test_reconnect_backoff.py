@@ -0,0 +1,60 @@
+import core.connection.reconnect_backoff as reconnect_backoff
+from core.connection.reconnect_backoff import ReconnectBackoff
+
+def test_first_attempt_is_at_once():
+	backoff = ReconnectBackoff(1, 8, 0, 3)
+	assert not backoff.is_reconnecting()
+	backoff.on_lost(10)
+	assert backoff.is_reconnecting()
+	assert backoff.attempt_due(10)
+
+def test_wait_doubles_up_to_the_max():
+	backoff = ReconnectBackoff(1, 8, 0, 10)
+	backoff.on_lost(0)
+	waits = []
+	for _n in range(6):
+		backoff.on_failed(100)
+		waits.append(backoff.ts_next_attempt - 100)
+	assert waits == [1, 2, 4, 8, 8, 8]
+	assert not backoff.attempt_due(107.9)
+	assert backoff.attempt_due(108)
+
+def test_jitter_stays_within_its_fraction(monkeypatch):
+	backoff = ReconnectBackoff(2, 8, 0.25, 10)
+	backoff.on_lost(0)
+	monkeypatch.setattr(reconnect_backoff, 'random', lambda: 0.0)
+	backoff.on_failed(0)
+	assert backoff.ts_next_attempt == 1.5
+	monkeypatch.setattr(reconnect_backoff, 'random', lambda: 1.0)
+	backoff.on_failed(0)
+	assert backoff.ts_next_attempt == 5
+
+def test_falls_back_after_the_fast_attempts():
+	backoff = ReconnectBackoff(1, 8, 0, 2)
+	backoff.on_lost(0)
+	backoff.on_failed(0)
+	assert not backoff.should_fall_back()
+	backoff.on_failed(1)
+	assert backoff.should_fall_back()
+
+def test_losing_again_while_reconnecting_keeps_the_first_loss():
+	backoff = ReconnectBackoff(1, 8, 0, 3)
+	backoff.on_lost(5)
+	backoff.on_failed(5)
+	backoff.on_lost(6)
+	assert backoff.ts_lost == 5
+	assert backoff.attempts == 1
+
+def test_reconnect_durations():
+	backoff = ReconnectBackoff(1, 8, 0, 3)
+	assert backoff.on_connected(1) == None
+	backoff.on_lost(10)
+	backoff.on_failed(10)
+	assert backoff.on_connected(13) == 3
+	assert not backoff.is_reconnecting()
+	assert backoff.attempts == 0
+	backoff.on_lost(20)
+	assert backoff.on_connected(21) == 1
+	assert backoff.reconnect_count == 2
+	assert backoff.max_duration == 3
+	assert backoff.total_duration == 4
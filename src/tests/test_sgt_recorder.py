@@ -0,0 +1,19 @@
+from core.connection.sgt_recorder import parse_record, RECORD_BLE, RECORD_MQTT
+
+def test_parses_an_entry():
+	assert parse_record('@1234\tble\tcu;pl;mt\n') == (1234, RECORD_BLE, 'cu;pl;mt')
+
+def test_payload_keeps_its_tabs():
+	assert parse_record('@5\tmqtt\t{"name": "a\tb"}\r\n') == (5, RECORD_MQTT, '{"name": "a\tb"}')
+
+def test_empty_payload():
+	assert parse_record('@5\tble\t') == (5, RECORD_BLE, '')
+
+def test_other_console_lines_are_skipped():
+	assert parse_record('Connecting to WiFi...') == None
+	assert parse_record('') == None
+
+def test_malformed_entries_are_skipped():
+	assert parse_record('@5\tble') == None
+	assert parse_record('@abc\tble\tx') == None
+	assert parse_record('@\tble\tx') == None